@@ -1,14 +1,27 @@
-from flask import Flask, send_from_directory
+from flask import Flask, request
 from flask_restx import Api
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
-from .models import db
+from .models import db, create_missing_indexes, UKM, User
+from .query_profiles import init_query_guard
 from .api.auth_routes import api as auth_ns
 from .api.ukm_routes import api as ukm_ns
 from .api.profile_routes import api as profile_ns
-from .services.file_upload import FileUploadService
+from .api.bootstrap_routes import api as bootstrap_ns
+from .services.file_upload import file_upload_service
+from .services.avatar_jobs import avatar_jobs
+from .services.avatar_delivery import avatar_delivery
+from .services.search_index import ukm_search_index
+from .services.ukm_sampler import active_ukm_sampler
+from .services.catalog_cache import catalog_cache
+from .services.compression import init_compression
+from .services.password_hasher import HashQueueFull, password_hasher
+from .services.token_versions import token_versions
+from .services.role_counts import role_user_counts
+from .services.rate_limit import RateLimitExceeded, rate_limiter
+from .services.token_denylist import token_denylist
+from . import commands
 from config import Config
-import os
 
 def create_app():
     app = Flask(__name__)
@@ -18,18 +31,61 @@ def create_app():
     CORS(app, 
          origins=['http://localhost:3000', 'http://localhost:5173', 'http://localhost:5174', 'http://localhost:5175', 'http://localhost:5176'],
          allow_headers=['Content-Type', 'Authorization', 'Access-Control-Allow-Origin'],
-         methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
+         methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'],
          supports_credentials=True,
          max_age=86400)  # Cache preflight for 24 hours
 
     # Inisialisasi database
     db.init_app(app)
 
-    # Initialize file upload service
-    file_upload_service = FileUploadService(app)
+    # Hitung query SQL per request untuk endpoint yang punya batas query
+    init_query_guard(app)
+
+    # Initialize file upload service (satu instance untuk semua request)
+    file_upload_service.init_app(app)
+
+    # Process pool untuk pemrosesan avatar di background
+    avatar_jobs.init_app(app)
+
+    # Pengiriman file avatar: send_file, X-Accel-Redirect/X-Sendfile, atau LRU memori
+    avatar_delivery.init_app(app)
+
+    # Index pencarian UKM (dibangun saat pencarian pertama, lalu incremental)
+    ukm_search_index.init_app(app)
+
+    # Daftar ID UKM aktif untuk endpoint /api/ukm/random
+    active_ukm_sampler.init_app(app)
+
+    # Cache response katalog per versi data (ETag / 304)
+    catalog_cache.init_app(app)
+
+    # Kompresi gzip/brotli sesuai Accept-Encoding
+    init_compression(app)
+
+    # Process pool untuk hashing password (login/register/ganti password)
+    password_hasher.init_app(app)
+
+    # Versi token per user untuk otorisasi dari klaim JWT
+    token_versions.init_app(app)
+
+    # Jumlah user per role (GROUP BY yang di-cache) untuk /api/auth/roles
+    role_user_counts.init_app(app)
+
+    # Token bucket per client/username untuk login dan register
+    rate_limiter.init_app(app)
+
+    # Denylist JTI di memori untuk logout / cabut semua sesi
+    token_denylist.init_app(app)
+
+    # Perintah CLI (flask provision-students ...)
+    commands.init_app(app)
 
     # Inisialisasi ekstensi
     jwt = JWTManager(app)
+
+    @jwt.token_in_blocklist_loader
+    def check_token_revoked(jwt_header, jwt_payload):
+        return token_denylist.is_revoked(jwt_payload)
     
     # Konfigurasi security untuk Swagger UI
     authorizations = {
@@ -50,22 +106,35 @@ def create_app():
         security='jsonWebToken'
     )
 
+    @api.errorhandler(HashQueueFull)
+    def handle_hash_queue_full(error):
+        return {'msg': 'Server sedang sibuk, silakan coba lagi'}, 503, {'Retry-After': '1'}
+
+    @api.errorhandler(RateLimitExceeded)
+    def handle_rate_limit(error):
+        return ({'msg': f'Terlalu banyak percobaan, coba lagi dalam {error.retry_after} detik'},
+                429, {'Retry-After': str(error.retry_after)})
+
     # Daftarkan namespace dari file routes
     api.add_namespace(auth_ns, path='/api/auth')
     api.add_namespace(ukm_ns, path='/api/ukm')
     api.add_namespace(profile_ns, path='/api/profile')
+    api.add_namespace(bootstrap_ns, path='/api/bootstrap')
 
     # Add static file serving route for avatar files
     @app.route('/static/uploads/avatars/<filename>')
     def uploaded_avatar(filename):
-        """Serve uploaded avatar files"""
-        upload_folder = os.path.join(app.root_path, 'static', 'uploads', 'avatars')
-        return send_from_directory(upload_folder, filename)
+        """Serve uploaded avatar files (rendition tanpa ekstensi: WebP/JPEG sesuai Accept)"""
+        return avatar_delivery.send(filename, request.accept_mimetypes)
 
     # Buat tabel dan data awal
     with app.app_context():
         db.create_all()
+        # Index keyset pagination daftar UKM dan daftar user admin
+        create_missing_indexes(UKM, User)
         init_data()
+        token_denylist.sync()
+        avatar_jobs.fail_interrupted()
 
     return app
 
@@ -1,8 +1,23 @@
-from flask import request, jsonify
+from flask import current_app, request, jsonify
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, get_jwt, jwt_required, get_jwt_identity
+from sqlalchemy import or_
+import io
+import itertools
 from ..models import db, User, Role
 from ..decorators import admin_required, get_current_user
+from ..serializers import InvalidFields, compile_serializer, parse_fields
+from ..services.token_versions import token_versions
+from ..services.role_counts import role_user_counts
+from ..services.rate_limit import client_key, json_field_key, rate_limited
+from ..services.token_denylist import token_denylist
+from ..services.avatar_store import avatar_store
+from ..services.file_upload import is_data_url
+from ..services.row_readers import iter_csv_rows
+from ..services.user_provisioning import StudentProvisioner
+from ..services.pagination import (InvalidCursor, count_estimate, decode_cursor, escape_like, get_page_size,
+                                  keyset_page, table_row_estimate)
+from ..query_profiles import USER_FIELDS, USER_WITH_ROLE, loader_profile, profiled_query
 
 api = Namespace('auth', description='Operasi autentikasi')
 
@@ -44,11 +59,53 @@ user_model = api.model('UserResponse', {
     'role': fields.Raw(description='User role')
 })
 
+# Serializer satu kali jalan untuk user_model (role dikirim sebagai dict role)
+serialize_user = compile_serializer(user_model, sources={
+    'role': lambda user: user.role.to_dict() if user.role else None
+})
+
+# Model untuk satu halaman daftar user (cursor pagination)
+user_page_model = api.model('UserPage', {
+    'items': fields.List(fields.Nested(user_model), description='Daftar user pada halaman ini'),
+    'next_cursor': fields.String(description='Cursor untuk halaman berikutnya (null jika halaman terakhir)'),
+    'total': fields.Integer(description='Jumlah user yang cocok (hanya di halaman pertama)'),
+    'total_is_estimate': fields.Boolean(description='True jika total hanya perkiraan (statistik tabel atau batas COUNT)')
+})
+
+# Pilihan urutan daftar user: nama sort -> (kolom, descending)
+USER_SORTS = {
+    'id': (User.id, False),
+    'username': (User.username, False),
+    '-username': (User.username, True),
+    'newest': (User.created_at, True),
+    'oldest': (User.created_at, False)
+}
+
+# Model untuk laporan provisioning akun massal
+user_provision_result_model = api.model('UserProvisionResult', {
+    'row': fields.Integer(description='Nomor baris di CSV'),
+    'username': fields.String(description='Username'),
+    'status': fields.String(description='created atau error'),
+    'errors': fields.List(fields.String, description='Kesalahan baris ini'),
+    'initial_password': fields.String(description='Password awal (jika kolom password kosong)')
+})
+
+user_provision_report_model = api.model('UserProvisionReport', {
+    'created': fields.Integer(description='Jumlah akun yang dibuat'),
+    'failed': fields.Integer(description='Jumlah baris yang gagal'),
+    'results': fields.List(fields.Nested(user_provision_result_model), description='Hasil per baris')
+})
+
+# Kolom untuk pencarian prefix (?q=), masing-masing punya index
+USER_SEARCH_COLUMNS = (User.username, User.email, User.full_name, User.student_id)
+
 @api.route('/login')
 class Login(Resource):
     @api.doc(description="Login untuk mendapatkan JWT token.")
     @api.expect(login_model)
     @api.marshal_with(token_model, code=200)
+    @rate_limited(('login_client', client_key), ('login_username', json_field_key('username')))
+    @loader_profile(USER_WITH_ROLE, max_queries=2)
     def post(self):
         """Endpoint untuk login."""
         data = request.get_json()
@@ -58,22 +115,54 @@ class Login(Resource):
         if not username or not password:
             return {"msg": "Username dan password wajib diisi"}, 400
         
-        user = User.query.filter_by(username=username).first()
+        marker = token_versions.marker()
+        user = profiled_query(User).filter_by(username=username).first()
         
         if user and user.check_password(password) and user.is_active:
-            access_token = create_access_token(identity=str(user.id))
-            return {
+            # Hash lama (cost berbeda dari PASSWORD_HASH_METHOD) diganti saat login,
+            # sebelum klaim dibuat karena versi token ikut password_hash
+            rehashed = user.rehash_password_if_needed(password)
+            # Role, permission dan versi token ikut di JWT (lihat decorators.py)
+            access_token = create_access_token(identity=str(user.id),
+                                               additional_claims=user.get_token_claims())
+            result = {
                 "access_token": access_token,
                 "user": user.to_dict(include_permissions=True)
             }
+            version = user.token_version
+            if rehashed:
+                db.session.commit()
+                # Commit ini sendiri menaikkan penanda
+                marker = token_versions.marker()
+            token_versions.put(user.id, version, marker)
+            return result
         
         return {"msg": "Username atau password salah"}, 401
 
+@api.route('/logout')
+class Logout(Resource):
+    @jwt_required()
+    @api.doc(security='jsonWebToken', description="Logout: cabut token yang sedang dipakai.")
+    def post(self):
+        """Endpoint untuk logout."""
+        token_denylist.revoke_token(get_jwt())
+        return {"msg": "Logout berhasil"}
+
+@api.route('/logout-all')
+class LogoutAll(Resource):
+    @jwt_required()
+    @api.doc(security='jsonWebToken', description="Cabut semua sesi (semua token) user yang sedang login.")
+    def post(self):
+        """Endpoint untuk logout dari semua perangkat."""
+        token_denylist.revoke_user(int(get_jwt_identity()))
+        return {"msg": "Semua sesi berhasil diakhiri"}
+
 @api.route('/register')
 class Register(Resource):
     @api.doc(description="Register untuk membuat akun baru.")
     @api.expect(register_model)
     @api.marshal_with(user_model, code=201)
+    @rate_limited(('register_client', client_key))
     def post(self):
         """Endpoint untuk register user baru."""
         data = request.get_json()
@@ -84,6 +173,11 @@ class Register(Resource):
         
         if not username or not email or not password:
             return {"msg": "Username, email, dan password wajib diisi"}, 400
+
+        # Avatar base64 tidak disimpan inline di tabel users; upload lewat /api/profile/avatar
+        if is_data_url(data.get('avatar_url')):
+            # abort: return biasa akan ikut di-marshal user_model
+            api.abort(400, "Avatar base64 tidak didukung saat registrasi, upload setelah login")
         
         # Cek apakah username sudah ada
         if User.query.filter_by(username=username).first():
@@ -126,14 +220,15 @@ class Register(Resource):
 class Profile(Resource):
     @jwt_required()
     @api.doc(security='jsonWebToken', description="Mendapatkan profile user yang sedang login.")
-    @api.marshal_with(user_model, code=200)
+    @api.response(200, 'Success', user_model)
+    @loader_profile(USER_WITH_ROLE, max_queries=1)
     def get(self):
         """Mendapatkan profile user."""
         user = get_current_user()
         if not user:
             return {"msg": "User tidak ditemukan"}, 404
         
-        return user.to_dict(include_permissions=True)
+        return serialize_user(user)
 
     @jwt_required()
     @api.doc(security='jsonWebToken', description="Update profile user.")
@@ -169,12 +264,93 @@ class Profile(Resource):
 @api.route('/users')
 class UserList(Resource):
     @admin_required
-    @api.doc(security='jsonWebToken', description="Mendapatkan semua user atau buat user baru (Admin only).")
-    @api.marshal_list_with(user_model)
+    @api.doc(security='jsonWebToken', description="Mendapatkan daftar user dengan cursor pagination (Admin only).", params={
+        'cursor': 'Cursor dari next_cursor halaman sebelumnya',
+        'limit': 'Jumlah user per halaman (default 20, maks 100)',
+        'q': 'Cari prefix username, email, nama lengkap atau NIM',
+        'role': 'Filter nama role (mis. admin/user)',
+        'is_active': 'Filter status aktif (true/false)',
+        'faculty': 'Filter fakultas',
+        'sort': f"Urutan: {', '.join(USER_SORTS)} (default id)",
+        'fields': 'Field yang dikirim, dipisah koma (mis. id,username,role)',
+        'all': 'true untuk format lama: semua user sebagai list tanpa pagination'
+    })
+    @api.response(200, 'Success', user_page_model)
+    @api.response(400, 'Parameter tidak valid')
+    @loader_profile(USER_WITH_ROLE, max_queries=3)
     def get(self):
-        """[ADMIN] Mendapatkan semua user."""
-        users = User.query.all()
-        return [user.to_dict() for user in users]
+        """[ADMIN] Mendapatkan daftar user."""
+        try:
+            fields = parse_fields(request.args.get('fields'), serialize_user)
+        except InvalidFields as e:
+            return {"msg": str(e)}, 400
+        serialize = serialize_user.only(fields) if fields else serialize_user
+
+        sort = request.args.get('sort', 'id')
+        if sort not in USER_SORTS:
+            return {"msg": f"Sort tidak valid. Pilihan: {', '.join(USER_SORTS)}"}, 400
+        sort_column, descending = USER_SORTS[sort]
+
+        # Kolom sort ikut dimuat untuk membuat next_cursor
+        query = profiled_query(User, USER_FIELDS, fields, extra=(sort_column.key,))
+        filtered = False
+
+        role = request.args.get('role', '').strip()
+        if role:
+            query = query.filter(User.role_id == db.session.query(Role.id).filter(Role.name == role).scalar_subquery())
+            filtered = True
+
+        is_active = request.args.get('is_active', '').strip().lower()
+        if is_active:
+            query = query.filter(User.is_active == (is_active in ('1', 'true', 'yes')))
+            filtered = True
+
+        faculty = request.args.get('faculty', '').strip()
+        if faculty:
+            query = query.filter(User.faculty == faculty)
+            filtered = True
+
+        # Pencarian prefix (LIKE 'q%') supaya index tiap kolom tetap terpakai
+        q = request.args.get('q', '').strip()
+        if q:
+            pattern = escape_like(q) + '%'
+            query = query.filter(or_(*(column.like(pattern, escape='\\') for column in USER_SEARCH_COLUMNS)))
+            filtered = True
+
+        # Format lama (opt-in): semua user sekaligus sebagai list
+        if request.args.get('all', '').lower() in ('1', 'true', 'yes'):
+            return [serialize(user) for user in query.order_by(User.id).all()]
+
+        cursor = request.args.get('cursor')
+        try:
+            users, next_cursor = keyset_page(
+                query, sort_column, User.id,
+                descending=descending,
+                cursor=decode_cursor(cursor) if cursor else None,
+                limit=get_page_size(request.args),
+                tag=sort
+            )
+        except InvalidCursor:
+            return {"msg": "Cursor tidak valid"}, 400
+
+        # Total hanya dihitung di halaman pertama: statistik tabel jika tanpa
+        # filter (MySQL), selain itu COUNT yang dibatasi
+        total, total_is_estimate = None, None
+        if not cursor and next_cursor is None:
+            total, total_is_estimate = len(users), False
+        elif not cursor:
+            total = None if filtered else table_row_estimate(db.session, User.__tablename__)
+            if total is not None:
+                total_is_estimate = True
+            else:
+                total, total_is_estimate = count_estimate(query)
+
+        return {
+            'items': [serialize(user) for user in users],
+            'next_cursor': next_cursor,
+            'total': total,
+            'total_is_estimate': total_is_estimate
+        }
     
     @api.expect(api.model('AdminCreateUser', {
         'username': fields.String(required=True, description='Username'),
@@ -226,17 +402,48 @@ class UserList(Resource):
             db.session.rollback()
             return {"msg": f"Gagal membuat user: {str(e)}"}, 500
 
+@api.route('/users/bulk')
+class UserBulkProvision(Resource):
+    @admin_required
+    @api.doc(security='jsonWebToken', description=(
+        "Buat akun mahasiswa massal dari CSV (Admin only). Kolom: username, email, "
+        "student_id (NIM), faculty, opsional full_name, major, password. Kirim sebagai "
+        "multipart field 'file' atau langsung sebagai body text/csv. Baris tanpa "
+        "password mendapat password awal acak di laporan."
+    ), params={'role': 'Role untuk semua akun (default user)'})
+    @api.response(200, 'Laporan provisioning', user_provision_report_model)
+    @api.response(400, 'Role tidak ditemukan')
+    @api.response(413, 'Terlalu banyak baris; gunakan CLI provision-students')
+    def post(self):
+        """[ADMIN] Provisioning akun mahasiswa massal."""
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+
+        provisioner = StudentProvisioner(role_name=request.args.get('role', 'user'))
+        if provisioner.role is None:
+            return {"msg": "Role tidak ditemukan"}, 400
+
+        # Hashing semua password terjadi di request ini; file besar lewat CLI
+        max_rows = current_app.config.get('PROVISION_HTTP_MAX_ROWS', 100)
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        rows = list(itertools.islice(iter_csv_rows(text), max_rows + 1))
+        if len(rows) > max_rows:
+            return {"msg": f"Maksimal {max_rows} baris per request; untuk file lebih besar "
+                           f"jalankan 'flask provision-students <file.csv>' di server"}, 413
+        return provisioner.run(rows), 200
+
 @api.route('/users/<int:user_id>')
 class UserDetail(Resource):
     @admin_required
     @api.doc(security='jsonWebToken', description="Mendapatkan, edit, atau hapus user (Admin only).")
-    @api.marshal_with(user_model)
+    @api.response(200, 'Success', user_model)
+    @loader_profile(USER_WITH_ROLE, max_queries=2)
     def get(self, user_id):
         """[ADMIN] Mendapatkan detail user."""
-        user = User.query.get(user_id)
+        user = profiled_query(User).get(user_id)
         if not user:
             return {"msg": "User tidak ditemukan"}, 404
-        return user.to_dict()
+        return serialize_user(user)
     
     @api.expect(api.model('UserUpdate', {
         'username': fields.String(required=False, description='Username baru'),
@@ -314,6 +521,9 @@ class UserDetail(Resource):
             return {"msg": "User tidak ditemukan"}, 404
         
         try:
+            # Lepas avatar lokal di transaksi yang sama supaya file-nya ikut dibersihkan
+            if user.avatar_type == 'local' and user.avatar_filename:
+                avatar_store.release(user.avatar_filename)
             db.session.delete(user)
             db.session.commit()
             return {"msg": f"User {user.username} berhasil dihapus"}, 200
@@ -351,10 +561,13 @@ class UserRole(Resource):
 class RoleList(Resource):
     @admin_required
     @api.doc(security='jsonWebToken', description="Mendapatkan semua role (Admin only).")
+    @loader_profile(max_queries=3)
     def get(self):
         """[ADMIN] Mendapatkan semua role."""
         roles = Role.query.all()
-        return [role.to_dict() for role in roles]
+        # Jumlah user per role dari satu GROUP BY yang di-cache
+        user_counts = role_user_counts.get()
+        return [role.to_dict(user_count=user_counts.get(role.id, 0)) for role in roles]
 
 @api.route('/debug')
 class AuthDebug(Resource):
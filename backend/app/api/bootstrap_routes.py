@@ -0,0 +1,89 @@
+from flask import request
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+from ..decorators import get_current_user
+from ..models import UKM
+from ..query_profiles import UKM_WITH_CATEGORY, USER_WITH_ROLE, loader_profile, profiled_query
+from ..services.catalog_cache import catalog_cache
+from .ukm_routes import (RANDOM_DEFAULT_WINDOW, RANDOM_MAX_LIMIT, category_list, category_summary_model,
+                         random_seed, random_ukms, serialize_ukm, ukm_model)
+
+api = Namespace('bootstrap', description='Data awal halaman dalam satu request')
+
+# Model untuk ringkasan user yang sedang login
+bootstrap_user_model = api.model('BootstrapUser', {
+    'id': fields.Integer(description='User ID'),
+    'username': fields.String(description='Username'),
+    'full_name': fields.String(description='Nama lengkap'),
+    'avatar_url': fields.String(description='URL Avatar'),
+    'avatar_renditions': fields.Raw(description='URL avatar per ukuran (px) untuk srcset'),
+    'role': fields.String(description='Nama role'),
+    'permissions': fields.List(fields.String, description='Daftar permission')
+})
+
+bootstrap_model = api.model('Bootstrap', {
+    'categories': fields.List(fields.Nested(category_summary_model), description='Kategori dengan jumlah UKM aktif'),
+    'recommendations': fields.List(fields.Nested(ukm_model), description='Rekomendasi UKM random (stabil per jendela waktu)'),
+    'ukms': fields.List(fields.Nested(ukm_model), description='Semua UKM aktif (hanya jika include_ukms=true)'),
+    'counts': fields.Raw(description='Jumlah UKM aktif dan kategori'),
+    'user': fields.Nested(bootstrap_user_model, allow_null=True, description='User yang login (null jika tanpa token)')
+})
+
+@api.route('/')
+class Bootstrap(Resource):
+    @api.doc(description="Kategori, rekomendasi UKM, jumlah katalog dan (jika ada token) profil ringkas dalam satu response (Publik).", params={
+        'random_limit': 'Jumlah rekomendasi UKM (default 4, maks 50, 0 = tanpa rekomendasi)',
+        'include_ukms': 'true untuk ikut mengirim semua UKM aktif (halaman daftar UKM)'
+    })
+    @api.response(200, 'Success', bootstrap_model)
+    @loader_profile(UKM_WITH_CATEGORY, USER_WITH_ROLE, max_queries=5)
+    def get(self):
+        """[PUBLIK] Data awal homepage / halaman UKM."""
+        limit = max(0, min(request.args.get('random_limit', 4, type=int), RANDOM_MAX_LIMIT))
+
+        categories = catalog_cache.part('categories:counts', lambda: category_list(include_counts=True))
+        recommendations = []
+        if limit:
+            seed, _ = random_seed(RANDOM_DEFAULT_WINDOW, limit)
+            recommendations = catalog_cache.part(f'random:{seed}', lambda: random_ukms(limit, seed=seed))
+
+        data = {
+            'categories': categories,
+            'recommendations': recommendations,
+            'counts': {
+                'ukm': sum(category['ukm_count'] for category in categories),
+                'categories': len(categories)
+            },
+            'user': self._current_user()
+        }
+        if request.args.get('include_ukms', '').lower() in ('1', 'true', 'yes'):
+            data['ukms'] = catalog_cache.part('ukms:all', all_active_ukms)
+        return data, 200
+
+    def _current_user(self):
+        """Profil ringkas jika request membawa JWT yang valid, selain itu None"""
+        try:
+            if not verify_jwt_in_request(optional=True):
+                return None
+        except (JWTExtendedException, PyJWTError):
+            return None
+
+        user = get_current_user()
+        if not user or not user.is_active:
+            return None
+        return {
+            'id': user.id,
+            'username': user.username,
+            'full_name': user.full_name,
+            'avatar_url': user.get_avatar_url(),
+            'avatar_renditions': user.get_avatar_renditions(),
+            'role': user.role.name if user.role else None,
+            'permissions': user.get_permissions()
+        }
+
+
+def all_active_ukms():
+    """Semua UKM aktif (serialized), format sama dengan GET /api/ukm/?all=true"""
+    return [serialize_ukm(ukm) for ukm in profiled_query(UKM).filter_by(is_active=True).order_by(UKM.id).all()]
@@ -1,14 +1,15 @@
-from flask import request, send_from_directory, current_app
+from flask import request, url_for
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
-from ..models import db, User
+from ..models import db, User, AvatarJob
 from ..decorators import get_current_user
-from ..services.file_upload import FileUploadService
-import os
-import base64
-import io
-from PIL import Image
+from ..serializers import InvalidFields, compile_serializer, parse_fields
+from ..query_profiles import USER_FIELDS, USER_WITH_ROLE, loader_profile, profiled_query
+from ..services.file_upload import InvalidImage, decode_data_url, file_upload_service, inspect_image, is_data_url
+from ..services.avatar_jobs import avatar_jobs
+from ..services.avatar_store import avatar_store
+from ..services.avatar_delivery import avatar_delivery
 
 api = Namespace('profile', description='Operasi terkait profil user')
 
@@ -27,6 +28,7 @@ profile_model = api.model('Profile', {
     'faculty': fields.String(description='Fakultas'),
     'major': fields.String(description='Jurusan'),
     'avatar_url': fields.String(description='URL Avatar'),
+    'avatar_renditions': fields.Raw(description='URL avatar per ukuran (px) untuk srcset'),
     'avatar_filename': fields.String(description='Avatar Filename (Local)'),
     'avatar_type': fields.String(description='Avatar Type (url/local/base64)'),
     'role': fields.Raw(description='Role User'),
@@ -34,6 +36,13 @@ profile_model = api.model('Profile', {
     'updated_at': fields.String(description='Tanggal Diupdate')
 })
 
+# Serializer profil; avatar_url lokal dikirim sebagai URL lengkap dengan host request
+serialize_profile = compile_serializer(profile_model, sources={
+    'avatar_url': lambda user: user.get_avatar_url(request.headers.get('Host', 'localhost:5000')),
+    'avatar_renditions': lambda user: user.get_avatar_renditions(request.headers.get('Host', 'localhost:5000')),
+    'role': lambda user: user.role.to_dict() if user.role else None
+})
+
 # Model untuk update profile
 profile_update_model = api.model('ProfileUpdate', {
     'full_name': fields.String(description='Nama Lengkap'),
@@ -63,33 +72,33 @@ message_model = api.model('Message', {
 @api.route('/')
 class ProfileResource(Resource):
     @jwt_required()
-    @api.doc(security='jsonWebToken', description="Mengambil profil user yang sedang login.")
-    @api.marshal_with(profile_model)
+    @api.doc(security='jsonWebToken', description="Mengambil profil user yang sedang login.", params={
+        'fields': 'Field yang dikirim, dipisah koma (mis. id,full_name,avatar_url)'
+    })
+    @api.response(200, 'Success', profile_model)
+    @api.response(400, 'Parameter tidak valid', message_model)
+    @api.response(404, 'User tidak ditemukan', message_model)
+    @loader_profile(USER_WITH_ROLE, max_queries=1)
     def get(self):
         """[TERPROTEKSI] Mengambil profil user yang sedang login."""
         try:
             current_user_id = get_jwt_identity()
             print(f"Profile GET request from user ID: {current_user_id}")
-            
-            current_user = get_current_user()
+
+            try:
+                fields = parse_fields(request.args.get('fields'), serialize_profile)
+            except InvalidFields as e:
+                return {"message": str(e)}, 400
+            serialize = serialize_profile.only(fields) if fields else serialize_profile
+
+            # Hanya kolom untuk field yang diminta (mis. tanpa bio/address/avatar base64)
+            current_user = profiled_query(User, USER_FIELDS, fields).get(current_user_id)
             if not current_user:
                 print(f"User not found for ID: {current_user_id}")
                 return {"message": "User tidak ditemukan"}, 404
             
-            print(f"Found user: {current_user.username} (ID: {current_user.id})")
-            
-            profile_data = current_user.to_dict_with_profile()
-            # Ensure avatar_url includes correct URL for local files
-            if current_user.avatar_type == 'local' and current_user.avatar_filename:
-                host = request.headers.get('Host', 'localhost:5000')
-                profile_data['avatar_url'] = current_user.get_avatar_url(host)
-            elif current_user.avatar_type in ['url', 'base64']:
-                profile_data['avatar_url'] = current_user.get_avatar_url()
-            else:
-                profile_data['avatar_url'] = None
-            
+            profile_data = serialize(current_user)
             print(f"Profile data prepared with keys: {list(profile_data.keys())}")
-            print(f"Avatar URL returned: {profile_data.get('avatar_url', 'None')}")
             
             return profile_data, 200
             
@@ -111,6 +120,19 @@ class ProfileResource(Resource):
         
         data = request.get_json()
         print(f"Profile update request data keys: {list(data.keys()) if data else 'None'}")
+        avatar_data = data.get('avatar_url')
+        if avatar_data in (current_user.avatar_url, current_user.get_avatar_url(request.headers.get('Host', 'localhost:5000'))):
+            # Form mengirim balik avatar yang sama; tidak ada yang diubah
+            data.pop('avatar_url', None)
+        image_bytes = None
+        if is_data_url(avatar_data) and 'avatar_url' in data:
+            # Base64 tidak disimpan di tabel users; diproses lewat pipeline upload
+            try:
+                image_bytes = decode_data_url(avatar_data, file_upload_service.MAX_FILE_SIZE)
+            except InvalidImage as e:
+                # abort: return biasa akan ikut di-marshal profile_model
+                api.abort(400, f"Gagal memproses base64: {e}")
+            data.pop('avatar_url')
         if 'avatar_url' in data:
             avatar_data = data['avatar_url']
             if avatar_data:
@@ -144,10 +166,16 @@ class ProfileResource(Resource):
                 current_user.major = data['major']
             if 'avatar_url' in data:
                 current_user.avatar_url = data['avatar_url']
+                avatar_jobs.supersede_pending(current_user)
                 print(f"Avatar URL updated for user {current_user.id}: {current_user.avatar_url[:100] if current_user.avatar_url else 'None'}...")
             
             db.session.commit()
             print(f"Profile updated successfully for user {current_user.id}")
+            if image_bytes is not None:
+                # Avatar lama tetap dipakai sampai job selesai (lihat Location)
+                job = avatar_jobs.enqueue(current_user, image_bytes)
+                return current_user.to_dict_with_profile(), 202, {
+                    'Location': url_for('profile_avatar_job_resource', job_id=job.id)}
             result = current_user.to_dict_with_profile()
             print(f"Returning avatar_url: {result.get('avatar_url', 'Not found')[:100] if result.get('avatar_url') else 'None'}...")
             return result, 200
@@ -196,14 +224,41 @@ class PasswordUpdateResource(Resource):
             db.session.rollback()
             return {"message": "Gagal mengupdate password"}, 500
 
+# Model untuk job pemrosesan avatar
+avatar_job_model = api.model('AvatarJob', {
+    'id': fields.String(description='ID Job'),
+    'status': fields.String(description='pending/processing/done/failed/superseded'),
+    'error': fields.String(description='Pesan error jika gagal'),
+    'avatar_url': fields.String(description='URL avatar baru (jika done)'),
+    'avatar_renditions': fields.Raw(description='URL avatar baru per ukuran (jika done)'),
+    'created_at': fields.String(description='Tanggal Dibuat'),
+    'updated_at': fields.String(description='Tanggal Diupdate')
+})
+
+
+def avatar_job_accepted(job):
+    """Response 202 untuk job avatar yang baru dibuat"""
+    status_url = url_for('profile_avatar_job_resource', job_id=job.id)
+    host = request.headers.get('Host', 'localhost:5000')
+    return {
+        "message": "Avatar sedang diproses",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": status_url,
+        "job": job.to_dict(host)
+    }, 202, {'Location': status_url}
+
+
 @api.route('/avatar')
 class AvatarUpdateResource(Resource):
     @jwt_required()
-    @api.doc(security='jsonWebToken', description="Update avatar user yang sedang login.")
+    @api.doc(security='jsonWebToken', description="Update avatar user yang sedang login. "
+                                                  "Base64 diproses di background (202 + job id).")
     @api.expect(api.model('AvatarUpdate', {
         'avatar_url': fields.String(required=True, description='URL Avatar Baru atau Base64 Data')
     }))
-    @api.marshal_with(message_model)
+    @api.response(200, 'Avatar URL disimpan', message_model)
+    @api.response(202, 'Avatar base64 sedang diproses')
     def put(self):
         """[TERPROTEKSI] Update avatar user yang sedang login dengan URL atau Base64."""
         current_user = get_current_user()
@@ -218,30 +273,22 @@ class AvatarUpdateResource(Resource):
         avatar_data = data['avatar_url']
         
         try:
-            # Handle base64 data dengan konversi ke file JPG
-            if avatar_data and avatar_data.startswith('data:image/'):
-                # Convert base64 to local file
-                result = self._save_base64_as_file(avatar_data, current_user.id)
-                if result['success']:
-                    # Remove old avatar file if exists
-                    if current_user.avatar_type == 'local' and current_user.avatar_filename:
-                        upload_service = FileUploadService(current_app)
-                        upload_service.delete_file(current_user.avatar_filename)
-                    
-                    # Update user with local file
-                    current_user.set_avatar_local(result['filename'])
-                    db.session.commit()
-                    return {"message": "Avatar berhasil diupdate sebagai file lokal JPG"}, 200
-                else:
-                    return {"message": f"Gagal memproses base64: {result['error']}"}, 400
+            # Base64 tidak disimpan inline; diproses ke rendition di background
+            if is_data_url(avatar_data):
+                try:
+                    image_bytes = decode_data_url(avatar_data, file_upload_service.MAX_FILE_SIZE)
+                except InvalidImage as e:
+                    return {"message": f"Gagal memproses base64: {e}"}, 400
+                job = avatar_jobs.enqueue(current_user, image_bytes)
+                return avatar_job_accepted(job)
             else:
                 # Handle URL avatar
                 # Remove old avatar file if exists
                 if current_user.avatar_type == 'local' and current_user.avatar_filename:
-                    upload_service = FileUploadService(current_app)
-                    upload_service.delete_file(current_user.avatar_filename)
+                    avatar_store.release(current_user.avatar_filename)
                 
                 current_user.set_avatar_url(avatar_data)
+                avatar_jobs.supersede_pending(current_user)
                 db.session.commit()
                 return {"message": "Avatar berhasil diupdate dengan URL"}, 200
             
@@ -249,63 +296,12 @@ class AvatarUpdateResource(Resource):
             db.session.rollback()
             print(f"Error updating avatar: {str(e)}")
             return {"message": "Gagal mengupdate avatar"}, 500
-    
-    def _save_base64_as_file(self, base64_data, user_id):
-        """Convert base64 data to JPG file"""
-        try:
-            # Parse base64 data
-            header, image_data = base64_data.split(',', 1)
-            image_bytes = base64.b64decode(image_data)
-            
-            # Create PIL Image
-            from PIL import Image
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Convert to RGB if necessary (for PNG with transparency)
-            if image.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                if image.mode == 'P':
-                    image = image.convert('RGBA')
-                background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-                image = background
-            
-            # Resize to avatar size
-            avatar_size = (300, 300)
-            image.thumbnail(avatar_size, Image.Resampling.LANCZOS)
-            
-            # Create square image with white background
-            square_img = Image.new('RGB', avatar_size, (255, 255, 255))
-            offset = ((avatar_size[0] - image.size[0]) // 2, (avatar_size[1] - image.size[1]) // 2)
-            square_img.paste(image, offset)
-            
-            # Generate filename
-            from datetime import datetime
-            import uuid
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            unique_id = str(uuid.uuid4())[:8]
-            filename = f"avatar_{user_id}_{timestamp}_{unique_id}.jpg"
-            
-            # Save as JPG
-            upload_folder = os.path.join(current_app.root_path, 'static', 'uploads', 'avatars')
-            os.makedirs(upload_folder, exist_ok=True)
-            filepath = os.path.join(upload_folder, filename)
-            
-            square_img.save(filepath, 'JPEG', quality=85, optimize=True)
-            
-            return {
-                'success': True,
-                'filename': filename,
-                'filepath': filepath
-            }
-            
-        except Exception as e:
-            print(f"Error saving base64 as file: {e}")
-            return {'success': False, 'error': str(e)}
 
 @api.route('/avatar/upload')
 class AvatarFileUploadResource(Resource):
     @jwt_required()
-    @api.doc(security='jsonWebToken', description="Upload file avatar sebagai JPG.")
+    @api.doc(security='jsonWebToken', description="Upload file avatar; diproses ke JPG di background (202 + job id).")
+    @api.response(202, 'Avatar sedang diproses')
     def post(self):
         """[TERPROTEKSI] Upload file avatar dan simpan sebagai JPG."""
         current_user = get_current_user()
@@ -320,39 +316,39 @@ class AvatarFileUploadResource(Resource):
             file = request.files['avatar']
             if file.filename == '':
                 return {"message": "Tidak ada file yang dipilih"}, 400
+
+            if not file_upload_service.allowed_file(file.filename):
+                return {"message": "File type not allowed"}, 400
             
-            # Initialize upload service
-            upload_service = FileUploadService(current_app)
-            
-            # Save uploaded file
-            result = upload_service.save_uploaded_file(file, current_user.id)
-            
-            if result['success']:
-                # Remove old avatar file if exists
-                if current_user.avatar_type == 'local' and current_user.avatar_filename:
-                    upload_service.delete_file(current_user.avatar_filename)
-                
-                # Update user with new local file
-                current_user.set_avatar_local(result['filename'])
-                db.session.commit()
-                
-                # Return full URL
-                host = request.headers.get('Host', 'localhost:5000')
-                avatar_url = current_user.get_avatar_url(host)
-                
-                return {
-                    "message": "Avatar berhasil diupload sebagai JPG",
-                    "filename": result['filename'],
-                    "avatar_url": avatar_url
-                }, 200
-            else:
-                return {"message": result['error']}, 400
+            # Format dan dimensi dicek dari header sebelum ada decode
+            try:
+                inspect_image(file.stream)
+            except InvalidImage as e:
+                return {"message": str(e)}, 400
+
+            # Avatar lama tetap dipakai sampai job selesai
+            job = avatar_jobs.enqueue(current_user, file.stream)
+            return avatar_job_accepted(job)
                 
         except Exception as e:
             db.session.rollback()
             print(f"Error uploading avatar file: {str(e)}")
             return {"message": "Gagal mengupload avatar"}, 500
 
+@api.route('/avatar/jobs/<string:job_id>')
+class AvatarJobResource(Resource):
+    @jwt_required()
+    @api.doc(security='jsonWebToken', description="Status job pemrosesan avatar.")
+    @api.response(200, 'Success', avatar_job_model)
+    def get(self, job_id):
+        """[TERPROTEKSI] Status job avatar milik user yang sedang login."""
+        job = db.session.get(AvatarJob, job_id)
+        if job is None or str(job.user_id) != str(get_jwt_identity()):
+            return {"message": "Job tidak ditemukan"}, 404
+        # Worker pemilik job bisa mati tanpa sempat menandainya gagal
+        avatar_jobs.expire_stale(job)
+        return job.to_dict(request.headers.get('Host', 'localhost:5000')), 200
+
 @api.route('/avatar/remove')
 class AvatarRemoveResource(Resource):
     @jwt_required()
@@ -367,11 +363,11 @@ class AvatarRemoveResource(Resource):
         try:
             # Remove file if it's local
             if current_user.avatar_type == 'local' and current_user.avatar_filename:
-                upload_service = FileUploadService(current_app)
-                upload_service.delete_file(current_user.avatar_filename)
+                avatar_store.release(current_user.avatar_filename)
             
             # Remove avatar from database
             current_user.remove_avatar()
+            avatar_jobs.supersede_pending(current_user)
             db.session.commit()
             
             return {"message": "Avatar berhasil dihapus"}, 200
@@ -388,8 +384,7 @@ class StaticAvatarResource(Resource):
     def get(self, filename):
         """Serve file avatar statis."""
         try:
-            upload_folder = os.path.join(current_app.root_path, 'static', 'uploads', 'avatars')
-            return send_from_directory(upload_folder, filename)
+            return avatar_delivery.send(filename, request.accept_mimetypes)
         except Exception as e:
             print(f"Error serving static file: {str(e)}")
             return {"message": "File tidak ditemukan"}, 404
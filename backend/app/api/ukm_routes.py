@@ -1,9 +1,22 @@
-from flask import request
+from flask import current_app, request, Response, stream_with_context
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import or_
 from ..models import db, UKM, Category, User
 from ..decorators import admin_required, permission_required, get_current_user
-import random
+from ..serializers import InvalidFields, compile_serializer, parse_fields
+from ..query_profiles import UKM_FIELDS, UKM_WITH_CATEGORY, loader_profile, profiled_query
+from ..services.catalog_cache import catalog_cache, request_cache_key
+from ..services.pagination import InvalidCursor, decode_cursor, escape_like, get_page_size, keyset_page
+from ..services.search_index import ukm_search_index
+from ..services.ukm_sampler import active_ukm_sampler
+from ..services.category_summary import MAX_NEWEST_PER_CATEGORY, active_ukm_counts, newest_ukms_per_category
+from ..services.ukm_bulk import (FORMATS, BatchError, UkmImporter, apply_batch_delete, apply_batch_update,
+                                 export_rows, generate_csv, generate_ndjson)
+from ..services.row_readers import iter_csv_rows, iter_ndjson_rows
+from sqlalchemy.exc import SQLAlchemyError
+import io
+import time
 
 api = Namespace('ukm', description='Operasi terkait UKM')
 
@@ -15,6 +28,20 @@ category_model = api.model('Category', {
     'icon': fields.String(description='Icon Kategori')
 })
 
+# Model ringkas UKM untuk daftar UKM terbaru per kategori
+ukm_brief_model = api.model('UKMBrief', {
+    'id': fields.Integer(description='ID UKM'),
+    'nama': fields.String(description='Nama UKM'),
+    'logo_url': fields.String(description='URL Logo UKM'),
+    'created_at': fields.String(description='Tanggal dibuat')
+})
+
+# Model kategori dengan agregat UKM (opsional)
+category_summary_model = api.inherit('CategorySummary', category_model, {
+    'ukm_count': fields.Integer(description='Jumlah UKM aktif (include_counts=true)'),
+    'newest_ukms': fields.List(fields.Nested(ukm_brief_model), description='UKM aktif terbaru (newest=N)')
+})
+
 # Model untuk UKM
 ukm_model = api.model('UKM', {
     'id': fields.Integer(description='ID UKM'),
@@ -32,6 +59,38 @@ ukm_model = api.model('UKM', {
     'updated_at': fields.String(description='Tanggal diupdate')
 })
 
+# Serializer satu kali jalan dari atribut ORM, field mengikuti model di atas
+serialize_category = compile_serializer(category_model)
+serialize_ukm = compile_serializer(ukm_model)
+
+# Model untuk satu halaman daftar UKM (cursor pagination)
+ukm_page_model = api.model('UKMPage', {
+    'items': fields.List(fields.Nested(ukm_model), description='Daftar UKM pada halaman ini'),
+    'next_cursor': fields.String(description='Cursor untuk halaman berikutnya (null jika halaman terakhir)')
+})
+
+# Model untuk hasil pencarian UKM
+ukm_search_hit_model = api.inherit('UKMSearchHit', ukm_model, {
+    'score': fields.Float(description='Skor relevansi BM25 (null selama index pencarian masih dibangun)')
+})
+
+ukm_search_model = api.model('UKMSearchResult', {
+    'query': fields.String(description='Query pencarian'),
+    'items': fields.List(fields.Nested(ukm_search_hit_model), description='UKM urut berdasarkan relevansi')
+})
+
+# Pilihan urutan daftar UKM: nama sort -> (kolom, descending)
+UKM_SORTS = {
+    'id': (UKM.id, False),
+    'nama': (UKM.nama, False),
+    '-nama': (UKM.nama, True),
+    'newest': (UKM.created_at, True),
+    'oldest': (UKM.created_at, False)
+}
+
+RANDOM_MAX_LIMIT = 50
+RANDOM_DEFAULT_WINDOW = 300
+
 # Model untuk input UKM baru (tanpa ID)
 ukm_input_model = api.model('UKMInput', {
     'nama': fields.String(required=True, description='Nama UKM'),
@@ -45,6 +104,37 @@ ukm_input_model = api.model('UKMInput', {
     'kegiatan_rutin': fields.String(description='Kegiatan Rutin UKM')
 })
 
+# Model untuk laporan import UKM massal
+ukm_import_error_model = api.model('UKMImportError', {
+    'row': fields.Integer(description='Nomor baris di file'),
+    'errors': fields.List(fields.String, description='Daftar kesalahan baris ini')
+})
+
+ukm_import_report_model = api.model('UKMImportReport', {
+    'inserted': fields.Integer(description='Jumlah UKM yang berhasil ditambahkan'),
+    'failed': fields.Integer(description='Jumlah baris yang gagal'),
+    'errors': fields.List(fields.Nested(ukm_import_error_model), description='Kesalahan per baris'),
+    'errors_truncated': fields.Boolean(description='True jika daftar errors dipotong')
+})
+
+# Model untuk batch update / delete UKM
+ukm_batch_operation_model = api.model('UKMBatchOperation', {
+    'ids': fields.List(fields.Integer, required=True, description='ID UKM yang diubah'),
+    'set': fields.Raw(required=True, description='Field yang diubah, mis. {"is_active": false}')
+})
+
+ukm_batch_patch_model = api.model('UKMBatchPatch', {
+    'operations': fields.List(fields.Nested(ukm_batch_operation_model), required=True)
+})
+
+ukm_batch_delete_model = api.model('UKMBatchDelete', {
+    'ids': fields.List(fields.Integer, required=True, description='ID UKM yang dihapus (soft delete)')
+})
+
+ukm_batch_result_model = api.model('UKMBatchResult', {
+    'results': fields.List(fields.Raw, description='Hasil per ID: {id, status[, operation]}')
+})
+
 # Model untuk response message
 message_model = api.model('Message', {
     'message': fields.String(description='Pesan response')
@@ -52,12 +142,65 @@ message_model = api.model('Message', {
 
 @api.route('/')
 class UkmList(Resource):
-    @api.doc(description="Mengambil semua daftar UKM (Publik).")
-    @api.marshal_list_with(ukm_model)
+    @api.doc(description="Mengambil daftar UKM dengan cursor pagination (Publik).", params={
+        'cursor': 'Cursor dari next_cursor halaman sebelumnya',
+        'limit': 'Jumlah UKM per halaman (default 20, maks 100)',
+        'category_id': 'Filter berdasarkan ID kategori',
+        'q': 'Cari di nama dan deskripsi UKM',
+        'sort': f"Urutan: {', '.join(UKM_SORTS)} (default id)",
+        'all': 'true untuk format lama: semua UKM sebagai list tanpa pagination',
+        'fields': 'Field yang dikirim, dipisah koma (mis. id,nama,category,logo_url)'
+    })
+    @api.response(200, 'Success', ukm_page_model)
+    @api.response(304, 'Tidak berubah sejak ETag di If-None-Match')
+    @api.response(400, 'Parameter tidak valid', message_model)
+    @loader_profile(UKM_WITH_CATEGORY, max_queries=1)
     def get(self):
-        """[PUBLIK] Mengambil daftar semua UKM."""
-        ukms = UKM.query.filter_by(is_active=True).all()
-        return [ukm.to_dict() for ukm in ukms], 200
+        """[PUBLIK] Mengambil daftar UKM."""
+        return catalog_cache.respond(request_cache_key('ukm_list'), self._build_list)
+
+    def _build_list(self):
+        try:
+            fields = parse_fields(request.args.get('fields'), serialize_ukm)
+        except InvalidFields as e:
+            return {"message": str(e)}, 400
+        serialize = serialize_ukm.only(fields) if fields else serialize_ukm
+
+        sort = request.args.get('sort', 'id')
+        if sort not in UKM_SORTS:
+            return {"message": f"Sort tidak valid. Pilihan: {', '.join(UKM_SORTS)}"}, 400
+        sort_column, descending = UKM_SORTS[sort]
+
+        # Kolom sort ikut dimuat untuk membuat next_cursor
+        query = profiled_query(UKM, UKM_FIELDS, fields, extra=(sort_column.key,)).filter_by(is_active=True)
+
+        category_id = request.args.get('category_id', type=int)
+        if category_id is not None:
+            query = query.filter(UKM.category_id == category_id)
+
+        q = request.args.get('q', '').strip()
+        if q:
+            pattern = f"%{escape_like(q)}%"
+            query = query.filter(or_(UKM.nama.ilike(pattern, escape='\\'), UKM.deskripsi.ilike(pattern, escape='\\')))
+
+        # Format lama (opt-in): semua UKM sekaligus sebagai list
+        if request.args.get('all', '').lower() in ('1', 'true', 'yes'):
+            ukms = query.order_by(UKM.id).all()
+            return [serialize(ukm) for ukm in ukms], 200
+
+        try:
+            cursor = request.args.get('cursor')
+            ukms, next_cursor = keyset_page(
+                query, sort_column, UKM.id,
+                descending=descending,
+                cursor=decode_cursor(cursor) if cursor else None,
+                limit=get_page_size(request.args),
+                tag=sort
+            )
+        except InvalidCursor:
+            return {"message": "Cursor tidak valid"}, 400
+
+        return {'items': [serialize(ukm) for ukm in ukms], 'next_cursor': next_cursor}, 200
 
     @admin_required
     @api.doc(security='jsonWebToken', description="Menambah UKM baru (Admin only).")
@@ -95,14 +238,28 @@ class UkmList(Resource):
 
 @api.route('/<int:id>')
 class Ukm(Resource):
-    @api.doc(description="Mengambil detail satu UKM berdasarkan ID (Publik).")
-    @api.marshal_with(ukm_model, code=200)
+    @api.doc(description="Mengambil detail satu UKM berdasarkan ID (Publik).", params={
+        'fields': 'Field yang dikirim, dipisah koma (mis. id,nama,deskripsi)'
+    })
+    @api.response(200, 'Success', ukm_model)
+    @api.response(304, 'Tidak berubah sejak ETag di If-None-Match')
+    @api.response(400, 'Parameter tidak valid', message_model)
     @api.response(404, 'UKM tidak ditemukan', message_model)
+    @loader_profile(UKM_WITH_CATEGORY, max_queries=1)
     def get(self, id):
         """[PUBLIK] Mengambil detail satu UKM."""
-        ukm = UKM.query.get(id)
+        return catalog_cache.respond(request_cache_key(f'ukm:{id}'), lambda: self._build_detail(id))
+
+    def _build_detail(self, id):
+        try:
+            fields = parse_fields(request.args.get('fields'), serialize_ukm)
+        except InvalidFields as e:
+            return {"message": str(e)}, 400
+        serialize = serialize_ukm.only(fields) if fields else serialize_ukm
+
+        ukm = profiled_query(UKM, UKM_FIELDS, fields, extra=('is_active',)).get(id)
         if ukm and ukm.is_active:
-            return ukm.to_dict(), 200
+            return serialize(ukm), 200
         return {"message": "UKM tidak ditemukan"}, 404
 
     @admin_required
@@ -163,29 +320,219 @@ class Ukm(Resource):
 
 @api.route('/categories')
 class CategoryList(Resource):
-    @api.doc(description="Mengambil semua kategori UKM (Publik).")
-    @api.marshal_list_with(category_model)
+    @api.doc(description="Mengambil semua kategori UKM (Publik).", params={
+        'include_counts': 'true untuk menyertakan jumlah UKM aktif per kategori (ukm_count)',
+        'newest': f'Sertakan N UKM aktif terbaru per kategori (newest_ukms, maks {MAX_NEWEST_PER_CATEGORY})'
+    })
+    @api.response(200, 'Success', [category_summary_model])
+    @api.response(304, 'Tidak berubah sejak ETag di If-None-Match')
+    @loader_profile(max_queries=3)
     def get(self):
         """[PUBLIK] Mengambil daftar semua kategori UKM."""
-        categories = Category.query.all()
-        return [category.to_dict() for category in categories], 200
+        return catalog_cache.respond(request_cache_key('categories'), self._build_categories)
+
+    def _build_categories(self):
+        include_counts = request.args.get('include_counts', '').lower() in ('1', 'true', 'yes')
+        newest = max(0, min(request.args.get('newest', 0, type=int), MAX_NEWEST_PER_CATEGORY))
+        return category_list(include_counts=include_counts, newest=newest), 200
+
+def category_list(include_counts=False, newest=0):
+    """Daftar kategori (serialized), opsional dengan jumlah UKM dan UKM terbaru"""
+    categories = Category.query.all()
+    if not include_counts and not newest:
+        return [serialize_category(category) for category in categories]
+
+    counts = active_ukm_counts() if include_counts else {}
+    newest_ukms = newest_ukms_per_category(newest) if newest else {}
+
+    result = []
+    for category in categories:
+        item = serialize_category(category)
+        if include_counts:
+            item['ukm_count'] = counts.get(category.id, 0)
+        if newest:
+            item['newest_ukms'] = newest_ukms.get(category.id, [])
+        result.append(item)
+    return result
+
+@api.route('/batch')
+class UkmBatch(Resource):
+    @admin_required
+    @api.doc(security='jsonWebToken', description="Ubah banyak UKM sekaligus dalam satu transaksi (Admin only).")
+    @api.expect(ukm_batch_patch_model)
+    @api.response(200, 'Hasil per ID', ukm_batch_result_model)
+    @api.response(400, 'Request tidak valid', message_model)
+    def patch(self):
+        """[TERPROTEKSI - ADMIN] Batch update UKM."""
+        data = request.get_json(silent=True) or {}
+        try:
+            return {"results": apply_batch_update(data.get('operations'))}, 200
+        except BatchError as e:
+            return {"message": str(e)}, 400
+        except SQLAlchemyError:
+            return {"message": "Gagal mengupdate UKM"}, 500
+
+    @admin_required
+    @api.doc(security='jsonWebToken', description="Hapus (soft delete) banyak UKM sekaligus (Admin only).")
+    @api.expect(ukm_batch_delete_model)
+    @api.response(200, 'Hasil per ID', ukm_batch_result_model)
+    @api.response(400, 'Request tidak valid', message_model)
+    def delete(self):
+        """[TERPROTEKSI - ADMIN] Batch delete UKM."""
+        data = request.get_json(silent=True) or {}
+        try:
+            return {"results": apply_batch_delete(data.get('ids'))}, 200
+        except BatchError as e:
+            return {"message": str(e)}, 400
+        except SQLAlchemyError:
+            return {"message": "Gagal menghapus UKM"}, 500
+
+@api.route('/import')
+class UkmImport(Resource):
+    @admin_required
+    @api.doc(security='jsonWebToken', description=(
+        "Import UKM massal dari CSV atau NDJSON (Admin only). Kirim sebagai multipart "
+        "field 'file' atau langsung sebagai body request. Kategori bisa lewat "
+        "category_id atau nama kategori di kolom category."
+    ), params={'format': 'csv atau ndjson (default: dari nama file / Content-Type)'})
+    @api.response(200, 'Laporan import', ukm_import_report_model)
+    @api.response(400, 'Format tidak dikenali', message_model)
+    @api.response(413, 'File melebihi UKM_IMPORT_MAX_BYTES')
+    def post(self):
+        """[TERPROTEKSI - ADMIN] Import UKM massal."""
+        # Harus di-set sebelum request.files / request.stream dibaca
+        request.max_content_length = current_app.config['UKM_IMPORT_MAX_BYTES']
+        upload = request.files.get('file')
+        if upload:
+            stream, filename, mimetype = upload.stream, upload.filename or '', upload.mimetype
+        else:
+            stream, filename, mimetype = request.stream, '', request.mimetype
+
+        file_format = request.args.get('format') or _detect_format(filename, mimetype)
+        if file_format not in FORMATS:
+            return {"message": f"Format tidak dikenali. Pilihan: {', '.join(FORMATS)}"}, 400
+
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        rows = iter_csv_rows(text) if file_format == 'csv' else iter_ndjson_rows(text)
+        return UkmImporter().run(rows), 200
+
+@api.route('/export')
+class UkmExport(Resource):
+    @admin_required
+    @api.doc(security='jsonWebToken', description="Export semua UKM sebagai CSV atau NDJSON (Admin only).", params={
+        'format': 'csv (default) atau ndjson',
+        'include_inactive': 'true untuk ikut mengekspor UKM nonaktif'
+    })
+    @api.response(400, 'Format tidak dikenali', message_model)
+    def get(self):
+        """[TERPROTEKSI - ADMIN] Export UKM."""
+        file_format = request.args.get('format', 'csv')
+        if file_format not in FORMATS:
+            return {"message": f"Format tidak dikenali. Pilihan: {', '.join(FORMATS)}"}, 400
+
+        include_inactive = request.args.get('include_inactive', '').lower() in ('1', 'true', 'yes')
+        rows = export_rows(include_inactive=include_inactive)
+        if file_format == 'csv':
+            body, mimetype = generate_csv(rows), 'text/csv'
+        else:
+            body, mimetype = generate_ndjson(rows), 'application/x-ndjson'
+
+        return Response(stream_with_context(body), mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename=ukm_export.{file_format}'
+        })
+
+def _detect_format(filename, mimetype):
+    """Tebak format file import dari ekstensi atau Content-Type"""
+    filename = filename.lower()
+    if filename.endswith(('.ndjson', '.jsonl')) or mimetype in ('application/x-ndjson', 'application/jsonl'):
+        return 'ndjson'
+    if filename.endswith('.csv') or mimetype in ('text/csv', 'application/csv'):
+        return 'csv'
+    return None
+
+@api.route('/search')
+class UkmSearch(Resource):
+    @api.doc(description="Pencarian full-text UKM dengan ranking BM25 (Publik).", params={
+        'q': 'Kata kunci pencarian',
+        'limit': 'Jumlah hasil maksimum (default 20, maks 100)',
+        'category_id': 'Filter berdasarkan ID kategori'
+    })
+    @api.response(200, 'Success', ukm_search_model)
+    @api.response(400, 'Query kosong', message_model)
+    @loader_profile(UKM_WITH_CATEGORY, max_queries=2)
+    def get(self):
+        """[PUBLIK] Mencari UKM berdasarkan nama, deskripsi, prestasi dan kegiatan rutin."""
+        q = request.args.get('q', '').strip()
+        if not q:
+            return {"message": "Parameter q wajib diisi"}, 400
+
+        limit = get_page_size(request.args)
+        category_id = request.args.get('category_id', type=int)
+        hits = ukm_search_index.search(q, limit=limit, category_id=category_id)
+        if hits is None:
+            # Index masih dibangun di latar: pencarian LIKE sederhana tanpa skor
+            return {'query': q, 'items': [serialize_ukm(ukm) for ukm in like_search(q, limit, category_id)]}, 200
+        if not hits:
+            return {'query': q, 'items': []}, 200
+
+        # Ambil hanya UKM yang masuk hasil, dengan satu query IN
+        ukms = profiled_query(UKM).filter(UKM.id.in_([doc_id for doc_id, _ in hits]), UKM.is_active == True).all()
+        by_id = {ukm.id: ukm for ukm in ukms}
+
+        items = []
+        for doc_id, score in hits:
+            ukm = by_id.get(doc_id)
+            if ukm:
+                item = serialize_ukm(ukm)
+                item['score'] = round(score, 4)
+                items.append(item)
+
+        return {'query': q, 'items': items}, 200
+
+def like_search(q, limit, category_id=None):
+    """UKM aktif yang nama/deskripsinya memuat setiap kata di `q`"""
+    query = profiled_query(UKM).filter(UKM.is_active == True)
+    if category_id is not None:
+        query = query.filter(UKM.category_id == category_id)
+    for term in q.split():
+        pattern = f"%{escape_like(term)}%"
+        query = query.filter(or_(UKM.nama.ilike(pattern, escape='\\'), UKM.deskripsi.ilike(pattern, escape='\\')))
+    return query.order_by(UKM.nama, UKM.id).limit(limit).all()
 
 @api.route('/random')
 class RandomUkmList(Resource):
-    @api.doc(description="Mengambil rekomendasi UKM random untuk homepage (Publik).")
-    @api.marshal_list_with(ukm_model)
+    @api.doc(description="Mengambil rekomendasi UKM random untuk homepage (Publik).", params={
+        'limit': 'Jumlah UKM (default 4, maks 50)',
+        'seeded': 'true agar hasil sama untuk semua request dalam satu jendela waktu (bisa di-cache)',
+        'window': 'Lebar jendela waktu mode seeded dalam detik (default 300)'
+    })
+    @api.response(200, 'Success', [ukm_model])
+    @loader_profile(UKM_WITH_CATEGORY, max_queries=2)
     def get(self):
         """[PUBLIK] Mengambil rekomendasi UKM random."""
         # Get limit parameter (default 4 for homepage)
-        limit = request.args.get('limit', 4, type=int)
-        
-        # Get all active UKMs
-        all_ukms = UKM.query.filter_by(is_active=True).all()
-        
-        if not all_ukms:
-            return [], 200
-            
-        # Randomize and limit
-        random_ukms = random.sample(all_ukms, min(limit, len(all_ukms)))
-        
-        return [ukm.to_dict() for ukm in random_ukms], 200
\ No newline at end of file
+        limit = max(1, min(request.args.get('limit', 4, type=int), RANDOM_MAX_LIMIT))
+
+        headers = {}
+        seed = None
+        if request.args.get('seeded', '').lower() in ('1', 'true', 'yes'):
+            window = max(1, request.args.get('window', RANDOM_DEFAULT_WINDOW, type=int))
+            seed, max_age = random_seed(window, limit)
+            headers['Cache-Control'] = f"public, max-age={max_age}"
+
+        return random_ukms(limit, seed=seed), 200, headers
+
+def random_seed(window, limit):
+    """Seed untuk jendela waktu saat ini dan sisa detik jendela tersebut"""
+    now = int(time.time())
+    return f"{now // window}:{window}:{limit}", window - now % window
+
+def random_ukms(limit, seed=None):
+    """Pilih ID dari array in-memory, lalu ambil hanya UKM terpilih"""
+    ids = active_ukm_sampler.sample(limit, seed=seed)
+    if not ids:
+        return []
+
+    ukms = profiled_query(UKM).filter(UKM.id.in_(ids), UKM.is_active == True).all()
+    by_id = {ukm.id: ukm for ukm in ukms}
+    return [serialize_ukm(by_id[ukm_id]) for ukm_id in ids if ukm_id in by_id]
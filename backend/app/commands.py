@@ -0,0 +1,80 @@
+import csv
+import os
+import sys
+import click
+from flask.cli import with_appcontext
+from .services.avatar_migration import Base64AvatarMigrator
+from .services.row_readers import iter_csv_rows
+from .services.user_provisioning import StudentProvisioner
+
+
+@click.command('provision-students')
+@click.argument('csv_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--role', default='user', show_default=True, help='Role untuk semua akun')
+@click.option('--workers', type=int, default=os.cpu_count() or 1, show_default=True,
+              help='Jumlah proses untuk hashing password')
+@click.option('--report', 'report_file', type=click.Path(dir_okay=False),
+              help='Tulis hasil per baris (termasuk password awal) ke file CSV ini')
+@with_appcontext
+def provision_students(csv_file, role, workers, report_file):
+    """Buat akun mahasiswa massal dari CSV (username, email, student_id, faculty)."""
+    provisioner = StudentProvisioner(role_name=role, hash_workers=workers)
+    if provisioner.role is None:
+        raise click.ClickException(f"Role '{role}' tidak ditemukan")
+
+    with open(csv_file, encoding='utf-8-sig', newline='') as f:
+        report = provisioner.run(iter_csv_rows(f))
+
+    click.echo(f"{report['created']} akun dibuat, {report['failed']} baris gagal")
+    for result in report['results']:
+        if result['status'] == 'error':
+            click.echo(f"  baris {result['row']} ({result['username']}): {'; '.join(result['errors'])}", err=True)
+
+    if report_file or any('initial_password' in result for result in report['results']):
+        out = open(report_file, 'w', newline='', encoding='utf-8') if report_file else sys.stdout
+        try:
+            writer = csv.DictWriter(out, fieldnames=('row', 'username', 'status', 'errors', 'initial_password'))
+            writer.writeheader()
+            for result in report['results']:
+                writer.writerow({**result, 'errors': '; '.join(result.get('errors', []))})
+        finally:
+            if report_file:
+                out.close()
+
+
+@click.command('migrate-base64-avatars')
+@click.option('--batch-size', type=int, default=100, show_default=True, help='Jumlah user per batch (satu commit per batch)')
+@click.option('--workers', type=int, default=os.cpu_count() or 1, show_default=True,
+              help='Jumlah proses untuk decode/encode gambar')
+@click.option('--start-after', type=int, default=0, help='Lanjutkan dari user dengan id di atas nilai ini')
+@click.option('--limit', type=int, help='Maksimal jumlah user yang diproses')
+@click.option('--dry-run', is_flag=True, help='Hanya periksa data, tanpa menulis file atau database')
+@click.option('--clear-invalid', is_flag=True, help='Hapus avatar base64 yang bukan gambar valid')
+@with_appcontext
+def migrate_base64_avatars(batch_size, workers, start_after, limit, dry_run, clear_invalid):
+    """Pindahkan avatar base64 di tabel users ke file avatar lokal."""
+    migrator = Base64AvatarMigrator(batch_size=batch_size, workers=workers,
+                                    dry_run=dry_run, clear_invalid=clear_invalid)
+    total = migrator.pending_count(start_after)
+    if limit is not None:
+        total = min(total, limit)
+    click.echo(f"{total} user dengan avatar base64{' (dry run)' if dry_run else ''}")
+
+    def progress(migrator):
+        done = sum(migrator.counts.values())
+        click.echo(f"  {done}/{total} diproses, id terakhir {migrator.last_id} "
+                   f"(migrated {migrator.counts['migrated']}, cleared {migrator.counts['cleared']}, "
+                   f"invalid {migrator.counts['invalid']})")
+
+    report = migrator.run(start_after=start_after, limit=limit, progress=progress)
+    for result in report['results']:
+        if 'error' in result:
+            click.echo(f"  user {result['user_id']} ({result['username']}): {result['error']}", err=True)
+    click.echo(f"Selesai: {report['migrated']} dimigrasi, {report['cleared']} dibersihkan, "
+               f"{report['invalid']} tidak valid, {report['bytes_freed'] / 1024:.1f} KB dibebaskan "
+               f"(id terakhir {report['last_id']})")
+
+
+def init_app(app):
+    app.cli.add_command(provision_students)
+    app.cli.add_command(migrate_base64_avatars)
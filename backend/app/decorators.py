@@ -1,7 +1,39 @@
 from functools import wraps
-from flask import jsonify
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
 from .models import User
+from .query_profiles import USER_WITH_ROLE, profiled_query
+from .services.token_versions import token_versions
+
+def _auth_state(current_user_id):
+    """
+    Role dan permission user untuk otorisasi: langsung dari klaim JWT jika
+    versi token sama dengan versi terkini user di token_versions, selain
+    itu (cache kosong, token lama, atau role/status/password berubah) dari
+    database. Mengembalikan (role_name, permissions, error_response).
+    """
+    try:
+        user_id = int(current_user_id)
+    except (TypeError, ValueError):
+        return None, None, ({"msg": "Token tidak valid"}, 401)
+
+    claims = get_jwt()
+    version = claims.get('ver')
+    # Penanda dibaca sebelum query supaya perubahan dari worker lain di antaranya tidak ter-cache
+    marker = token_versions.marker()
+    if version is not None and token_versions.get(user_id, marker) == version:
+        return claims.get('role'), claims.get('permissions') or [], None
+
+    user = User.query.options(*USER_WITH_ROLE.options_for(User)).get(user_id)
+
+    if not user:
+        return None, None, ({"msg": "User tidak ditemukan"}, 404)
+
+    token_versions.put(user.id, user.token_version, marker)
+
+    if not user.is_active:
+        return None, None, ({"msg": "User tidak aktif"}, 403)
+
+    return (user.role.name if user.role else None), user.get_permissions(), None
 
 def role_required(*allowed_roles):
     """
@@ -18,23 +50,19 @@ def role_required(*allowed_roles):
             current_user_id = get_jwt_identity()
             
             if not current_user_id:
-                return jsonify({"msg": "Token tidak valid"}), 401
-            
-            user = User.query.get(current_user_id)
-            
-            if not user:
-                return jsonify({"msg": "User tidak ditemukan"}), 404
+                return {"msg": "Token tidak valid"}, 401
             
-            if not user.is_active:
-                return jsonify({"msg": "User tidak aktif"}), 403
+            role_name, _, error = _auth_state(current_user_id)
+            if error:
+                return error
             
-            if not user.role:
-                return jsonify({"msg": "User tidak memiliki role"}), 403
+            if not role_name:
+                return {"msg": "User tidak memiliki role"}, 403
             
-            if user.role.name not in allowed_roles:
-                return jsonify({
+            if role_name not in allowed_roles:
+                return {
                     "msg": f"Access denied. Required roles: {', '.join(allowed_roles)}"
-                }), 403
+                }, 403
             
             return f(*args, **kwargs)
         return decorated_function
@@ -62,22 +90,16 @@ def permission_required(permission):
             current_user_id = get_jwt_identity()
             
             if not current_user_id:
-                return jsonify({"msg": "Token tidak valid"}), 401
-            
-            user = User.query.get(current_user_id)
-            
-            if not user:
-                return jsonify({"msg": "User tidak ditemukan"}), 404
-            
-            if not user.is_active:
-                return jsonify({"msg": "User tidak aktif"}), 403
+                return {"msg": "Token tidak valid"}, 401
             
-            user_permissions = user.get_permissions()
+            _, user_permissions, error = _auth_state(current_user_id)
+            if error:
+                return error
             
             if permission not in user_permissions:
-                return jsonify({
+                return {
                     "msg": f"Access denied. Required permission: {permission}"
-                }), 403
+                }, 403
             
             return f(*args, **kwargs)
         return decorated_function
@@ -88,7 +110,7 @@ def get_current_user():
     try:
         current_user_id = get_jwt_identity()
         if current_user_id:
-            return User.query.get(current_user_id)
+            return profiled_query(User).get(current_user_id)
         return None
     except:
         return None
@@ -1,9 +1,22 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+import hashlib
+import time
+from .services.password_hasher import password_hasher
+from .services.file_upload import avatar_key, rendition_urls
 
 db = SQLAlchemy()
 
+
+def create_missing_indexes(*models):
+    """
+    db.create_all() tidak menambah index ke tabel yang sudah ada; buat
+    index model yang belum ada di database (deployment lama).
+    """
+    for model in models:
+        for index in model.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+
 # Tabel Roles
 class Role(db.Model):
     __tablename__ = 'roles'
@@ -16,14 +29,21 @@ class Role(db.Model):
     # Relationship
     users = db.relationship('User', backref='role', lazy=True)
     
-    def to_dict(self):
-        return {
+    def to_dict(self, user_count=None):
+        """
+        Convert role ke dictionary. user_count hanya disertakan jika diberikan
+        (lihat services/role_counts.py); role di dalam response user tidak
+        membawa jumlah user.
+        """
+        role_dict = {
             'id': self.id,
             'name': self.name,
             'description': self.description,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'user_count': len(self.users)
+            'created_at': self.created_at.isoformat() if self.created_at else None
         }
+        if user_count is not None:
+            role_dict['user_count'] = user_count
+        return role_dict
     
     def get_users(self):
         """Dapatkan semua user dengan role ini"""
@@ -103,6 +123,15 @@ class Category(db.Model):
 # Tabel Users
 class User(db.Model):
     __tablename__ = 'users'
+    # Index untuk daftar user admin: filter role/status/fakultas, sort keyset
+    # (kolom, id) dan pencarian prefix (username & email sudah unique index)
+    __table_args__ = (
+        db.Index('ix_users_role_active_id', 'role_id', 'is_active', 'id'),
+        db.Index('ix_users_faculty_id', 'faculty', 'id'),
+        db.Index('ix_users_created_id', 'created_at', 'id'),
+        db.Index('ix_users_full_name', 'full_name'),
+        db.Index('ix_users_student_id', 'student_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -120,7 +149,7 @@ class User(db.Model):
     faculty = db.Column(db.String(100), nullable=True)
     major = db.Column(db.String(100), nullable=True)  # Jurusan
     # Avatar fields
-    avatar_url = db.Column(db.String(255), nullable=True)  # For external URLs or base64
+    avatar_url = db.Column(db.String(255), nullable=True)  # URL eksternal; base64 lama dipindah oleh `flask migrate-base64-avatars`
     avatar_filename = db.Column(db.String(255), nullable=True)  # For local files
     avatar_type = db.Column(db.String(10), default='url')  # 'url', 'local', 'base64'
     
@@ -130,12 +159,19 @@ class User(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def set_password(self, password):
-        """Set password dengan hashing"""
-        self.password_hash = generate_password_hash(password)
+        """Set password dengan hashing (di process pool password_hasher)"""
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
         """Verifikasi password"""
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+    
+    def rehash_password_if_needed(self, password):
+        """Hash ulang password (yang sudah terverifikasi) jika cost hashing berubah"""
+        if password_hasher.needs_rehash(self.password_hash):
+            self.set_password(password)
+            return True
+        return False
     
     def has_role(self, role_name):
         """Check apakah user memiliki role tertentu"""
@@ -195,6 +231,25 @@ class User(db.Model):
         
         return permissions
     
+    @property
+    def token_version(self):
+        """
+        Versi token: sidik jari state otorisasi user. Berubah saat role,
+        status aktif atau password berubah, sehingga klaim JWT lama dianggap basi.
+        """
+        state = f'{self.role_id}:{int(bool(self.is_active))}:{self.password_hash}'
+        return hashlib.blake2b(state.encode('utf-8'), digest_size=8).hexdigest()
+    
+    def get_token_claims(self):
+        """Klaim JWT untuk otorisasi tanpa query database (lihat decorators.py)"""
+        return {
+            'role': self.role.name if self.role else None,
+            'permissions': self.get_permissions(),
+            'ver': self.token_version,
+            # Waktu terbit dalam milidetik untuk "cabut semua sesi" (iat hanya per detik)
+            'iat_ms': int(time.time() * 1000)
+        }
+    
     def to_dict(self, include_permissions=False):
         """Convert user object to dictionary"""
         user_dict = {
@@ -230,6 +285,7 @@ class User(db.Model):
             'faculty': self.faculty,
             'major': self.major,
             'avatar_url': self.get_avatar_url(),  # Use get_avatar_url method
+            'avatar_renditions': self.get_avatar_renditions(),
             'avatar_filename': self.avatar_filename,
             'avatar_type': self.avatar_type,
             'role': self.role.to_dict() if self.role else None,
@@ -279,6 +335,10 @@ class User(db.Model):
     def get_avatar_url(self, request_host=None):
         """Get full avatar URL based on type"""
         if self.avatar_type == 'local' and self.avatar_filename:
+            renditions = self.get_avatar_renditions(request_host)
+            if renditions:
+                # Rendition terbesar; format dipilih route static dari header Accept
+                return renditions[max(renditions, key=int)]
             # Return URL for local file
             if request_host:
                 return f"http://{request_host}/static/uploads/avatars/{self.avatar_filename}"
@@ -291,6 +351,17 @@ class User(db.Model):
             # No avatar
             return None
     
+    @property
+    def avatar_hash(self):
+        """Key set rendition avatar lokal (hash isi gambar); URL avatar hanya berubah jika ini berubah"""
+        return avatar_key(self.avatar_filename) if self.avatar_type == 'local' else None
+
+    def get_avatar_renditions(self, request_host=None):
+        """{ukuran px: URL} untuk avatar lokal multi-rendition (srcset), None jika tidak ada"""
+        if self.avatar_type != 'local':
+            return None
+        return rendition_urls(self.avatar_filename, f"http://{request_host}" if request_host else '')
+
     def set_avatar_local(self, filename):
         """Set avatar sebagai local file"""
         self.avatar_filename = filename
@@ -323,6 +394,12 @@ class User(db.Model):
 # Tabel UKM
 class UKM(db.Model):
     __tablename__ = 'ukms'
+    # Index untuk keyset pagination daftar UKM aktif
+    __table_args__ = (
+        db.Index('ix_ukms_active_nama_id', 'is_active', 'nama', 'id'),
+        db.Index('ix_ukms_active_created_id', 'is_active', 'created_at', 'id'),
+        db.Index('ix_ukms_category_active', 'category_id', 'is_active'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nama = db.Column(db.String(100), nullable=False)
@@ -355,4 +432,75 @@ class UKM(db.Model):
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
\ No newline at end of file
+        }
+
+# Tabel token yang dicabut (logout / cabut semua sesi)
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # JTI token yang di-logout; NULL untuk "cabut semua sesi" user
+    jti = db.Column(db.String(36), unique=True, nullable=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    # Cabut semua sesi: token yang terbit sampai waktu ini (epoch milidetik) tidak berlaku
+    issued_before = db.Column(db.BigInteger, nullable=True)
+    # Setelah waktu ini semua token yang dicabut entry ini sudah expired; entry boleh dihapus
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti or "all"} user={self.user_id}>'
+
+
+# Tabel job pemrosesan avatar (upload diproses di background)
+class AvatarJob(db.Model):
+    __tablename__ = 'avatar_jobs'
+    __table_args__ = (
+        db.Index('ix_avatar_jobs_user_created', 'user_id', 'created_at'),
+        db.Index('ix_avatar_jobs_status', 'status'),
+    )
+
+    STATUSES = ('pending', 'processing', 'done', 'failed', 'superseded')
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    # Nama file hasil (<hash>-300.jpg) setelah diproses
+    result_filename = db.Column(db.String(255), nullable=True)
+    error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self, request_host=None):
+        data = {
+            'id': self.id,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+        if self.status == 'done' and self.result_filename:
+            renditions = rendition_urls(self.result_filename, f"http://{request_host}" if request_host else '')
+            data['avatar_url'] = renditions[max(renditions, key=int)]
+            data['avatar_renditions'] = renditions
+        return data
+
+    def __repr__(self):
+        return f'<AvatarJob {self.id} user={self.user_id} {self.status}>'
+
+
+# Tabel set rendition avatar content-addressed (nama file = hash isi) dengan reference count
+class AvatarBlob(db.Model):
+    __tablename__ = 'avatar_blobs'
+    __table_args__ = (
+        db.Index('ix_avatar_blobs_refcount_updated', 'refcount', 'updated_at'),
+    )
+
+    hash = db.Column(db.String(64), primary_key=True)
+    # Jumlah user yang memakai set ini; 0 = kandidat dihapus setelah masa tenggang
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AvatarBlob {self.hash} refs={self.refcount}>'
@@ -0,0 +1,172 @@
+from functools import wraps
+from flask import g, has_request_context, current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import configure_mappers, joinedload, load_only
+from .models import UKM, User
+
+# Backref (UKM.category, User.role) baru ada setelah mapper dikonfigurasi
+configure_mappers()
+
+
+class LoaderProfile:
+    """
+    Kumpulan opsi eager-loading per model untuk satu jenis response.
+
+    Usage:
+    UKM_CARD = LoaderProfile('ukm_card', {UKM: [joinedload(UKM.category)]})
+    """
+
+    def __init__(self, name, options):
+        self.name = name
+        self.options = options
+
+    def options_for(self, model, relationships=None):
+        """
+        Opsi untuk model. Jika `relationships` diisi (sparse fieldset), hanya
+        opsi yang berawal dari relasi tersebut yang dipakai.
+        """
+        options = self.options.get(model, [])
+        if relationships is None:
+            return options
+        return [option for option in options if option.path[1].key in relationships]
+
+    def __repr__(self):
+        return f'<LoaderProfile {self.name}>'
+
+
+class FieldProjection:
+    """
+    Petakan nama field response ke kolom ORM untuk sparse fieldset, supaya
+    SELECT hanya memuat kolom yang diminta (load_only). Field relasi
+    (mis. 'category') memuat foreign key-nya; eager-load dari loader profile
+    hanya dipasang untuk relasi yang diminta.
+
+    `requires` untuk field turunan yang butuh beberapa kolom.
+
+    Usage:
+    USER_FIELDS = FieldProjection(User, requires={'avatar_url': ('avatar_url', 'avatar_type')})
+    query = profiled_query(User, USER_FIELDS, ('id', 'avatar_url'))
+    """
+
+    def __init__(self, model, requires=None):
+        self.model = model
+        self.requires = requires or {}
+        mapper = inspect(model)
+        self.columns = {attr.key for attr in mapper.column_attrs}
+        self.relationships = {rel.key: rel for rel in mapper.relationships}
+
+    def resolve(self, field_names, extra=()):
+        """(kolom, relasi) yang dibutuhkan field_names; `extra` = kolom tambahan (mis. kolom sort)"""
+        columns = set()
+        relationships = set()
+        for name in tuple(field_names) + tuple(extra):
+            for attr in self.requires.get(name, (name,)):
+                if attr in self.columns:
+                    columns.add(attr)
+                elif attr in self.relationships:
+                    relationships.add(attr)
+                    columns.update(column.key for column in self.relationships[attr].local_columns)
+        return columns, relationships
+
+    def load_only(self, columns):
+        return load_only(*(getattr(self.model, column) for column in sorted(columns)))
+
+
+# UKM + kategori dalam satu JOIN (UKM.to_dict memakai category.to_dict)
+UKM_WITH_CATEGORY = LoaderProfile('ukm_with_category', {
+    UKM: [joinedload(UKM.category)]
+})
+
+# User + role (cek role/permission dan role di response user)
+USER_WITH_ROLE = LoaderProfile('user_with_role', {
+    User: [joinedload(User.role)]
+})
+
+# Field response -> kolom untuk sparse fieldset (?fields=)
+UKM_FIELDS = FieldProjection(UKM)
+USER_FIELDS = FieldProjection(User, requires={
+    'avatar_url': ('avatar_url', 'avatar_type', 'avatar_filename'),
+    'avatar_renditions': ('avatar_type', 'avatar_filename')
+})
+
+
+def loader_profile(*profiles, max_queries=None):
+    """
+    Decorator untuk method Resource: pasang loader profile dan (opsional)
+    batas jumlah query SQL untuk satu request.
+
+    Usage:
+    @loader_profile(UKM_WITH_CATEGORY, max_queries=1)
+    def get(self):
+        ukms = profiled_query(UKM).all()
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            g.loader_profiles = profiles
+            if max_queries is not None:
+                g.query_budget = max_queries
+                g.query_budget_endpoint = f.__qualname__
+            return f(*args, **kwargs)
+        decorated_function.loader_profiles = profiles
+        decorated_function.max_queries = max_queries
+        return decorated_function
+    return decorator
+
+
+def profiled_query(model, projection=None, fields=None, extra=()):
+    """
+    Query untuk model dengan opsi eager-loading dari profile endpoint aktif.
+
+    Dengan `projection` (FieldProjection) dan `fields` (sparse fieldset),
+    hanya kolom dan relasi untuk field tersebut yang dimuat.
+    """
+    query = model.query
+    relationships = None
+    if projection is not None and fields is not None:
+        columns, relationships = projection.resolve(fields, extra)
+        query = query.options(projection.load_only(columns))
+    if has_request_context():
+        for profile in g.get('loader_profiles', ()):
+            options = profile.options_for(model, relationships)
+            if options:
+                query = query.options(*options)
+    return query
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Endpoint menjalankan lebih banyak query SQL dari batas yang dideklarasikan"""
+
+
+def init_query_guard(app):
+    """
+    Hitung statement SQL per request. Jika endpoint mendeklarasikan
+    max_queries dan batasnya terlampaui: raise QueryBudgetExceeded saat
+    testing (atau QUERY_BUDGET_ENFORCE=True), selain itu hanya log warning.
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _count_query):
+        event.listen(Engine, 'before_cursor_execute', _count_query)
+
+    @app.before_request
+    def reset_query_count():
+        g.query_count = 0
+
+    @app.after_request
+    def check_query_budget(response):
+        budget = g.get('query_budget')
+        count = g.get('query_count', 0)
+        if current_app.testing:
+            response.headers['X-Query-Count'] = str(count)
+        if budget is not None and count > budget:
+            message = (f"{g.get('query_budget_endpoint')} menjalankan {count} query SQL "
+                       f"(batas {budget})")
+            if current_app.testing or current_app.config.get('QUERY_BUDGET_ENFORCE'):
+                raise QueryBudgetExceeded(message)
+            current_app.logger.warning(message)
+        return response
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'query_count' in g:
+        g.query_count += 1
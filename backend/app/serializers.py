@@ -0,0 +1,130 @@
+from datetime import date, datetime
+from functools import lru_cache
+from flask_restx import fields
+
+_DATES = (date, datetime)
+
+
+def _to_str(value):
+    # Kolom tanggal dikirim sebagai ISO 8601, sama seperti to_dict()
+    if isinstance(value, _DATES):
+        return value.isoformat()
+    return str(value)
+
+
+class InvalidFields(ValueError):
+    """Parameter ?fields= berisi nama field yang tidak dikenal"""
+
+
+def compile_serializer(model, sources=None, only=None):
+    """
+    Compile model Swagger (api.model) menjadi fungsi serializer satu kali jalan.
+
+    Fungsi hasil compile membaca atribut ORM (atau kolom Row hasil query)
+    langsung dan menulis dict output dengan field yang sama persis seperti
+    `marshal(obj.to_dict(), model)`, tanpa membuat dict perantara.
+
+    `sources` opsional: {nama_field: fungsi(obj)} untuk field yang nilainya
+    bukan atribut langsung (mis. Raw yang berisi dict role).
+
+    `only` opsional: tuple nama field untuk sparse fieldset. Serializer
+    lengkap punya method `only(field_names)` yang mengembalikan (dan
+    meng-cache) serializer untuk subset field tersebut.
+
+    Usage:
+    serialize_ukm = compile_serializer(ukm_model)
+    data = [serialize_ukm(ukm) for ukm in ukms]
+    """
+    sources = sources or {}
+    namespace = {'_to_str': _to_str, '_str': str}
+    lines = ['def serialize(obj):']
+    items = []
+    field_names = []
+
+    for index, (key, field) in enumerate(_model_fields(model).items()):
+        if only is not None and key not in only:
+            continue
+        field_names.append(key)
+        var = f'v{index}'
+        if key in sources:
+            namespace[f'_source{index}'] = sources[key]
+            lines.append(f'    {var} = _source{index}(obj)')
+            items.append(f'{key!r}: {var}')
+            continue
+
+        attribute = field.attribute if isinstance(field.attribute, str) else key
+        if attribute.isidentifier():
+            lines.append(f'    {var} = obj.{attribute}')
+        else:
+            lines.append(f'    {var} = getattr(obj, {attribute!r}, None)')
+        items.append(f'{key!r}: {_format_expression(field, var, index, namespace)}')
+
+    lines.append('    return {' + ', '.join(items) + '}')
+    exec('\n'.join(lines), namespace)
+
+    serialize = namespace['serialize']
+    serialize.model = model
+    serialize.field_names = tuple(field_names)
+    if only is None:
+        serialize.only = lru_cache(maxsize=64)(
+            lambda names: compile_serializer(model, sources, only=names))
+    return serialize
+
+
+def parse_fields(value, serializer):
+    """
+    Parse parameter `?fields=id,nama` menjadi tuple nama field (urut sesuai
+    model) untuk `serializer.only()`. None jika parameter tidak diisi.
+    """
+    if value is None:
+        return None
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    if not requested:
+        return None
+    unknown = requested.difference(serializer.field_names)
+    if unknown:
+        raise InvalidFields(f"Field tidak dikenal: {', '.join(sorted(unknown))}. "
+                            f"Pilihan: {', '.join(serializer.field_names)}")
+    return tuple(name for name in serializer.field_names if name in requested)
+
+
+def _model_fields(model):
+    return getattr(model, 'resolved', model)
+
+
+def _format_expression(field, var, index, namespace):
+    """Ekspresi Python yang memformat nilai `var` sesuai tipe field restx"""
+    default = getattr(field, 'default', None)
+    if default is not None and not isinstance(field, fields.Nested):
+        namespace[f'_default{index}'] = default
+        var_or_default = f'(_default{index} if {var} is None else {var})'
+    else:
+        var_or_default = var
+
+    if isinstance(field, fields.Nested):
+        namespace[f'_nested{index}'] = compile_serializer(field.nested)
+        if field.allow_null:
+            return f'(None if {var} is None else _nested{index}({var}))'
+        # Sama seperti restx: nilai None tetap jadi dict berisi None
+        namespace[f'_empty{index}'] = {name: None for name in _model_fields(field.nested)}
+        return f'(dict(_empty{index}) if {var} is None else _nested{index}({var}))'
+
+    if isinstance(field, fields.List) and isinstance(field.container, fields.Nested):
+        namespace[f'_item{index}'] = compile_serializer(field.container.nested)
+        return f'(None if {var} is None else [_item{index}(item) for item in {var}])'
+
+    if isinstance(field, fields.Boolean):
+        return f'(None if {var_or_default} is None else bool({var_or_default}))'
+    if isinstance(field, fields.Integer):
+        return f'(None if {var_or_default} is None else int({var_or_default}))'
+    if isinstance(field, fields.Float):
+        return f'(None if {var_or_default} is None else float({var_or_default}))'
+    if isinstance(field, fields.String):
+        return (f'(None if {var_or_default} is None else '
+                f'{var_or_default} if {var_or_default}.__class__ is _str else _to_str({var_or_default}))')
+    if type(field) is fields.Raw:
+        return var_or_default
+
+    # Tipe field lain: pakai formatter restx (lebih lambat tapi tetap benar)
+    namespace[f'_field{index}'] = field
+    return f'(None if {var_or_default} is None else _field{index}.format({var_or_default}))'
@@ -0,0 +1,140 @@
+import hashlib
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from flask import current_app, request, send_from_directory
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+from .file_upload import AVATAR_CACHE_MAX_AGE, file_upload_service
+
+
+class CachedAvatar:
+    """Isi file avatar di memori beserta ETag dan (mtime, size) saat dibaca"""
+
+    __slots__ = ('data', 'etag', 'mimetype', 'signature')
+
+    def __init__(self, data, mimetype, signature):
+        self.data = data
+        self.etag = hashlib.blake2b(data, digest_size=16).hexdigest()
+        self.mimetype = mimetype
+        self.signature = signature
+
+
+class AvatarDelivery:
+    """
+    Pengiriman file avatar untuk /static/uploads/avatars/<filename>.
+
+    AVATAR_DELIVERY:
+      'send_file'        file dibaca dan dikirim worker Python (default)
+      'x-accel-redirect' hanya header X-Accel-Redirect (AVATAR_ACCEL_PREFIX +
+                         nama file); nginx mengirim isi file dari location internal
+      'x-sendfile'       hanya header X-Sendfile (path absolut) untuk
+                         Apache mod_xsendfile / lighttpd
+      'memory'           tanpa proxy: file terpanas disimpan di LRU memori
+                         (AVATAR_CACHE_BYTES total, file di atas
+                         AVATAR_CACHE_MAX_FILE tetap lewat send_file)
+                         dengan ETag dan 304 untuk If-None-Match
+
+    Nama file avatar tidak pernah ditimpa (hash isi atau uuid), jadi semua
+    mode memberi Cache-Control immutable. Entry LRU tetap dicek dengan
+    os.stat supaya file yang dihapus garbage collector tidak ikut dilayani.
+    """
+
+    MODES = ('send_file', 'x-accel-redirect', 'x-sendfile', 'memory')
+
+    def __init__(self):
+        self.mode = 'send_file'
+        self.accel_prefix = '/_avatars/'
+        self.max_bytes = 0
+        self.max_file = 0
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('AVATAR_DELIVERY', 'send_file')
+        app.config.setdefault('AVATAR_ACCEL_PREFIX', '/_avatars/')
+        app.config.setdefault('AVATAR_CACHE_BYTES', 32 * 1024 * 1024)
+        app.config.setdefault('AVATAR_CACHE_MAX_FILE', 512 * 1024)
+        if app.config['AVATAR_DELIVERY'] not in self.MODES:
+            raise ValueError(f"AVATAR_DELIVERY harus salah satu dari: {', '.join(self.MODES)}")
+        self.mode = app.config['AVATAR_DELIVERY']
+        self.accel_prefix = app.config['AVATAR_ACCEL_PREFIX'].rstrip('/') + '/'
+        self.max_bytes = app.config['AVATAR_CACHE_BYTES']
+        self.max_file = min(app.config['AVATAR_CACHE_MAX_FILE'], self.max_bytes)
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def send(self, filename, accept_mimetypes):
+        """Response file avatar (rendition tanpa ekstensi: WebP/JPEG sesuai Accept)"""
+        served, negotiated = file_upload_service.resolve_rendition(filename, accept_mimetypes)
+        path = safe_join(file_upload_service.UPLOAD_FOLDER, served)
+        if path is None:
+            raise NotFound()
+
+        if self.mode in ('x-accel-redirect', 'x-sendfile'):
+            if not os.path.isfile(path):
+                raise NotFound()
+            header, value = (('X-Accel-Redirect', self.accel_prefix + served) if self.mode == 'x-accel-redirect'
+                             else ('X-Sendfile', os.path.abspath(path)))
+            response = current_app.response_class(mimetype=self._mimetype(served), headers={header: value})
+        elif self.mode == 'memory':
+            response = self._send_cached(path, served)
+        else:
+            response = send_from_directory(file_upload_service.UPLOAD_FOLDER, served, max_age=AVATAR_CACHE_MAX_AGE)
+
+        response.cache_control.max_age = AVATAR_CACHE_MAX_AGE
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        if negotiated:
+            response.vary.add('Accept')
+        return response
+
+    def _send_cached(self, path, served):
+        entry = self._get(path, served)
+        if entry is None:
+            return send_from_directory(file_upload_service.UPLOAD_FOLDER, served, max_age=AVATAR_CACHE_MAX_AGE)
+        response = current_app.response_class(entry.data, mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+        return response.make_conditional(request)
+
+    def _get(self, path, served):
+        """Entry LRU untuk `path`, dibaca dari disk jika belum ada; None jika file terlalu besar"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise NotFound()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry.signature == signature:
+                self.entries.move_to_end(path)
+                return entry
+        if stat.st_size > self.max_file:
+            return None
+
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            raise NotFound()
+        entry = CachedAvatar(data, self._mimetype(served), signature)
+        with self.lock:
+            previous = self.entries.pop(path, None)
+            if previous is not None:
+                self.size -= len(previous.data)
+            self.entries[path] = entry
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.data)
+        return entry
+
+    @staticmethod
+    def _mimetype(filename):
+        return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+avatar_delivery = AvatarDelivery()
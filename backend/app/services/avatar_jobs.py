@@ -0,0 +1,179 @@
+import os
+import threading
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from .file_upload import AVATAR_RENDITIONS, file_upload_service, render_avatar_set, rendition_filename
+from .avatar_store import avatar_store
+from .process_pool import create_process_pool
+
+
+class AvatarJobQueue:
+    """
+    Pemrosesan avatar (decode Pillow, thumbnail LANCZOS, encode rendition
+    WebP + JPEG) di process pool, supaya request upload langsung dijawab 202.
+    Bytes upload dikirim langsung ke pool dari memori, tanpa file mentah.
+
+    Setiap upload punya record AvatarJob: processing -> done / failed. Hasilnya disimpan content-addressed (lihat avatar_store).
+    Avatar lama tetap dipakai sampai job selesai; job yang selesai setelah
+    job lebih baru untuk user yang sama, atau setelah avatar dihapus/diganti
+    URL (supersede_pending), ditandai 'superseded'.
+    Bytes upload hanya ada di memori worker, jadi job 'processing' yang
+    lebih lama dari AVATAR_JOB_TIMEOUT detik (worker mati/restart) ditandai
+    gagal: saat startup oleh fail_interrupted(), dan saat statusnya
+    ditanyakan oleh expire_stale().
+
+    AVATAR_WORKERS = 0 (testing), atau process pool yang tidak bisa dibuat,
+    memproses langsung di thread request.
+    """
+
+    INTERRUPTED_ERROR = 'Pemrosesan terputus, silakan upload ulang'
+
+    def __init__(self):
+        self.app = None
+        self.workers = 0
+        self.stale_after = timedelta(seconds=120)
+        self.executor = None
+        self.executor_pid = None
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('AVATAR_WORKERS', min(2, os.cpu_count() or 1))
+        app.config.setdefault('AVATAR_JOB_TIMEOUT', 120)
+        self.app = app
+        self.stale_after = timedelta(seconds=app.config['AVATAR_JOB_TIMEOUT'])
+        self.workers = 0 if app.testing else app.config['AVATAR_WORKERS']
+        self.shutdown()
+
+    def _executor(self):
+        # Pool dibuat per proses (setelah fork worker gunicorn/uwsgi); None = proses inline
+        with self.lock:
+            if self.executor_pid != os.getpid():
+                self.executor = create_process_pool(self.workers, self.app.logger)
+                self.executor_pid = os.getpid()
+            return self.executor
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None and self.executor_pid == os.getpid():
+                self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+            self.executor_pid = None
+
+    def enqueue(self, user, source):
+        """
+        Buat record job dan jadwalkan pemrosesan `source` (stream upload
+        atau bytes yang headernya sudah dicek inspect_image). Kembalikan
+        AvatarJob (processing, atau sudah selesai jika diproses inline).
+        """
+        from ..models import db, AvatarJob
+
+        job = AvatarJob(id=uuid.uuid4().hex, user_id=user.id, status='processing')
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+
+        executor = self._executor() if self.workers else None
+        if executor is not None:
+            data = source if isinstance(source, bytes) else source.read()
+            try:
+                future = executor.submit(render_avatar_set, data, file_upload_service.UPLOAD_FOLDER)
+            except BrokenProcessPool:
+                # Pool rusak; dibuat ulang untuk upload berikutnya, yang ini diproses inline
+                self.shutdown()
+                source = data
+            else:
+                future.add_done_callback(lambda future: self._on_done(job_id, data, future))
+                return job
+
+        # Inline: decode langsung dari stream request
+        try:
+            key = render_avatar_set(source, file_upload_service.UPLOAD_FOLDER)
+        except Exception as e:
+            self._finish(job_id, error=e)
+        else:
+            self._finish(job_id, source, key=key)
+        return job
+
+    def _on_done(self, job_id, data, future):
+        # Dipanggil di thread internal executor; butuh app context sendiri
+        error = future.exception() if not future.cancelled() else RuntimeError('Dibatalkan')
+        with self.app.app_context():
+            self._finish(job_id, data, key=None if error else future.result(), error=error)
+
+    def _finish(self, job_id, source=None, key=None, error=None):
+        from ..models import db, AvatarJob, User
+
+        job = db.session.get(AvatarJob, job_id)
+        if job is None:
+            return
+        if job.status != 'processing':
+            # Sudah ditandai gagal (expire_stale) atau superseded (avatar diganti/dihapus
+            # selama diproses); hasilnya tidak dipakai, set-nya dibersihkan collect_garbage
+            if key is not None:
+                avatar_store.register(key)
+                db.session.commit()
+            return
+
+        if error is not None:
+            if self.app is not None:
+                self.app.logger.warning('Avatar job %s gagal: %r', job_id, error)
+            job.status = 'failed'
+            job.error = 'Gagal memproses gambar; pastikan file adalah gambar yang valid'
+            db.session.commit()
+            return
+
+        newer = AvatarJob.query.filter(
+            AvatarJob.user_id == job.user_id,
+            AvatarJob.created_at > job.created_at,
+            AvatarJob.status == 'done'
+        ).first()
+        user = db.session.get(User, job.user_id)
+        if newer is not None or user is None:
+            # Set tanpa pemakai dihapus collect_garbage setelah masa tenggang
+            avatar_store.register(key)
+            job.result_filename = rendition_filename(key, max(AVATAR_RENDITIONS), 'jpg')
+            job.status = 'superseded'
+        else:
+            job.result_filename = avatar_store.assign(user, key)
+            job.status = 'done'
+        db.session.commit()
+
+        # Set yang sama bisa terhapus garbage collector tepat sebelum retain; tulis ulang
+        if job.status == 'done' and file_upload_service.missing_renditions(key):
+            if hasattr(source, 'seek'):
+                source.seek(0)
+            render_avatar_set(source, file_upload_service.UPLOAD_FOLDER)
+        avatar_store.collect_garbage()
+
+    def supersede_pending(self, user):
+        """Job user yang belum selesai tidak boleh lagi mengganti avatar; commit oleh pemanggil"""
+        from ..models import AvatarJob
+
+        AvatarJob.query.filter(AvatarJob.user_id == user.id,
+                               AvatarJob.status.in_(('pending', 'processing'))).update(
+            {'status': 'superseded'}, synchronize_session=False)
+
+    def expire_stale(self, job):
+        """Tandai gagal job 'processing' milik worker yang sudah tidak memprosesnya; kembalikan job"""
+        from ..models import db
+
+        if job.status in ('pending', 'processing') and job.updated_at < datetime.utcnow() - self.stale_after:
+            job.status = 'failed'
+            job.error = self.INTERRUPTED_ERROR
+            db.session.commit()
+        return job
+
+    def fail_interrupted(self):
+        """Job yang terputus (restart) ditandai gagal; butuh app context"""
+        from ..models import db, AvatarJob
+
+        stale_before = datetime.utcnow() - self.stale_after
+        AvatarJob.query.filter(AvatarJob.status.in_(('pending', 'processing')),
+                               AvatarJob.updated_at < stale_before).update(
+            {'status': 'failed', 'error': self.INTERRUPTED_ERROR}, synchronize_session=False)
+        db.session.commit()
+        avatar_store.collect_garbage()
+
+
+avatar_jobs = AvatarJobQueue()
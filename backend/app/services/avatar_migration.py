@@ -0,0 +1,132 @@
+from sqlalchemy import func
+from ..models import db, User
+from .file_upload import InvalidImage, decode_data_url, file_upload_service, render_avatar_set
+from .avatar_store import avatar_store
+from .process_pool import create_process_pool
+
+
+def _render(data, folder):
+    # Dijalankan di process pool; error dikembalikan sebagai teks supaya satu gambar rusak tidak menghentikan batch
+    try:
+        return render_avatar_set(data, folder), None
+    except Exception as e:
+        return None, f'Gagal memproses gambar: {e.__class__.__name__}'
+
+
+class Base64AvatarMigrator:
+    """
+    Pindahkan avatar base64 inline (users.avatar_url = 'data:image/...')
+    ke set rendition lokal lewat pipeline upload yang sama (decode_data_url
+    + render_avatar_set + avatar_store.assign).
+
+    User dipindai per `batch_size` baris dengan keyset (id > id terakhir),
+    satu commit per batch. Baris yang sudah dimigrasi tidak lagi cocok
+    dengan filter, jadi perintah yang terputus cukup dijalankan ulang;
+    `start_after` melewati id yang sudah diproses. Data URL yang bukan
+    gambar valid dibiarkan (dilaporkan), atau dihapus dengan
+    `clear_invalid`. `dry_run` hanya men-decode dan memeriksa header.
+    """
+
+    def __init__(self, batch_size=100, workers=None, dry_run=False, clear_invalid=False):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.dry_run = dry_run
+        self.clear_invalid = clear_invalid
+        self.results = []
+        self.counts = {'migrated': 0, 'cleared': 0, 'invalid': 0}
+        self.bytes_freed = 0
+        self.last_id = 0
+
+    @staticmethod
+    def pending_count(start_after=0):
+        return db.session.query(func.count(User.id)).filter(
+            User.avatar_url.like('data:%'), User.id > start_after).scalar()
+
+    def run(self, start_after=0, limit=None, progress=None):
+        """Proses semua user dengan avatar base64; `progress(migrator)` dipanggil setelah setiap batch"""
+        self.last_id = start_after
+        executor = None
+        if self.workers and self.workers > 1 and not self.dry_run:
+            # None jika pool tidak bisa dibuat; batch lalu diproses inline
+            executor = create_process_pool(self.workers)
+        try:
+            processed = 0
+            while limit is None or processed < limit:
+                size = self.batch_size if limit is None else min(self.batch_size, limit - processed)
+                users = User.query.filter(User.avatar_url.like('data:%'), User.id > self.last_id) \
+                    .order_by(User.id).limit(size).all()
+                if not users:
+                    break
+                last_id = users[-1].id
+                self._migrate_batch(users, executor)
+                processed += len(users)
+                self.last_id = last_id
+                if progress is not None:
+                    progress(self)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return self.report()
+
+    def _migrate_batch(self, users, executor):
+        renders = []
+        for user in users:
+            if user.avatar_type == 'local' and user.avatar_filename:
+                # Sisa base64 lama di samping avatar lokal; tidak pernah ditampilkan
+                self._record(user, 'cleared')
+                if not self.dry_run:
+                    user.avatar_url = None
+                continue
+            try:
+                data = decode_data_url(user.avatar_url, file_upload_service.MAX_FILE_SIZE)
+            except InvalidImage as e:
+                self._invalid(user, str(e))
+                continue
+            renders.append((user, data))
+
+        if self.dry_run:
+            for user, _ in renders:
+                self._record(user, 'migrated')
+            db.session.rollback()
+            db.session.expunge_all()
+            return
+
+        folder = file_upload_service.UPLOAD_FOLDER
+        if executor is not None:
+            outcomes = executor.map(_render, [data for _, data in renders], [folder] * len(renders))
+        else:
+            outcomes = (_render(data, folder) for _, data in renders)
+        for (user, _), (key, error) in zip(renders, outcomes):
+            if error is not None:
+                self._invalid(user, error)
+                continue
+            self._record(user, 'migrated')
+            avatar_store.assign(user, key)
+        db.session.commit()
+        # Lepas objek batch dari session supaya memori tetap datar untuk tabel besar
+        db.session.expunge_all()
+
+    def _invalid(self, user, message):
+        if self.clear_invalid:
+            self._record(user, 'cleared', message)
+            if not self.dry_run:
+                user.remove_avatar()
+        else:
+            self._record(user, 'invalid', message)
+
+    def _record(self, user, status, error=None):
+        self.counts[status] += 1
+        if status != 'invalid':
+            self.bytes_freed += len(user.avatar_url)
+        result = {'user_id': user.id, 'username': user.username, 'status': status}
+        if error:
+            result['error'] = error
+        self.results.append(result)
+
+    def report(self):
+        return {
+            **self.counts,
+            'last_id': self.last_id,
+            'bytes_freed': self.bytes_freed,
+            'results': self.results
+        }
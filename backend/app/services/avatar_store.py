@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from .file_upload import AVATAR_RENDITIONS, avatar_key, file_upload_service, rendition_filename, rendition_files
+
+
+class AvatarStore:
+    """
+    Reference count set rendition avatar content-addressed (AvatarBlob).
+
+    Gambar yang sama dipakai beberapa user (atau diupload ulang) disimpan
+    sekali. Refcount naik saat set dipasang ke user dan turun saat avatar
+    diganti/dihapus; semua perubahan ikut transaksi pemanggil. Set dengan
+    refcount 0 baru dihapus collect_garbage() setelah GRACE, supaya job
+    yang sedang memproses gambar yang sama tidak kehilangan filenya.
+    """
+
+    GRACE = timedelta(minutes=10)
+
+    def register(self, key):
+        """Pastikan baris AvatarBlob ada untuk set yang baru ditulis"""
+        self._adjust(key, 0)
+
+    def retain(self, key):
+        self._adjust(key, 1)
+
+    def assign(self, user, key):
+        """
+        Pasang set `key` sebagai avatar lokal user: lepas avatar lokal lama,
+        naikkan refcount set baru. Kembalikan avatar_filename; commit oleh pemanggil.
+        """
+        filename = rendition_filename(key, max(AVATAR_RENDITIONS), 'jpg')
+        self.register(key)
+        if user.avatar_type == 'local' and user.avatar_filename == filename:
+            # Gambar sama dengan avatar sekarang: URL tidak berubah
+            return filename
+        if user.avatar_type == 'local' and user.avatar_filename:
+            self.release(user.avatar_filename)
+        self.retain(key)
+        user.set_avatar_local(filename)
+        return filename
+
+    def release(self, filename):
+        """
+        Lepas avatar lokal lama milik user. Set content-addressed turun
+        refcount-nya; file avatar lama (sebelum content-addressed) langsung
+        dihapus karena tidak dipakai bersama.
+        """
+        key = avatar_key(filename)
+        if key is not None and self._adjust(key, -1, create=False):
+            return
+        if filename:
+            file_upload_service.delete_file(filename)
+
+    def _adjust(self, key, delta, create=True):
+        from ..models import db, AvatarBlob
+
+        values = {'updated_at': datetime.utcnow()}
+        if delta:
+            values['refcount'] = AvatarBlob.refcount + delta
+        query = AvatarBlob.query.filter(AvatarBlob.hash == key)
+        if delta < 0:
+            query = query.filter(AvatarBlob.refcount > 0)
+        if query.update(values, synchronize_session=False):
+            return True
+        if not create:
+            return db.session.get(AvatarBlob, key) is not None
+        try:
+            with db.session.begin_nested():
+                db.session.add(AvatarBlob(hash=key, refcount=max(delta, 0)))
+        except IntegrityError:
+            # Worker lain baru saja membuat baris yang sama
+            return self._adjust(key, delta, create=False)
+        return True
+
+    def collect_garbage(self):
+        """Hapus set dengan refcount 0 yang sudah melewati GRACE (butuh app context)"""
+        from ..models import db, AvatarBlob
+
+        cutoff = datetime.utcnow() - self.GRACE
+        keys = [key for key, in db.session.query(AvatarBlob.hash).filter(
+            AvatarBlob.refcount <= 0, AvatarBlob.updated_at < cutoff).limit(100)]
+        for key in keys:
+            deleted = AvatarBlob.query.filter(
+                AvatarBlob.hash == key, AvatarBlob.refcount <= 0, AvatarBlob.updated_at < cutoff
+            ).delete(synchronize_session=False)
+            db.session.commit()
+            if deleted:
+                for filename in rendition_files(key):
+                    file_upload_service.delete_file(filename)
+        return len(keys)
+
+
+avatar_store = AvatarStore()
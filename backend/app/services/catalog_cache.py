@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, request
+from .compression import add_vary, compress, negotiate_encoding
+from .ukm_events import ukm_change_feed
+
+
+class CatalogEntry:
+    """
+    Response katalog yang sudah di-serialize untuk satu versi data, beserta
+    varian terkompresnya (dibuat saat pertama kali diminta).
+    """
+
+    __slots__ = ('version', 'body', 'etag', 'variants', 'lock')
+
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.variants = {}
+        self.lock = threading.Lock()
+
+    def variant(self, encoding):
+        """Body terkompres untuk `encoding`, dikompres sekali per entry"""
+        body = self.variants.get(encoding)
+        if body is None:
+            # Request lain yang butuh varian sama menunggu, bukan ikut mengompres
+            with self.lock:
+                body = self.variants.get(encoding)
+                if body is None:
+                    body = compress(self.body, encoding, cached=True)
+                    self.variants[encoding] = body
+        return body
+
+
+class CatalogPart:
+    """Potongan data katalog (objek Python) untuk satu versi data"""
+
+    __slots__ = ('version', 'value')
+
+    def __init__(self, version, value):
+        self.version = version
+        self.value = value
+
+
+class CatalogCache:
+    """
+    Cache bytes JSON response katalog (UKM & kategori) per versi data.
+
+    Versi katalog adalah (inode, mtime) file penanda di instance folder,
+    sehingga semua worker di satu host melihat versi yang sama tanpa query
+    database. Versi dinaikkan setiap ada perubahan UKM yang di-commit. Request dengan
+    If-None-Match yang cocok langsung dijawab 304 dari cache. Varian gzip/br
+    disimpan di entry yang sama sehingga kompresi terjadi sekali per versi.
+    """
+
+    MAX_ENTRIES = 512
+    BUILD_LOCKS = 64
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.version_file = None
+        self.listeners = []
+        # Lock per key (di-hash ke sejumlah tetap) supaya satu key dibangun sekali setelah bump
+        self.build_locks = [threading.Lock() for _ in range(self.BUILD_LOCKS)]
+
+    def init_app(self, app):
+        self.version_file = os.path.join(app.instance_path, 'catalog_version')
+        os.makedirs(app.instance_path, exist_ok=True)
+        if not os.path.exists(self.version_file):
+            self.bump()
+        ukm_change_feed.init_app(app)
+        ukm_change_feed.subscribe(self._on_changes)
+
+    def on_bump(self, callback):
+        """
+        Daftarkan callback(changes, previous, current) yang dipanggil setelah
+        perubahan UKM dari worker ini menaikkan versi, dengan versi sebelum
+        dan sesudah bump (tidak bergantung urutan subscriber ukm_change_feed).
+        """
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def _on_changes(self, changes):
+        previous, current = self.bump()
+        for callback in self.listeners:
+            callback(changes, previous, current)
+
+    def version(self):
+        if self.version_file is None:
+            return None
+        try:
+            stat = os.stat(self.version_file)
+            return stat.st_ino, stat.st_mtime_ns
+        except OSError:
+            return None
+
+    def bump(self):
+        """Naikkan versi katalog (semua entry lama otomatis tidak berlaku); kembalikan (versi lama, versi baru)"""
+        previous = self.version()
+        # Tulis file baru lalu replace supaya inode selalu berganti
+        tmp_file = f'{self.version_file}.{os.getpid()}.{threading.get_ident()}'
+        with open(tmp_file, 'w') as f:
+            f.write(str(time.time_ns()))
+        # Versi baru dari file sendiri (replace mempertahankan inode & mtime), bukan bump worker lain
+        stat = os.stat(tmp_file)
+        os.replace(tmp_file, self.version_file)
+        with self.lock:
+            self.entries.clear()
+        return previous, (stat.st_ino, stat.st_mtime_ns)
+
+    def _build_lock(self, key):
+        return self.build_locks[hash(key) % len(self.build_locks)]
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.version != version:
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.MAX_ENTRIES:
+                self.entries.popitem(last=False)
+
+    def part(self, key, builder):
+        """
+        Ambil potongan data katalog untuk `key` dari cache, atau bangun
+        dengan `builder()`. Dipakai untuk menyusun response gabungan
+        (mis. /api/bootstrap) dari bagian yang sama.
+        """
+        version = self.version()
+        entry = self.get(f'part:{key}', version)
+        if entry is None:
+            with self._build_lock(f'part:{key}'):
+                entry = self.get(f'part:{key}', version)
+                if entry is None:
+                    entry = CatalogPart(version, builder())
+                    self.put(f'part:{key}', entry)
+        return entry.value
+
+    def respond(self, key, builder):
+        """
+        Kirim response katalog untuk `key` dari cache, atau bangun dengan
+        `builder()` yang mengembalikan (payload, status). Hanya status 200
+        yang di-cache; status lain dikembalikan apa adanya.
+        """
+        version = self.version()
+        entry = self.get(key, version)
+        if entry is None:
+            with self._build_lock(key):
+                entry = self.get(key, version)
+                if entry is None:
+                    payload, status = builder()
+                    if status != 200:
+                        return payload, status
+                    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+                    entry = CatalogEntry(version, body)
+                    self.put(key, entry)
+
+        encoding = None
+        if (current_app.config.get('COMPRESS_ENABLED', True)
+                and len(entry.body) >= current_app.config.get('COMPRESS_MIN_SIZE', 1024)):
+            encoding = negotiate_encoding()
+
+        # Tiap representasi punya ETag sendiri; 304 tetap berlaku untuk keduanya
+        etag = f'{entry.etag}-{encoding}' if encoding else entry.etag
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+        if encoding:
+            headers['Content-Encoding'] = encoding
+
+        if request.if_none_match.contains(etag) or request.if_none_match.contains(entry.etag):
+            response = current_app.response_class(status=304, headers=headers)
+            response.headers.pop('Content-Encoding', None)
+        else:
+            body = entry.variant(encoding) if encoding else entry.body
+            response = current_app.response_class(body, status=200, mimetype='application/json', headers=headers)
+        if len(entry.body) >= current_app.config.get('COMPRESS_MIN_SIZE', 1024):
+            add_vary(response)
+        return response
+
+
+def request_cache_key(prefix):
+    """Key cache dari path + query string yang diurutkan"""
+    args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+    return f'{prefix}?{args}'
+
+
+catalog_cache = CatalogCache()
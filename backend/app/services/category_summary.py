@@ -0,0 +1,41 @@
+from sqlalchemy import func
+from ..models import db, UKM
+
+MAX_NEWEST_PER_CATEGORY = 10
+
+
+def active_ukm_counts():
+    """Jumlah UKM aktif per kategori dengan satu query GROUP BY"""
+    rows = (db.session.query(UKM.category_id, func.count(UKM.id))
+            .filter(UKM.is_active == True)
+            .group_by(UKM.category_id)
+            .all())
+    return dict(rows)
+
+
+def newest_ukms_per_category(limit):
+    """
+    `limit` UKM aktif terbaru untuk setiap kategori dalam satu query
+    (ROW_NUMBER() per kategori). Mengembalikan {category_id: [dict UKM]}.
+    """
+    rank = func.row_number().over(
+        partition_by=UKM.category_id,
+        order_by=(UKM.created_at.desc(), UKM.id.desc())
+    ).label('rank')
+    ranked = (db.session.query(UKM.id, UKM.nama, UKM.logo_url, UKM.category_id, UKM.created_at, rank)
+              .filter(UKM.is_active == True)
+              .subquery())
+    rows = (db.session.query(ranked)
+            .filter(ranked.c.rank <= limit)
+            .order_by(ranked.c.category_id, ranked.c.rank)
+            .all())
+
+    newest = {}
+    for row in rows:
+        newest.setdefault(row.category_id, []).append({
+            'id': row.id,
+            'nama': row.nama,
+            'logo_url': row.logo_url,
+            'created_at': row.created_at.isoformat() if row.created_at else None
+        })
+    return newest
@@ -0,0 +1,87 @@
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli opsional; tanpa paket ini hanya gzip yang dipakai
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/css', 'text/csv',
+                          'application/javascript', 'application/x-ndjson')
+
+# Level untuk response dinamis (dikompres setiap request) dibuat lebih ringan;
+# response katalog dikompres sekali per versi data sehingga boleh level maksimal.
+DYNAMIC_LEVELS = {'br': 5, 'gzip': 6}
+CACHED_LEVELS = {'br': 11, 'gzip': 9}
+
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encodings=None):
+    """Pilih encoding terbaik dari header Accept-Encoding (br > gzip), atau None"""
+    if accept_encodings is None:
+        accept_encodings = request.accept_encodings
+    best, best_quality = None, 0
+    for encoding in supported_encodings():
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body, encoding, cached=False):
+    levels = CACHED_LEVELS if cached else DYNAMIC_LEVELS
+    if encoding == 'br':
+        return brotli.compress(body, quality=levels['br'])
+    if encoding == 'gzip':
+        # mtime=0 supaya hasil kompresi (dan ETag-nya) deterministik
+        return gzip.compress(body, compresslevel=levels['gzip'], mtime=0)
+    raise ValueError(f'Encoding tidak didukung: {encoding}')
+
+
+def add_vary(response, header='Accept-Encoding'):
+    if header not in response.vary:
+        response.vary.add(header)
+
+
+def init_compression(app):
+    """
+    Kompres response (gzip/brotli) sesuai Accept-Encoding.
+
+    Response di bawah COMPRESS_MIN_SIZE byte dikirim apa adanya: untuk body
+    sekecil itu waktu kompresi lebih mahal dari byte yang dihemat. Response
+    streaming, response yang sudah punya Content-Encoding (mis. varian
+    terkompres dari catalog_cache) dan status selain 200 tidak disentuh.
+    """
+    app.config.setdefault('COMPRESS_ENABLED', True)
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+
+    @app.after_request
+    def compress_response(response):
+        if not app.config['COMPRESS_ENABLED']:
+            return response
+        if (response.status_code != 200
+                or response.direct_passthrough
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        body = response.get_data()
+        if len(body) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+
+        add_vary(response)
+        encoding = negotiate_encoding()
+        if encoding is None:
+            return response
+
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # Representasi terkompres bukan byte yang sama dengan ETag aslinya
+            response.set_etag(etag, weak=True)
+        return response
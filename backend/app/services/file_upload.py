@@ -1,18 +1,237 @@
+import base64
+import binascii
+import hashlib
+import io
 import os
+import re
 import uuid
-from PIL import Image
+from PIL import Image, UnidentifiedImageError
 from werkzeug.utils import secure_filename
 from datetime import datetime
 
+AVATAR_SIZE = (300, 300)
+
+# Rendition avatar: sisi kotak (px) dan format (ekstensi, format Pillow, opsi encode).
+# File: <key>-<size>.<ext> dengan key = hash isi gambar (lihat content_key);
+# <key>-300.jpg juga menjadi avatar_filename user.
+AVATAR_RENDITIONS = (48, 96, 300)
+AVATAR_FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+)
+AVATAR_CACHE_MAX_AGE = 31536000
+
+# Format yang boleh di-decode dan batas dimensi, dicek dari header sebelum decode
+IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+MAX_IMAGE_SIDE = 10000
+MAX_IMAGE_PIXELS = 40_000_000
+# Prefix base64 (kelipatan 4) yang di-decode untuk membaca header gambar
+BASE64_HEADER_CHARS = 64 * 1024
+RENDITION_PATTERN = re.compile(r'^(?P<key>[\w.]+)-(?P<size>\d+)(?:\.(?P<ext>webp|jpg))?$')
+
+
+class InvalidImage(ValueError):
+    """Upload bukan gambar yang didukung atau dimensinya terlalu besar"""
+
+
+def inspect_image(source):
+    """
+    Baca header gambar saja (Image.open tidak men-decode piksel) lalu
+    tolak format di luar IMAGE_FORMATS dan dimensi di atas batas.
+    Kembalikan (format, (lebar, tinggi)); posisi stream dikembalikan.
+    """
+    position = source.tell() if hasattr(source, 'tell') else None
+    try:
+        with Image.open(source, formats=IMAGE_FORMATS) as img:
+            image_format, (width, height) = img.format, img.size
+    except (UnidentifiedImageError, SyntaxError, OSError, Image.DecompressionBombError):
+        raise InvalidImage('File bukan gambar JPEG/PNG/GIF/WebP yang valid')
+    finally:
+        if position is not None:
+            source.seek(position)
+    if width > MAX_IMAGE_SIDE or height > MAX_IMAGE_SIDE or width * height > MAX_IMAGE_PIXELS:
+        raise InvalidImage(f'Dimensi gambar terlalu besar ({width}x{height})')
+    return image_format, (width, height)
+
+
+def is_data_url(value):
+    """True untuk data URL (avatar inline base64) yang tidak boleh disimpan di tabel users"""
+    return isinstance(value, str) and value[:5].lower() == 'data:'
+
+
+def decode_data_url(data_url, max_bytes):
+    """
+    Data URL base64 -> bytes gambar. Header gambar dicek dari prefix
+    BASE64_HEADER_CHARS dulu, sehingga data yang jelas ditolak tidak
+    pernah di-decode penuh. Raise InvalidImage.
+    """
+    try:
+        header, payload = data_url.split(',', 1)
+    except ValueError:
+        raise InvalidImage('Format data URL tidak valid')
+    if not header.startswith('data:image/') or ';base64' not in header:
+        raise InvalidImage('Data URL harus berupa gambar base64')
+    if len(payload) // 4 * 3 > max_bytes:
+        raise InvalidImage('Ukuran file terlalu besar')
+
+    try:
+        prefix = base64.b64decode(payload[:BASE64_HEADER_CHARS], validate=True)
+    except (ValueError, binascii.Error):
+        raise InvalidImage('Data base64 tidak valid')
+    try:
+        inspect_image(io.BytesIO(prefix))
+    except InvalidImage:
+        # Header bisa lebih panjang dari prefix (mis. EXIF besar); cek lagi setelah decode penuh
+        if len(payload) <= BASE64_HEADER_CHARS:
+            raise
+        prefix = None
+
+    try:
+        data = base64.b64decode(payload, validate=True)
+    except (ValueError, binascii.Error):
+        raise InvalidImage('Data base64 tidak valid')
+    if prefix is None:
+        inspect_image(io.BytesIO(data))
+    return data
+
+
+def _open_image(source):
+    """Image.open untuk path, file object atau bytes"""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return Image.open(source, formats=IMAGE_FORMATS)
+
+
+def _square_avatar(img, size):
+    """Gambar RGB `size` persegi berlatar putih dari gambar Pillow apa pun"""
+    # JPEG di-decode langsung pada skala 1/2..1/8 (DCT scaling) selama masih >= 2x target,
+    # juga untuk JPEG grayscale/CMYK yang dikonversi sebelum thumbnail; format lain diabaikan
+    img.draft('RGB', (size[0] * 2, size[1] * 2))
+    # Convert to RGB if necessary (for PNG with transparency)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        if img.mode in ('RGBA', 'LA'):
+            background.paste(img, mask=img.split()[-1])
+        else:
+            background.paste(img)
+        img = background
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    # Resize maintaining aspect ratio
+    img.thumbnail(size, Image.Resampling.LANCZOS)
+
+    # Create a square image with white background
+    square_img = Image.new('RGB', size, (255, 255, 255))
+    offset = ((size[0] - img.size[0]) // 2, (size[1] - img.size[1]) // 2)
+    square_img.paste(img, offset)
+    return square_img
+
+
+def render_avatar(source, dest_path, size=AVATAR_SIZE):
+    """Decode gambar sumber (path/stream/bytes) dan simpan satu avatar JPEG `size` teroptimasi"""
+    with _open_image(source) as img:
+        _square_avatar(img, size).save(dest_path, 'JPEG', quality=85, optimize=True)
+    return dest_path
+
+
+def render_avatar_set(source, folder):
+    """
+    Decode gambar sumber (path, stream request atau bytes) sekali dengan
+    draft skala kecil, lalu tulis semua rendition
+    (AVATAR_RENDITIONS x AVATAR_FORMATS) ke `folder` dengan key = hash
+    isi gambar hasil proses, dan kembalikan key tersebut. Rendition yang
+    sudah ada (gambar sama pernah diupload) tidak di-encode ulang. Fungsi
+    level modul supaya bisa dijalankan di process pool (lihat avatar_jobs).
+    """
+    largest = max(AVATAR_RENDITIONS)
+    with _open_image(source) as img:
+        master = _square_avatar(img, (largest, largest))
+    key = content_key(master)
+
+    written = []
+    tmp_path = None
+    try:
+        for size in AVATAR_RENDITIONS:
+            image = None
+            for ext, image_format, options in AVATAR_FORMATS:
+                filepath = os.path.join(folder, rendition_filename(key, size, ext))
+                if os.path.exists(filepath):
+                    continue
+                if image is None:
+                    image = master if size == largest else master.resize((size, size), Image.Resampling.LANCZOS)
+                # Tulis ke file sementara lalu rename, supaya file yang dilayani selalu utuh
+                tmp_path = f'{filepath}.{os.getpid()}.tmp'
+                image.save(tmp_path, image_format, **options)
+                os.replace(tmp_path, filepath)
+                tmp_path = None
+                written.append(filepath)
+    except Exception:
+        # Set setengah jadi tidak boleh tertinggal tanpa record AvatarBlob
+        if tmp_path is not None:
+            written.append(tmp_path)
+        for path in written:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        raise
+    return key
+
+
+def content_key(image):
+    """Key content-addressed (32 hex) dari piksel gambar hasil proses"""
+    digest = hashlib.sha256(f'{image.mode}:{image.size}:'.encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()[:32]
+
+
+def rendition_files(key):
+    """Semua nama file rendition untuk satu key"""
+    return [rendition_filename(key, size, ext) for size in AVATAR_RENDITIONS for ext, _, _ in AVATAR_FORMATS]
+
+
+def rendition_filename(key, size, ext):
+    return f'{key}-{size}.{ext}'
+
+
+def avatar_key(filename):
+    """Key set rendition dari avatar_filename (<key>-300.jpg), None untuk avatar lama satu file"""
+    match = RENDITION_PATTERN.match(filename or '')
+    if match and match.group('ext') == 'jpg' and int(match.group('size')) == max(AVATAR_RENDITIONS):
+        return match.group('key')
+    return None
+
+
+def rendition_urls(filename, prefix=''):
+    """
+    {ukuran: URL} untuk set rendition. URL tanpa ekstensi; route static
+    memilih WebP atau JPEG dari header Accept.
+    """
+    key = avatar_key(filename)
+    if key is None:
+        return None
+    return {str(size): f'{prefix}/static/uploads/avatars/{key}-{size}' for size in AVATAR_RENDITIONS}
+
+
 class FileUploadService:
-    def __init__(self, app):
+    def __init__(self, app=None):
         self.app = app
         
         # Configuration
-        self.UPLOAD_FOLDER = os.path.join(app.root_path, 'static', 'uploads', 'avatars')
+        self.UPLOAD_FOLDER = None
         self.ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
         self.MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
-        self.AVATAR_SIZE = (300, 300)  # Fixed size for avatars
+        self.AVATAR_SIZE = AVATAR_SIZE  # Fixed size for avatars
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.UPLOAD_FOLDER = os.path.join(app.root_path, 'static', 'uploads', 'avatars')
         
         # Create upload directory if it doesn't exist
         os.makedirs(self.UPLOAD_FOLDER, exist_ok=True)
@@ -40,38 +259,13 @@ class FileUploadService:
     
     def resize_image(self, image_path, size=None):
         """Resize and optimize image"""
-        if size is None:
-            size = self.AVATAR_SIZE
-            
         try:
-            with Image.open(image_path) as img:
-                # Convert to RGB if necessary (for PNG with transparency)
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    if 'transparency' in img.info:
-                        background.paste(img, mask=img.split()[-1])
-                    else:
-                        background.paste(img)
-                    img = background
-                
-                # Resize maintaining aspect ratio
-                img.thumbnail(size, Image.Resampling.LANCZOS)
-                
-                # Create a square image with white background
-                square_img = Image.new('RGB', size, (255, 255, 255))
-                offset = ((size[0] - img.size[0]) // 2, (size[1] - img.size[1]) // 2)
-                square_img.paste(img, offset)
-                
-                # Save as JPEG with optimization
-                square_img.save(image_path, 'JPEG', quality=85, optimize=True)
-                
+            render_avatar(image_path, image_path, size or self.AVATAR_SIZE)
             return True
         except Exception as e:
             print(f"Error resizing image: {e}")
             return False
-    
+
     def save_uploaded_file(self, file, user_id):
         """Save uploaded file and return file info"""
         try:
@@ -82,16 +276,23 @@ class FileUploadService:
             if not self.allowed_file(file.filename):
                 return {'success': False, 'error': 'File type not allowed'}
             
+            # Cek header (format, dimensi) sebelum decode
+            try:
+                inspect_image(file.stream)
+            except InvalidImage as e:
+                return {'success': False, 'error': str(e)}
+
             # Generate filename
-            filename = self.generate_filename(user_id, file.filename)
+            filename = self.generate_filename(user_id, 'avatar.jpg')
             filepath = os.path.join(self.UPLOAD_FOLDER, filename)
             
-            # Save file
-            file.save(filepath)
-            
-            # Resize and optimize
-            if not self.resize_image(filepath):
-                os.remove(filepath)  # Remove if resize failed
+            # Resize and optimize langsung dari stream request (tanpa file mentah di disk)
+            try:
+                render_avatar(file.stream, filepath)
+            except Exception as e:
+                print(f"Error resizing image: {e}")
+                if os.path.exists(filepath):
+                    os.remove(filepath)
                 return {'success': False, 'error': 'Failed to process image'}
             
             # Return file info
@@ -107,7 +308,16 @@ class FileUploadService:
             return {'success': False, 'error': f'Upload failed: {str(e)}'}
     
     def delete_file(self, filename):
-        """Delete uploaded file"""
+        """Delete uploaded file (semua rendition jika filename adalah set rendition)"""
+        key = avatar_key(filename)
+        if key is not None:
+            deleted = False
+            for filename in rendition_files(key):
+                deleted = self._delete_one(filename) or deleted
+            return deleted
+        return self._delete_one(filename)
+
+    def _delete_one(self, filename):
         try:
             if filename:
                 filepath = os.path.join(self.UPLOAD_FOLDER, filename)
@@ -119,6 +329,22 @@ class FileUploadService:
             print(f"Error deleting file: {e}")
             return False
     
+    def resolve_rendition(self, filename, accept_mimetypes):
+        """
+        Nama file yang dilayani untuk `filename` dan apakah hasil negosiasi.
+        '<key>-<size>' tanpa ekstensi dipetakan ke .webp jika client
+        menyebut image/webp secara eksplisit di Accept, selain itu .jpg.
+        """
+        match = RENDITION_PATTERN.match(filename)
+        if not match or match.group('ext') or int(match.group('size')) not in AVATAR_RENDITIONS:
+            return filename, False
+        accepts_webp = any(mimetype == 'image/webp' and quality > 0 for mimetype, quality in accept_mimetypes)
+        return f"{filename}.{'webp' if accepts_webp else 'jpg'}", True
+
+    def missing_renditions(self, key):
+        return [filename for filename in rendition_files(key)
+                if not os.path.exists(os.path.join(self.UPLOAD_FOLDER, filename))]
+
     def get_file_info(self, filename):
         """Get file information"""
         try:
@@ -133,3 +359,6 @@ class FileUploadService:
         except Exception as e:
             print(f"Error getting file info: {e}")
             return {'exists': False}
+
+
+file_upload_service = FileUploadService()
@@ -0,0 +1,161 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, func, inspect, or_, text
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+COUNT_CAP = 10000
+
+
+class InvalidCursor(ValueError):
+    """Cursor dari client tidak bisa di-decode"""
+
+
+def encode_cursor(payload):
+    """Encode dict cursor menjadi string URL-safe"""
+    raw = json.dumps(payload, separators=(',', ':'), default=_encode_value)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode string cursor kembali menjadi dict"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+
+    if not isinstance(payload, dict) or 'id' not in payload:
+        raise InvalidCursor('Cursor tidak lengkap')
+
+    if not _is_int(payload['id']):
+        raise InvalidCursor('id cursor harus integer')
+
+    if isinstance(payload.get('v'), dict) and 'dt' in payload['v']:
+        try:
+            payload['v'] = datetime.fromisoformat(payload['v']['dt'])
+        except (TypeError, ValueError) as e:
+            raise InvalidCursor(str(e))
+    elif not (payload.get('v') is None or isinstance(payload['v'], (str, float)) or _is_int(payload['v'])):
+        raise InvalidCursor('Nilai cursor tidak valid')
+    return payload
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    raise TypeError(f'Tipe {type(value)} tidak bisa dipakai di cursor')
+
+
+def get_page_size(args, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Ambil parameter limit dari query string dan batasi ke [1, maximum]"""
+    limit = args.get('limit', default, type=int)
+    if limit is None:
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def keyset_page(query, sort_column, id_column, descending=False, cursor=None,
+                limit=DEFAULT_PAGE_SIZE, tag=None):
+    """
+    Ambil satu halaman hasil query dengan keyset pagination.
+
+    Urutan selalu (sort_column, id_column) supaya stabil walaupun nilai
+    sort_column sama. `tag` ikut disimpan di cursor (biasanya nama sort)
+    supaya cursor dari urutan lain ditolak. Mengembalikan (rows, next_cursor)
+    dimana next_cursor None jika sudah halaman terakhir.
+    """
+    if cursor is not None:
+        if cursor.get('s') != tag:
+            raise InvalidCursor('Cursor tidak cocok dengan urutan')
+        last_value, last_id = cursor.get('v'), cursor['id']
+        if sort_column is not id_column and last_value is not None:
+            _check_cursor_value(sort_column, last_value)
+        if sort_column is id_column:
+            query = query.filter(id_column < last_id if descending else id_column > last_id)
+        elif descending:
+            query = query.filter(or_(
+                sort_column < last_value,
+                and_(sort_column == last_value, id_column < last_id)
+            ))
+        else:
+            query = query.filter(or_(
+                sort_column > last_value,
+                and_(sort_column == last_value, id_column > last_id)
+            ))
+
+    if sort_column is id_column:
+        order = [id_column.desc() if descending else id_column.asc()]
+    elif descending:
+        order = [sort_column.desc(), id_column.desc()]
+    else:
+        order = [sort_column.asc(), id_column.asc()]
+
+    # Ambil satu baris ekstra untuk tahu apakah masih ada halaman berikutnya
+    rows = query.order_by(*order).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    next_cursor = encode_cursor({
+        's': tag,
+        'v': getattr(last, sort_column.key),
+        'id': getattr(last, id_column.key)
+    })
+    return rows, next_cursor
+
+
+def _check_cursor_value(column, value):
+    """Tolak nilai cursor yang tipenya tidak cocok dengan kolom sort (mis. string untuk kolom datetime)"""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return
+    if python_type is float:
+        python_type = (int, float)
+    if not isinstance(value, python_type) or isinstance(value, bool) and python_type is not bool:
+        raise InvalidCursor('Nilai cursor tidak cocok dengan urutan')
+
+
+def escape_like(value, escape='\\'):
+    """Escape karakter wildcard LIKE (% dan _) di input user"""
+    return (value.replace(escape, escape * 2)
+                 .replace('%', f'{escape}%')
+                 .replace('_', f'{escape}_'))
+
+
+def count_estimate(query, cap=COUNT_CAP):
+    """
+    Jumlah baris hasil query dengan biaya terbatas: COUNT atas subquery
+    LIMIT cap+1, sehingga tidak memindai seluruh tabel. Mengembalikan
+    (jumlah, is_estimate); is_estimate True berarti jumlah sebenarnya
+    lebih dari `cap`.
+    """
+    entity = inspect(query.column_descriptions[0]['entity'])
+    limited = (query.with_entities(*entity.primary_key)
+               .order_by(None)
+               .limit(cap + 1)
+               .subquery())
+    count = query.session.query(func.count()).select_from(limited).scalar()
+    if count > cap:
+        return cap, True
+    return count, False
+
+
+def table_row_estimate(session, table_name):
+    """
+    Perkiraan jumlah baris tabel dari statistik MySQL (information_schema),
+    tanpa COUNT(*). None untuk database lain.
+    """
+    if session.get_bind().dialect.name != 'mysql':
+        return None
+    return session.execute(text(
+        'SELECT TABLE_ROWS FROM information_schema.TABLES '
+        'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table'
+    ), {'table': table_name}).scalar()
@@ -0,0 +1,150 @@
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import check_password_hash, generate_password_hash
+from .process_pool import create_process_pool
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+
+class HashQueueFull(RuntimeError):
+    """Antrian hashing penuh; request sebaiknya dijawab 503 + Retry-After"""
+
+
+def _hash_password(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _hash_passwords(passwords, method):
+    return [generate_password_hash(password, method=method) for password in passwords]
+
+
+def _verify_password(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    """
+    Menjalankan hashing/verifikasi password (KDF yang sengaja lambat) di
+    process pool berukuran tetap, sehingga thread request tidak memakan CPU
+    worker dan lonjakan login tidak menahan endpoint lain.
+
+    Jumlah pekerjaan yang antri dibatasi PASSWORD_HASH_QUEUE; jika penuh
+    selama PASSWORD_HASH_TIMEOUT detik, HashQueueFull di-raise. Dengan
+    PASSWORD_HASH_WORKERS = 0 hashing dijalankan langsung di thread pemanggil
+    (dipakai saat testing dan di luar app); begitu juga jika process pool
+    tidak bisa dibuat atau rusak.
+
+    Cost diatur lewat PASSWORD_HASH_METHOD (format werkzeug, mis.
+    'scrypt:32768:8:1' atau 'pbkdf2:sha256:600000'); hash lama dengan
+    method berbeda di-rehash saat login berhasil (lihat needs_rehash).
+    """
+
+    def __init__(self):
+        self.method = DEFAULT_METHOD
+        self.prefix = DEFAULT_METHOD
+        self.workers = 0
+        self.timeout = 5.0
+        self.slots = None
+        self.executor = None
+        self.executor_pid = None
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+        app.config.setdefault('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1))
+        app.config.setdefault('PASSWORD_HASH_QUEUE', app.config['PASSWORD_HASH_WORKERS'] * 16)
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 5.0)
+
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        # Prefix hash lengkap (mis. 'pbkdf2:sha256' -> 'pbkdf2:sha256:600000') untuk needs_rehash
+        self.prefix = generate_password_hash('', method=self.method).split('$', 1)[0]
+        self.workers = 0 if app.testing else app.config['PASSWORD_HASH_WORKERS']
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+        self.slots = threading.BoundedSemaphore(max(1, app.config['PASSWORD_HASH_QUEUE']))
+        self.shutdown()
+
+    def _executor(self):
+        # Pool dibuat per proses (setelah fork worker gunicorn/uwsgi); None = jalan inline
+        with self.lock:
+            if self.executor_pid != os.getpid():
+                self.executor = create_process_pool(self.workers)
+                self.executor_pid = os.getpid()
+            return self.executor
+
+    def _run(self, func, *args):
+        executor = self._executor() if self.workers else None
+        if executor is None:
+            return func(*args)
+        if not self.slots.acquire(timeout=self.timeout):
+            raise HashQueueFull('Antrian hashing password penuh')
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool:
+            # Proses pool mati (mis. dibunuh OOM); buat ulang pada request berikutnya
+            self.shutdown()
+            return func(*args)
+        finally:
+            self.slots.release()
+
+    def hash(self, password):
+        return self._run(_hash_password, password, self.method)
+
+    def hash_many(self, passwords, chunk_size=8, workers=None):
+        """
+        Hash banyak password secara paralel (provisioning massal), urutan
+        hasil sama dengan input.
+
+        Tanpa `workers`, potongan `chunk_size` password dikirim ke pool
+        bersama dan paling banyak PASSWORD_HASH_WORKERS potongan antri
+        sekaligus, sehingga login tetap bisa menyela di antaranya. Dengan
+        `workers` (mis. dari CLI) dipakai pool sementara sebesar itu.
+        """
+        passwords = list(passwords)
+        chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+        if workers:
+            executor = create_process_pool(workers)
+            if executor is None:
+                return _hash_passwords(passwords, self.method)
+            with executor:
+                results = executor.map(_hash_passwords, chunks, [self.method] * len(chunks))
+                return [password_hash for chunk in results for password_hash in chunk]
+        executor = self._executor() if self.workers else None
+        if executor is None:
+            return _hash_passwords(passwords, self.method)
+
+        in_flight = threading.BoundedSemaphore(self.workers)
+        futures = []
+        try:
+            for chunk in chunks:
+                in_flight.acquire()
+                if not self.slots.acquire(timeout=self.timeout):
+                    in_flight.release()
+                    raise HashQueueFull('Antrian hashing password penuh')
+                future = executor.submit(_hash_passwords, chunk, self.method)
+                future.add_done_callback(lambda _: (self.slots.release(), in_flight.release()))
+                futures.append(future)
+            return [password_hash for future in futures for password_hash in future.result()]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def verify(self, password_hash, password):
+        if not password_hash:
+            return False
+        return self._run(_verify_password, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True jika hash dibuat dengan method/cost yang berbeda dari konfigurasi"""
+        return bool(password_hash) and password_hash.split('$', 1)[0] != self.prefix
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None and self.executor_pid == os.getpid():
+                self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+            self.executor_pid = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,24 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def pool_context():
+    """
+    Context multiprocessing untuk process pool. 'forkserver' (Linux) tidak
+    mem-fork proses Flask yang sudah multithread; selain itu dipakai default
+    platform ('spawn' di Windows/macOS). Fungsi yang dikirim ke pool harus
+    fungsi level modul.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context()
+
+
+def create_process_pool(max_workers, logger=None):
+    """ProcessPoolExecutor dengan pool_context(); None jika pool tidak bisa dibuat (pemanggil jalan inline)"""
+    try:
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=pool_context())
+    except (OSError, ValueError, NotImplementedError) as e:
+        if logger is not None:
+            logger.warning('Process pool tidak tersedia, diproses inline: %r', e)
+        return None
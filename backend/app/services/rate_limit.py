@@ -0,0 +1,198 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from flask import request
+
+
+class RateLimitExceeded(Exception):
+    """Bucket kosong; `retry_after` = detik sampai satu token tersedia lagi"""
+
+    def __init__(self, rule, retry_after):
+        super().__init__(f'Rate limit {rule} terlampaui')
+        self.rule = rule
+        self.retry_after = retry_after
+
+
+def _refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+def _retry_after(tokens, rate):
+    return max(1, math.ceil((1 - tokens) / rate))
+
+
+class MemoryBackend:
+    """Bucket di memori proses; cukup untuk satu worker"""
+
+    MAX_KEYS = 100000
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        """Ambil satu token. Kembalikan 0 jika boleh, selain itu Retry-After (detik)"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated, now, capacity, rate)
+            if tokens < 1:
+                self.buckets[key] = (tokens, now)
+                return _retry_after(tokens, rate)
+            if len(self.buckets) >= self.MAX_KEYS and key not in self.buckets:
+                self._prune(now)
+            self.buckets[key] = (tokens - 1, now)
+            return 0
+
+    def reset(self):
+        with self.lock:
+            self.buckets.clear()
+
+    def _prune(self, now):
+        # Bucket yang sudah terisi penuh lagi sama dengan bucket baru;
+        # 1 jam cukup untuk semua aturan default
+        stale = [key for key, (_, updated) in self.buckets.items() if now - updated > 3600]
+        for key in stale:
+            del self.buckets[key]
+        if len(self.buckets) >= self.MAX_KEYS:
+            self.buckets.clear()
+
+
+class SQLiteBackend:
+    """
+    Bucket di file SQLite bersama, untuk beberapa worker (gunicorn) di satu
+    host. Baca-ubah-tulis satu bucket berjalan di transaksi BEGIN IMMEDIATE.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.calls = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS rate_buckets ('
+            'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+        )
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    @property
+    def connection(self):
+        # Koneksi per thread (dan per proses setelah fork)
+        pid = os.getpid()
+        if getattr(self.local, 'pid', None) != pid:
+            self.local.connection = self._connect()
+            self.local.pid = pid
+        return self.local.connection
+
+    def consume(self, key, capacity, rate):
+        now = time.time()
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT tokens, updated FROM rate_buckets WHERE key = ?', (key,)
+            ).fetchone()
+            tokens = _refill(*row, now, capacity, rate) if row else capacity
+            allowed = tokens >= 1
+            connection.execute(
+                'INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                (key, tokens - 1 if allowed else tokens, now)
+            )
+            connection.execute('COMMIT')
+        except sqlite3.Error:
+            connection.execute('ROLLBACK')
+            raise
+
+        self.calls += 1
+        if self.calls % self.PRUNE_EVERY == 0:
+            connection.execute('DELETE FROM rate_buckets WHERE updated < ?', (now - 3600,))
+        return 0 if allowed else _retry_after(tokens, rate)
+
+    def reset(self):
+        self.connection.execute('DELETE FROM rate_buckets')
+
+
+class RateLimiter:
+    """
+    Token bucket per aturan dan kunci (IP client, username). Aturan di
+    config RATE_LIMITS: nama -> (kapasitas, detik untuk mengisi penuh).
+    Backend 'memory' per proses atau 'sqlite' (RATE_LIMIT_STORAGE) yang
+    dipakai bersama oleh semua worker.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.rules = {}
+        self.backend = MemoryBackend()
+
+    def init_app(self, app):
+        app.config.setdefault('RATE_LIMIT_ENABLED', True)
+        app.config.setdefault('RATE_LIMIT_BACKEND', 'memory')
+        app.config.setdefault('RATE_LIMITS', {})
+
+        self.enabled = app.config['RATE_LIMIT_ENABLED']
+        self.rules = dict(app.config['RATE_LIMITS'])
+        if app.config['RATE_LIMIT_BACKEND'] == 'sqlite':
+            self.backend = SQLiteBackend(app.config.get('RATE_LIMIT_STORAGE')
+                                         or os.path.join(app.instance_path, 'rate_limit.db'))
+        else:
+            self.backend = MemoryBackend()
+
+    def hit(self, rule, key):
+        """Pakai satu token dari bucket (rule, key); RateLimitExceeded jika habis"""
+        if not self.enabled or not key or rule not in self.rules:
+            return
+        capacity, period = self.rules[rule]
+        retry_after = self.backend.consume(f'{rule}:{key}', capacity, capacity / period)
+        if retry_after:
+            raise RateLimitExceeded(rule, retry_after)
+
+    def reset(self):
+        self.backend.reset()
+
+
+rate_limiter = RateLimiter()
+
+
+def client_key():
+    """Alamat client (request.remote_addr; pasang ProxyFix jika di balik proxy)"""
+    return request.remote_addr
+
+
+def json_field_key(field):
+    """Kunci dari field body JSON, mis. username yang sedang dicoba"""
+    def key():
+        data = request.get_json(silent=True)
+        value = data.get(field) if isinstance(data, dict) else None
+        return value.strip().lower()[:120] if isinstance(value, str) else None
+    return key
+
+
+def rate_limited(*limits):
+    """
+    Decorator untuk method Resource: cek bucket sebelum handler berjalan
+    (sebelum query database atau hashing password).
+
+    Usage:
+    @rate_limited(('login_client', client_key), ('login_username', json_field_key('username')))
+    def post(self):
+        ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            for rule, key_func in limits:
+                rate_limiter.hit(rule, key_func())
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
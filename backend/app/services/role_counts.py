@@ -0,0 +1,80 @@
+import threading
+import time
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session, object_session
+
+
+class RoleUserCounts:
+    """
+    Jumlah user per role dari satu query GROUP BY, di-cache sampai ada user
+    yang ditambah, dihapus atau pindah role (setelah commit). Cache per
+    proses; perubahan dari worker lain terlihat setelah TTL detik.
+    """
+
+    PENDING_KEY = 'role_counts_dirty'
+    TTL = 60
+
+    def __init__(self):
+        self.counts = None
+        self.loaded_at = None
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.listening = False
+
+    def init_app(self, app):
+        from ..models import User
+
+        if self.listening:
+            return
+        event.listen(User, 'after_insert', self._on_change)
+        event.listen(User, 'after_delete', self._on_change)
+        event.listen(User, 'after_update', self._on_update)
+        event.listen(Session, 'after_commit', self._on_commit)
+        event.listen(Session, 'after_soft_rollback', self._on_rollback)
+        self.listening = True
+
+    def get(self):
+        """{role_id: jumlah user}"""
+        with self.lock:
+            counts, loaded_at = self.counts, self.loaded_at
+        if counts is None or loaded_at is None or time.monotonic() - loaded_at > self.TTL:
+            counts = self.refresh()
+        return counts
+
+    def refresh(self):
+        """Hitung ulang dan kembalikan dict yang dibuat (tidak di-cache jika ada invalidate selama query)"""
+        from ..models import db, User
+
+        with self.lock:
+            generation = self.generation
+        counts = dict(db.session.query(User.role_id, func.count(User.id)).group_by(User.role_id).all())
+        with self.lock:
+            if generation == self.generation:
+                self.counts = counts
+                self.loaded_at = time.monotonic()
+        return counts
+
+    def invalidate(self):
+        with self.lock:
+            self.counts = None
+            self.loaded_at = None
+            self.generation += 1
+
+    def _on_change(self, mapper, connection, target):
+        session = object_session(target)
+        if session is not None:
+            session.info[self.PENDING_KEY] = True
+
+    def _on_update(self, mapper, connection, target):
+        if inspect(target).attrs.role_id.history.has_changes():
+            self._on_change(mapper, connection, target)
+
+    def _on_commit(self, session):
+        if session.info.pop(self.PENDING_KEY, False):
+            self.invalidate()
+
+    def _on_rollback(self, session, previous_transaction):
+        session.info.pop(self.PENDING_KEY, None)
+
+
+role_user_counts = RoleUserCounts()
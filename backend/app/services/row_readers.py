@@ -0,0 +1,43 @@
+import csv
+import json
+
+
+def read_error(error):
+    """Pesan error baris untuk file yang tidak bisa dibaca lagi (encoding / CSV rusak)"""
+    if isinstance(error, UnicodeDecodeError):
+        return ValueError('File harus berenkode UTF-8 (simpan sebagai "CSV UTF-8"); sisa file tidak diproses')
+    return ValueError(f'Format file tidak valid ({error}); sisa file tidak diproses')
+
+
+def iter_csv_rows(text_stream):
+    """
+    Baca CSV baris per baris; nomor baris dihitung dari header = 1.
+    File non-UTF-8 atau CSV rusak menghasilkan satu baris error lalu berhenti.
+    """
+    reader = csv.DictReader(text_stream)
+    try:
+        for row in reader:
+            yield reader.line_num, row
+    except (UnicodeDecodeError, csv.Error) as e:
+        yield reader.line_num + 1, read_error(e)
+
+
+def iter_ndjson_rows(text_stream):
+    """Baca NDJSON (satu objek JSON per baris)"""
+    line_num = 0
+    try:
+        for line_num, line in enumerate(text_stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_num, ValueError(f'JSON tidak valid: {e}')
+                continue
+            if not isinstance(row, dict):
+                yield line_num, ValueError('Setiap baris harus berupa objek JSON')
+                continue
+            yield line_num, row
+    except UnicodeDecodeError as e:
+        yield line_num + 1, read_error(e)
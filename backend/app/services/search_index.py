@@ -0,0 +1,325 @@
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from sqlalchemy.orm import load_only
+from .catalog_cache import catalog_cache
+
+# Kata umum Bahasa Indonesia yang tidak ikut diindeks
+STOPWORDS = frozenset('''
+ada adalah agar akan aku anda antara apa atau bagi bahwa banyak belum
+bisa dalam dan dapat dari dengan di dia hanya harus hingga ia ini itu
+jika juga kalau kami kamu karena ke kepada ketika kita lagi lebih maka
+masih mereka namun oleh pada para per saat sampai sangat saya seakan
+sebagai sebuah secara sedang sehingga sejak seorang seperti serta setiap
+sudah suatu supaya tapi telah tentang tersebut tetapi tidak untuk yaitu
+yakni yang dll dsb
+'''.split())
+
+_TOKEN_RE = re.compile(r'[0-9a-z]+')
+_VOWELS = 'aeiou'
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    """
+    Stemmer ringan Bahasa Indonesia (varian algoritma Tala).
+
+    Menghapus partikel (-lah, -kah, ...), kata ganti milik (-ku, -mu, -nya),
+    awalan (meN-, peN-, di-, ter-, ke-, ber-, per-) dan akhiran (-kan, -an, -i).
+    Tidak memakai kamus, jadi hasilnya bukan selalu kata dasar yang benar,
+    tapi konsisten antara dokumen dan query.
+    """
+    if len(word) <= 4 or word.isdigit():
+        return word
+
+    word = _strip_suffix(word, ('kah', 'lah', 'tah', 'pun'))
+    word = _strip_suffix(word, ('nya', 'ku', 'mu'))
+
+    stripped = _strip_first_prefix(word)
+    if stripped != word:
+        word = _strip_second_prefix(stripped)
+    else:
+        word = _strip_second_prefix(word)
+    return _strip_suffix(word, ('kan', 'an', 'i'))
+
+
+def _strip_suffix(word, suffixes):
+    for suffix in suffixes:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def _strip_first_prefix(word):
+    for prefix in ('meng', 'peng'):
+        if word.startswith(prefix) and len(word) - len(prefix) >= 3:
+            return word[len(prefix):]
+    for prefix in ('meny', 'peny'):
+        if word.startswith(prefix) and len(word) - len(prefix) >= 2:
+            return 's' + word[len(prefix):]
+    for prefix, replacement in (('mem', 'p'), ('pem', 'p'), ('men', 't'), ('pen', 't')):
+        if word.startswith(prefix) and len(word) - len(prefix) >= 3:
+            rest = word[len(prefix):]
+            # memukul -> pukul, menulis -> tulis, tapi membaca -> baca
+            return replacement + rest if rest[0] in _VOWELS else rest
+    for prefix in ('me', 'di', 'ter', 'ke'):
+        if word.startswith(prefix) and len(word) - len(prefix) >= 3:
+            return word[len(prefix):]
+    return word
+
+
+def _strip_second_prefix(word):
+    for prefix in ('ber', 'per', 'be', 'pe'):
+        if word.startswith(prefix) and len(word) - len(prefix) >= 3:
+            return word[len(prefix):]
+    return word
+
+
+def tokenize(text):
+    """Pecah teks menjadi term yang sudah di-stem, tanpa stopword"""
+    if not text:
+        return []
+    return [stem(token) for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Inverted index in-memory dengan ranking BM25.
+
+    Setiap dokumen terdiri dari beberapa field teks dengan bobot masing-masing;
+    term frequency dikali bobot field sebelum dimasukkan ke posting list.
+    Dokumen bisa ditambah, diganti dan dihapus satu per satu tanpa rebuild.
+    """
+
+    def __init__(self, field_weights, k1=1.5, b=0.75):
+        self.field_weights = field_weights
+        self.k1 = k1
+        self.b = b
+        self.postings = {}      # term -> {doc_id: weighted tf}
+        self.doc_terms = {}     # doc_id -> Counter(term -> weighted tf)
+        self.doc_lengths = {}   # doc_id -> panjang dokumen (berbobot)
+        self.doc_meta = {}      # doc_id -> data tambahan untuk filter (mis. category_id)
+        self.total_length = 0.0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def _analyze(self, fields):
+        terms = Counter()
+        for name, weight in self.field_weights.items():
+            for term in tokenize(fields.get(name)):
+                terms[term] += weight
+        return terms
+
+    def add(self, doc_id, fields, meta=None):
+        """Tambah atau ganti dokumen"""
+        terms = self._analyze(fields)
+        with self.lock:
+            self._remove(doc_id)
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+            length = sum(terms.values())
+            self.doc_terms[doc_id] = terms
+            self.doc_lengths[doc_id] = length
+            self.doc_meta[doc_id] = meta or {}
+            self.total_length += length
+
+    def remove(self, doc_id):
+        """Hapus dokumen dari index (tidak error jika tidak ada)"""
+        with self.lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        self.doc_meta.pop(doc_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.postings.clear()
+            self.doc_terms.clear()
+            self.doc_lengths.clear()
+            self.doc_meta.clear()
+            self.total_length = 0.0
+
+    def search(self, query, limit=10, predicate=None):
+        """
+        Cari dokumen untuk query. Mengembalikan list (doc_id, score) urut
+        dari skor tertinggi. `predicate(meta)` opsional untuk memfilter hasil.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self.lock:
+            n_docs = len(self.doc_lengths)
+            if n_docs == 0 or self.total_length <= 0:
+                return []
+            # norm(doc) = k1 * (1 - b + b * len(doc) / avgdl) = base + scale * len(doc)
+            base = self.k1 * (1 - self.b)
+            scale = self.k1 * self.b * n_docs / self.total_length
+            doc_lengths = self.doc_lengths
+            scores = {}
+            get_score = scores.get
+
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                df = len(posting)
+                weight = math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) * (self.k1 + 1)
+                for doc_id, tf in posting.items():
+                    scores[doc_id] = get_score(doc_id, 0.0) + weight * tf / (tf + base + scale * doc_lengths[doc_id])
+
+            if predicate is not None:
+                meta = self.doc_meta
+                scores = {doc_id: score for doc_id, score in scores.items() if predicate(meta[doc_id])}
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+class UkmSearchIndex:
+    """
+    Index pencarian UKM aktif, dibangun di thread latar lalu di-update
+    incremental dari perubahan UKM yang sudah di-commit. Selama build
+    pertama search() mengembalikan None (pemanggil memakai pencarian SQL).
+
+    Setiap worker punya index sendiri yang dicatat dengan versi katalog
+    (file penanda catalog_cache). Perubahan dari worker ini diterima lewat
+    catalog_cache.on_bump() bersama versi sebelum dan sesudah bump, jadi
+    versi index ikut maju tanpa rebuild. Versi yang berbeda berarti ada
+    perubahan dari worker lain: index dibangun ulang di latar sementara
+    index lama tetap melayani pencarian. Perubahan selama build diantrikan
+    lalu diterapkan ke index baru sebelum ditukar.
+
+    Dua worker yang bump hampir bersamaan bisa membuat perubahan worker
+    lain terlewat, jadi index yang versinya hanya dimajukan lewat bump
+    tetap dibangun ulang REFRESH_SECONDS kemudian.
+    """
+
+    FIELD_WEIGHTS = {'nama': 3.0, 'deskripsi': 1.0, 'prestasi': 1.0, 'kegiatan_rutin': 1.0}
+    REFRESH_SECONDS = 300
+
+    def __init__(self):
+        self.app = None
+        self.index = BM25Index(self.FIELD_WEIGHTS)
+        self.ready = False
+        self.version = None
+        self.advanced_at = None     # kapan versi pertama kali dimajukan lewat bump sejak build
+        self.pending = None         # perubahan selama build berjalan
+        self.builder_pid = None     # proses yang sedang build (thread tidak ikut ter-fork)
+        self.state_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        catalog_cache.on_bump(self.apply_changes)
+
+    def apply_changes(self, changes, previous, current):
+        """Listener catalog_cache: `changes` (None = perubahan massal) dan versi katalog sebelum/sesudah bump"""
+        with self.state_lock:
+            if self.pending is not None:
+                self.pending.append((changes, previous, current))
+            if not self.ready:
+                return
+            if changes is None:
+                # Perubahan massal: bangun ulang di latar, index lama tetap dipakai
+                self.version = None
+                return
+            _apply(self.index, changes)
+            if previous is not None and previous == self.version:
+                self.version = current
+                self.advanced_at = self.advanced_at or time.monotonic()
+
+    def ensure_built(self):
+        """Mulai (re)build di thread latar jika index belum ada atau versinya tertinggal"""
+        version = catalog_cache.version()
+        with self.state_lock:
+            stale = not self.ready or version != self.version or (
+                self.advanced_at is not None and time.monotonic() - self.advanced_at > self.REFRESH_SECONDS)
+            if not stale or self.builder_pid == os.getpid() or self.app is None:
+                return
+            self.builder_pid = os.getpid()
+        threading.Thread(target=self._build_in_background, name='ukm-search-build', daemon=True).start()
+
+    def _build_in_background(self):
+        from ..models import db
+
+        try:
+            with self.app.app_context():
+                self._build()
+                db.session.remove()
+        except Exception:
+            self.app.logger.exception('Build index pencarian UKM gagal')
+        finally:
+            self.builder_pid = None
+
+    def _build(self):
+        from ..models import UKM
+
+        with self.state_lock:
+            self.pending = []
+        version = catalog_cache.version()
+        index = BM25Index(self.FIELD_WEIGHTS)
+        try:
+            columns = [getattr(UKM, name) for name in self.FIELD_WEIGHTS]
+            query = (UKM.query
+                     .options(load_only(UKM.id, UKM.category_id, *columns))
+                     .filter_by(is_active=True)
+                     .yield_per(1000))
+            for ukm in query:
+                fields = {name: getattr(ukm, name) for name in self.FIELD_WEIGHTS}
+                index.add(ukm.id, fields, {'category_id': ukm.category_id})
+        except BaseException:
+            with self.state_lock:
+                self.pending = None
+            raise
+
+        with self.state_lock:
+            # Perubahan yang di-commit selama query build mungkin belum terbaca; terapkan ulang
+            for changes, previous, current in self.pending:
+                if changes is None:
+                    version = None
+                    continue
+                _apply(index, changes)
+                if previous is not None and previous == version:
+                    version = current
+            self.pending = None
+            self.index = index
+            self.version = version
+            self.advanced_at = None
+            self.ready = True
+
+    def search(self, query, limit=10, category_id=None):
+        """[(ukm_id, skor)] terurut skor, atau None selama index pertama kali dibangun"""
+        self.ensure_built()
+        if not self.ready:
+            return None
+        predicate = None
+        if category_id is not None:
+            predicate = lambda meta: meta.get('category_id') == category_id
+        return self.index.search(query, limit=limit, predicate=predicate)
+
+
+def _apply(index, changes):
+    for change in changes:
+        if change['is_active'] and not change['deleted']:
+            index.add(change['id'], change, {'category_id': change['category_id']})
+        else:
+            index.remove(change['id'])
+
+
+ukm_search_index = UkmSearchIndex()
@@ -0,0 +1,180 @@
+import calendar
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+class BloomFilter:
+    """Bloom filter sederhana (double hashing blake2b) di atas bytearray"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class TokenDenylist:
+    """
+    Daftar token yang dicabut untuk token_in_blocklist_loader JWT.
+
+    Sumber kebenaran ada di tabel revoked_tokens; setiap worker menyimpan
+    salinan di memori: bloom filter + dict JTI -> exp (mayoritas token
+    tidak dicabut dan berhenti di bloom filter) dan dict user_id -> batas
+    waktu terbit untuk "cabut semua sesi". Cek revokasi tidak menjalankan query;
+    thread latar per proses memuat entry baru dari worker lain setiap
+    TOKEN_DENYLIST_SYNC detik dan membuang entry yang sudah expired.
+    """
+
+    SYNC_OVERLAP = 30
+    PRUNE_INTERVAL = 3600
+
+    def __init__(self):
+        self.app = None
+        self.sync_interval = 5
+        self.token_lifetime = timedelta(minutes=15)
+        self.tokens = {}
+        self.cutoffs = {}
+        self.bloom = BloomFilter(1024)
+        self.lock = threading.Lock()
+        self.synced_at = None
+        self.pruned_at = 0
+        self.worker_pid = None
+
+    def init_app(self, app):
+        app.config.setdefault('TOKEN_DENYLIST_SYNC', 5)
+        self.app = app
+        self.sync_interval = app.config['TOKEN_DENYLIST_SYNC']
+        lifetime = app.config.get('JWT_ACCESS_TOKEN_EXPIRES', timedelta(minutes=15))
+        self.token_lifetime = lifetime if isinstance(lifetime, timedelta) else timedelta(seconds=lifetime or 0)
+        with self.lock:
+            self.tokens = {}
+            self.cutoffs = {}
+            self.bloom = BloomFilter(1024)
+            self.synced_at = None
+
+    def is_revoked(self, payload):
+        self._ensure_worker()
+        jti = payload.get('jti')
+        if jti and jti in self.bloom and jti in self.tokens:
+            return True
+        try:
+            cutoff = self.cutoffs.get(int(payload.get('sub')))
+        except (TypeError, ValueError):
+            return False
+        if cutoff is None:
+            return False
+        # Token tanpa iat_ms dianggap terbit di akhir detik iat-nya
+        issued = payload.get('iat_ms') or payload.get('iat', 0) * 1000 + 999
+        return issued <= cutoff[0]
+
+    def revoke_token(self, payload):
+        """Logout: cabut satu token (payload JWT yang sedang dipakai)"""
+        from ..models import db, RevokedToken
+
+        jti = payload['jti']
+        if jti in self.tokens:
+            return
+        entry = RevokedToken(jti=jti, user_id=int(payload['sub']),
+                             expires_at=datetime.utcfromtimestamp(payload['exp']))
+        db.session.add(entry)
+        db.session.commit()
+        self._add(entry)
+
+    def revoke_user(self, user_id):
+        """Cabut semua token user yang terbit sampai detik ini"""
+        from ..models import db, RevokedToken
+
+        now = datetime.utcnow()
+        entry = RevokedToken(user_id=user_id, issued_before=int(time.time() * 1000),
+                             expires_at=now + self.token_lifetime)
+        db.session.add(entry)
+        db.session.commit()
+        self._add(entry)
+
+    def _add(self, entry):
+        expires = calendar.timegm(entry.expires_at.utctimetuple())
+        with self.lock:
+            if entry.jti:
+                if len(self.tokens) >= self.bloom.capacity:
+                    self._rebuild(len(self.tokens) * 2)
+                self.tokens[entry.jti] = expires
+                self.bloom.add(entry.jti)
+            else:
+                current = self.cutoffs.get(entry.user_id)
+                if current is None or entry.issued_before > current[0]:
+                    self.cutoffs[entry.user_id] = (entry.issued_before, expires)
+
+    def _rebuild(self, capacity):
+        bloom = BloomFilter(max(1024, capacity))
+        for jti in self.tokens:
+            bloom.add(jti)
+        self.bloom = bloom
+
+    def sync(self):
+        """Muat entry baru dari database dan buang entry expired (butuh app context)"""
+        from ..models import db, RevokedToken
+
+        started = datetime.utcnow()
+        query = RevokedToken.query.filter(RevokedToken.expires_at > started)
+        if self.synced_at is not None:
+            query = query.filter(RevokedToken.created_at >= self.synced_at - timedelta(seconds=self.SYNC_OVERLAP))
+        for entry in query:
+            self._add(entry)
+        self.synced_at = started
+
+        now = time.time()
+        with self.lock:
+            expired = [jti for jti, expires in self.tokens.items() if expires <= now]
+            for jti in expired:
+                del self.tokens[jti]
+            if expired:
+                self._rebuild(len(self.tokens) * 2)
+            for user_id in [user_id for user_id, (_, expires) in self.cutoffs.items() if expires <= now]:
+                del self.cutoffs[user_id]
+
+        if now - self.pruned_at > self.PRUNE_INTERVAL:
+            RevokedToken.query.filter(RevokedToken.expires_at <= started).delete(synchronize_session=False)
+            db.session.commit()
+            self.pruned_at = now
+        db.session.remove()
+
+    def _ensure_worker(self):
+        # Thread sinkronisasi dibuat per proses (setelah fork worker)
+        pid = os.getpid()
+        if self.worker_pid == pid:
+            return
+        with self.lock:
+            if self.worker_pid == pid:
+                return
+            self.worker_pid = pid
+            threading.Thread(target=self._sync_loop, name='token-denylist-sync', daemon=True).start()
+
+    def _sync_loop(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    self.sync()
+            except Exception:
+                if self.app is not None:
+                    self.app.logger.exception('Sinkronisasi token denylist gagal')
+            time.sleep(self.sync_interval)
+
+
+token_denylist = TokenDenylist()
@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+# Kolom yang mempengaruhi User.token_version
+AUTH_COLUMNS = ('role_id', 'is_active', 'password_hash')
+
+
+class TokenVersionCache:
+    """
+    Cache versi token terkini per user (User.token_version) supaya decorator
+    bisa mengotorisasi dari klaim JWT tanpa query database.
+
+    Commit yang mengubah role_id, is_active atau password_hash (assign_role,
+    nonaktifkan user, ganti password) atau menghapus user menghapus entry
+    user tersebut dan menaikkan file penanda auth_version di instance folder.
+    Cache per proses, tapi setiap entry menyimpan (inode, mtime) penanda saat
+    dibaca dari database; jika penanda sudah berganti (perubahan dari worker
+    lain) entry tidak dipakai dan user dicek ulang ke database.
+    """
+
+    PENDING_KEY = 'token_versions_pending'
+    MAX_ENTRIES = 50000
+
+    def __init__(self):
+        self.entries = {}
+        self.ttl = 60
+        self.marker_file = None
+        self.lock = threading.Lock()
+        self.listening = False
+
+    def init_app(self, app):
+        from ..models import User
+
+        app.config.setdefault('AUTH_VERSION_TTL', 60)
+        self.ttl = app.config['AUTH_VERSION_TTL']
+        self.marker_file = os.path.join(app.instance_path, 'auth_version')
+        os.makedirs(app.instance_path, exist_ok=True)
+        if not os.path.exists(self.marker_file):
+            self.bump()
+        if self.listening:
+            return
+        event.listen(User, 'after_update', self._on_update)
+        event.listen(User, 'after_delete', self._on_delete)
+        event.listen(Session, 'after_commit', self._on_commit)
+        event.listen(Session, 'after_soft_rollback', self._on_rollback)
+        self.listening = True
+
+    def marker(self):
+        """Versi penanda bersama semua worker; baca sebelum query user yang akan di-put"""
+        if self.marker_file is None:
+            return None
+        try:
+            stat = os.stat(self.marker_file)
+            return stat.st_ino, stat.st_mtime_ns
+        except OSError:
+            return None
+
+    def bump(self):
+        # Tulis file baru lalu replace supaya inode selalu berganti (lihat catalog_cache)
+        tmp_file = f'{self.marker_file}.{os.getpid()}.{threading.get_ident()}'
+        with open(tmp_file, 'w') as f:
+            f.write(str(time.time_ns()))
+        os.replace(tmp_file, self.marker_file)
+
+    def get(self, user_id, marker):
+        entry = self.entries.get(user_id)
+        if entry is None or marker is None:
+            return None
+        version, expires_at, entry_marker = entry
+        if entry_marker != marker or time.monotonic() > expires_at:
+            return None
+        return version
+
+    def put(self, user_id, version, marker):
+        if marker is None:
+            return
+        with self.lock:
+            if len(self.entries) >= self.MAX_ENTRIES:
+                self.entries.clear()
+            self.entries[user_id] = (version, time.monotonic() + self.ttl, marker)
+
+    def invalidate(self, user_ids):
+        with self.lock:
+            for user_id in user_ids:
+                self.entries.pop(user_id, None)
+
+    def _mark(self, target):
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault(self.PENDING_KEY, set()).add(target.id)
+
+    def _on_update(self, mapper, connection, target):
+        state = inspect(target)
+        if any(state.attrs[column].history.has_changes() for column in AUTH_COLUMNS):
+            self._mark(target)
+
+    def _on_delete(self, mapper, connection, target):
+        self._mark(target)
+
+    def _on_commit(self, session):
+        pending = session.info.pop(self.PENDING_KEY, None)
+        if pending:
+            self.invalidate(pending)
+            if self.marker_file is not None:
+                self.bump()
+
+    def _on_rollback(self, session, previous_transaction):
+        session.info.pop(self.PENDING_KEY, None)
+
+
+token_versions = TokenVersionCache()
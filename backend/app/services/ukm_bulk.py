@@ -0,0 +1,317 @@
+import csv
+import io
+import json
+from sqlalchemy.exc import SQLAlchemyError
+from ..models import db, UKM, Category
+from .ukm_events import ukm_change_feed
+
+# Kolom yang dikirim saat export dan diterima saat import
+EXPORT_COLUMNS = (
+    'id', 'nama', 'deskripsi', 'category_id', 'category', 'logo_url',
+    'contact_person', 'contact_email', 'contact_phone', 'prestasi',
+    'kegiatan_rutin', 'is_active', 'created_at', 'updated_at'
+)
+IMPORT_TEXT_COLUMNS = (
+    'nama', 'deskripsi', 'logo_url', 'contact_person', 'contact_email',
+    'contact_phone', 'prestasi', 'kegiatan_rutin'
+)
+MAX_LENGTHS = {
+    'nama': 100,
+    'logo_url': 255,
+    'contact_person': 100,
+    'contact_email': 120,
+    'contact_phone': 20
+}
+FORMATS = ('csv', 'ndjson')
+MAX_REPORTED_ERRORS = 1000
+
+
+class UkmImporter:
+    """
+    Import UKM massal dari baris-baris dict (hasil iter_csv_rows/iter_ndjson_rows).
+
+    Kategori di-resolve dari map nama->id yang dimuat sekali per import.
+    Baris valid di-insert dengan executemany per `batch_size` baris, satu
+    commit per batch. Baris yang gagal validasi dilaporkan per nomor baris.
+    """
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        categories = db.session.query(Category.id, Category.name).all()
+        self.category_ids = {category_id for category_id, _ in categories}
+        self.category_by_name = {name.strip().lower(): category_id for category_id, name in categories}
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def validate(self, row):
+        """Kembalikan (values, errors) untuk satu baris input"""
+        errors = []
+        values = {}
+
+        for column in IMPORT_TEXT_COLUMNS:
+            value = row.get(column)
+            if value is not None and not isinstance(value, str):
+                value = str(value)
+            value = value.strip() if value else None
+            if value and column in MAX_LENGTHS and len(value) > MAX_LENGTHS[column]:
+                errors.append(f'{column} maksimal {MAX_LENGTHS[column]} karakter')
+            values[column] = value or None
+
+        if not values['nama']:
+            errors.append('nama wajib diisi')
+        if not values['deskripsi']:
+            errors.append('deskripsi wajib diisi')
+
+        category_id = self._resolve_category(row)
+        if category_id is None:
+            errors.append('Category tidak ditemukan')
+        values['category_id'] = category_id
+
+        is_active = row.get('is_active')
+        if isinstance(is_active, str):
+            is_active = is_active.strip().lower() or None
+            if is_active is not None:
+                is_active = is_active not in ('0', 'false', 'no', 'tidak')
+        values['is_active'] = True if is_active is None else bool(is_active)
+
+        return values, errors
+
+    def _resolve_category(self, row):
+        category_id = row.get('category_id')
+        if category_id not in (None, ''):
+            try:
+                category_id = int(category_id)
+            except (TypeError, ValueError):
+                return None
+            return category_id if category_id in self.category_ids else None
+
+        name = row.get('category')
+        if isinstance(name, str) and name.strip():
+            return self.category_by_name.get(name.strip().lower())
+        return None
+
+    def report_error(self, line_num, messages):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': line_num, 'errors': messages})
+
+    def run(self, rows):
+        batch = []
+        batch_lines = []
+        try:
+            for line_num, row in rows:
+                if isinstance(row, Exception):
+                    self.report_error(line_num, [str(row)])
+                    continue
+
+                values, errors = self.validate(row)
+                if errors:
+                    self.report_error(line_num, errors)
+                    continue
+
+                batch.append(values)
+                batch_lines.append(line_num)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, batch_lines)
+                    batch, batch_lines = [], []
+
+            if batch:
+                self._flush(batch, batch_lines)
+        finally:
+            if self.inserted:
+                # Insert lewat Core tidak memicu event mapper; batch yang sudah
+                # di-commit tetap diumumkan walau batch berikutnya gagal
+                ukm_change_feed.publish(None)
+        return self.report()
+
+    def _flush(self, batch, batch_lines):
+        try:
+            db.session.execute(UKM.__table__.insert(), batch)
+            db.session.commit()
+            self.inserted += len(batch)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            message = f'Gagal menyimpan batch: {e.__class__.__name__}'
+            for line_num in batch_lines:
+                self.report_error(line_num, [message])
+
+    def report(self):
+        return {
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+
+def export_rows(include_inactive=False, batch_size=1000):
+    """Iterasi baris export (dict) dengan server-side cursor (yield_per)"""
+    query = (db.session.query(
+                UKM.id, UKM.nama, UKM.deskripsi, UKM.category_id,
+                Category.name.label('category'), UKM.logo_url,
+                UKM.contact_person, UKM.contact_email, UKM.contact_phone,
+                UKM.prestasi, UKM.kegiatan_rutin, UKM.is_active,
+                UKM.created_at, UKM.updated_at)
+             .outerjoin(Category, UKM.category_id == Category.id)
+             .order_by(UKM.id))
+    if not include_inactive:
+        query = query.filter(UKM.is_active == True)
+
+    for row in query.yield_per(batch_size):
+        data = row._asdict()
+        for column in ('created_at', 'updated_at'):
+            if data[column] is not None:
+                data[column] = data[column].isoformat()
+        yield data
+
+
+def generate_csv(rows, chunk_rows=500):
+    """Ubah iterasi dict menjadi potongan teks CSV"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def generate_ndjson(rows, chunk_rows=500):
+    """Ubah iterasi dict menjadi potongan teks NDJSON"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, ensure_ascii=False))
+        if len(lines) >= chunk_rows:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+# Field yang boleh diubah lewat batch PATCH
+BATCH_FIELDS = IMPORT_TEXT_COLUMNS + ('category_id', 'is_active')
+MAX_BATCH_IDS = 1000
+
+
+class BatchError(ValueError):
+    """Request batch tidak valid (dikembalikan sebagai 400)"""
+
+
+def _validate_batch_values(values, category_ids):
+    if not isinstance(values, dict) or not values:
+        raise BatchError('set harus berupa objek berisi field yang diubah')
+
+    unknown = set(values) - set(BATCH_FIELDS)
+    if unknown:
+        raise BatchError(f"Field tidak bisa diubah: {', '.join(sorted(unknown))}")
+
+    clean = {}
+    for column, value in values.items():
+        if column == 'is_active':
+            if not isinstance(value, bool):
+                raise BatchError('is_active harus boolean')
+        elif column == 'category_id':
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise BatchError('category_id harus berupa integer')
+            if value not in category_ids:
+                raise BatchError('Category tidak ditemukan')
+        else:
+            if value is not None and not isinstance(value, str):
+                raise BatchError(f'{column} harus berupa string')
+            if column in ('nama', 'deskripsi') and not value:
+                raise BatchError(f'{column} tidak boleh kosong')
+            if value and column in MAX_LENGTHS and len(value) > MAX_LENGTHS[column]:
+                raise BatchError(f'{column} maksimal {MAX_LENGTHS[column]} karakter')
+        clean[column] = value
+    return clean
+
+
+def _validate_ids(ids):
+    if not isinstance(ids, list) or not ids:
+        raise BatchError('ids harus berupa list ID UKM')
+    if not all(isinstance(ukm_id, int) and not isinstance(ukm_id, bool) for ukm_id in ids):
+        raise BatchError('Setiap ID harus berupa integer')
+    return list(dict.fromkeys(ids))
+
+
+def _existing_ids(ids):
+    rows = db.session.query(UKM.id, UKM.is_active).filter(UKM.id.in_(ids)).all()
+    return {ukm_id: is_active for ukm_id, is_active in rows}
+
+
+def apply_batch_update(operations):
+    """
+    Terapkan beberapa operasi {ids, set} sebagai UPDATE ... WHERE id IN (...)
+    dalam satu transaksi. Mengembalikan list hasil per (operasi, id).
+    """
+    if not isinstance(operations, list) or not operations:
+        raise BatchError('operations harus berupa list')
+
+    category_ids = None
+    parsed = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            raise BatchError(f'Operasi ke-{index} harus berupa objek')
+        if 'category_id' in (operation.get('set') or {}) and category_ids is None:
+            category_ids = {category_id for category_id, in db.session.query(Category.id)}
+        parsed.append((_validate_ids(operation.get('ids')),
+                       _validate_batch_values(operation.get('set'), category_ids or set())))
+
+    all_ids = list(dict.fromkeys(ukm_id for ids, _ in parsed for ukm_id in ids))
+    if len(all_ids) > MAX_BATCH_IDS:
+        raise BatchError(f'Maksimal {MAX_BATCH_IDS} ID per request')
+
+    existing = _existing_ids(all_ids)
+    results = []
+    for index, (ids, values) in enumerate(parsed):
+        found = [ukm_id for ukm_id in ids if ukm_id in existing]
+        if found:
+            db.session.query(UKM).filter(UKM.id.in_(found)).update(values, synchronize_session=False)
+        for ukm_id in ids:
+            results.append({
+                'id': ukm_id,
+                'operation': index,
+                'status': 'updated' if ukm_id in existing else 'not_found'
+            })
+
+    _commit_batch()
+    return results
+
+
+def apply_batch_delete(ids):
+    """Soft delete banyak UKM dengan satu UPDATE dan satu commit"""
+    ids = _validate_ids(ids)
+    if len(ids) > MAX_BATCH_IDS:
+        raise BatchError(f'Maksimal {MAX_BATCH_IDS} ID per request')
+
+    existing = _existing_ids(ids)
+    active = [ukm_id for ukm_id, is_active in existing.items() if is_active]
+    if active:
+        db.session.query(UKM).filter(UKM.id.in_(active)).update(
+            {'is_active': False}, synchronize_session=False)
+    _commit_batch()
+
+    results = []
+    for ukm_id in ids:
+        if ukm_id not in existing:
+            status = 'not_found'
+        elif existing[ukm_id]:
+            status = 'deleted'
+        else:
+            status = 'already_inactive'
+        results.append({'id': ukm_id, 'status': status})
+    return results
+
+
+def _commit_batch():
+    try:
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+    # UPDATE lewat query tidak memicu event mapper
+    ukm_change_feed.publish(None)
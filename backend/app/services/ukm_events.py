@@ -0,0 +1,70 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+
+class UkmChangeFeed:
+    """
+    Meneruskan perubahan UKM yang sudah di-commit ke cache in-memory.
+
+    Perubahan dicatat saat flush (after_insert/after_update/after_delete)
+    dan baru dikirim ke subscriber setelah transaksi commit, sehingga
+    rollback tidak mengotori cache. Subscriber menerima list snapshot:
+    dict berisi semua kolom UKM ditambah key 'deleted'.
+
+    Penulisan lewat Core (bulk insert/update) tidak memicu event mapper;
+    setelah commit, pemanggil wajib memanggil publish(None) yang berarti
+    "data UKM berubah, muat ulang semuanya".
+    """
+
+    PENDING_KEY = 'ukm_changes_pending'
+
+    def __init__(self):
+        self.subscribers = []
+        self.listening = False
+
+    def subscribe(self, callback):
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+
+    def init_app(self, app):
+        from ..models import UKM
+
+        if self.listening:
+            return
+        event.listen(UKM, 'after_insert', self._on_change)
+        event.listen(UKM, 'after_update', self._on_change)
+        event.listen(UKM, 'after_delete', self._on_delete)
+        event.listen(Session, 'after_commit', self._on_commit)
+        event.listen(Session, 'after_soft_rollback', self._on_rollback)
+        self.listening = True
+
+    def _record(self, mapper, target, deleted):
+        session = object_session(target)
+        if session is None:
+            return
+        snapshot = {attr.key: getattr(target, attr.key) for attr in mapper.column_attrs}
+        snapshot['deleted'] = deleted
+        session.info.setdefault(self.PENDING_KEY, {})[target.id] = snapshot
+
+    def _on_change(self, mapper, connection, target):
+        self._record(mapper, target, deleted=False)
+
+    def _on_delete(self, mapper, connection, target):
+        self._record(mapper, target, deleted=True)
+
+    def _on_commit(self, session):
+        pending = session.info.pop(self.PENDING_KEY, None)
+        if not pending:
+            return
+        self.publish(list(pending.values()))
+
+    def publish(self, changes):
+        """Kirim perubahan yang sudah di-commit ke semua subscriber"""
+        for callback in self.subscribers:
+            callback(changes)
+
+    def _on_rollback(self, session, previous_transaction):
+        session.info.pop(self.PENDING_KEY, None)
+
+
+ukm_change_feed = UkmChangeFeed()
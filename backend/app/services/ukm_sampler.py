@@ -0,0 +1,75 @@
+import random
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from .ukm_events import ukm_change_feed
+
+
+class ActiveUkmSampler:
+    """
+    Menyimpan ID semua UKM aktif dalam array terurut supaya sampling acak
+    cukup O(k) tanpa memuat tabel UKM.
+
+    Array di-update dari perubahan UKM yang sudah di-commit di worker ini,
+    dan dimuat ulang (hanya kolom id) setiap REFRESH_SECONDS supaya
+    perubahan dari worker lain ikut terbawa.
+    """
+
+    REFRESH_SECONDS = 300
+
+    def __init__(self):
+        self.ids = array('q')
+        self.loaded_at = None
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        ukm_change_feed.init_app(app)
+        ukm_change_feed.subscribe(self.apply_changes)
+
+    def apply_changes(self, changes):
+        with self.lock:
+            if self.loaded_at is None:
+                return
+            if changes is None:
+                # Perubahan massal: muat ulang saat sampling berikutnya
+                self.loaded_at = None
+                return
+            for change in changes:
+                ukm_id = change['id']
+                pos = bisect_left(self.ids, ukm_id)
+                present = pos < len(self.ids) and self.ids[pos] == ukm_id
+                active = change['is_active'] and not change['deleted']
+                if active and not present:
+                    self.ids.insert(pos, ukm_id)
+                elif not active and present:
+                    del self.ids[pos]
+
+    def refresh(self):
+        """Muat ulang daftar ID UKM aktif dari database"""
+        from ..models import db, UKM
+
+        rows = db.session.query(UKM.id).filter(UKM.is_active == True).order_by(UKM.id).all()
+        with self.lock:
+            self.ids = array('q', (row[0] for row in rows))
+            self.loaded_at = time.monotonic()
+
+    def ensure_loaded(self):
+        loaded_at = self.loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.REFRESH_SECONDS:
+            self.refresh()
+
+    def sample(self, k, seed=None):
+        """
+        Pilih maksimal k ID UKM aktif secara acak. Dengan `seed` yang sama
+        (dan daftar UKM yang sama) hasilnya selalu sama.
+        """
+        self.ensure_loaded()
+        rng = random.Random(seed) if seed is not None else random
+        with self.lock:
+            ids = self.ids
+            positions = rng.sample(range(len(ids)), min(k, len(ids)))
+            return [ids[pos] for pos in positions]
+
+
+active_ukm_sampler = ActiveUkmSampler()
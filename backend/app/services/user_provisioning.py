@@ -0,0 +1,167 @@
+import secrets
+from sqlalchemy.exc import SQLAlchemyError
+from ..models import db, User, Role
+from .password_hasher import password_hasher
+from .role_counts import role_user_counts
+
+# Kolom CSV provisioning; username, email dan student_id (NIM) wajib
+PROVISION_COLUMNS = ('username', 'email', 'student_id', 'faculty', 'full_name', 'major', 'password')
+REQUIRED_COLUMNS = ('username', 'email', 'student_id')
+MAX_LENGTHS = {
+    'username': 80,
+    'email': 120,
+    'student_id': 20,
+    'faculty': 100,
+    'full_name': 100,
+    'major': 100
+}
+MIN_PASSWORD_LENGTH = 6
+LOOKUP_CHUNK = 1000
+
+
+def generate_initial_password():
+    """Password awal acak untuk akun tanpa kolom password"""
+    return secrets.token_urlsafe(9)
+
+
+class StudentProvisioner:
+    """
+    Buat akun mahasiswa massal dari baris-baris dict (hasil iter_csv_rows).
+
+    Semua baris divalidasi dulu. Keunikan username, email dan NIM dicek
+    dengan query IN per LOOKUP_CHUNK nilai (bukan dua SELECT per baris),
+    termasuk duplikat di dalam file itu sendiri. Password di-hash paralel
+    lewat password_hasher.hash_many, lalu baris valid di-insert dengan
+    executemany per `batch_size` baris, satu commit per batch.
+
+    Laporan berisi hasil per baris; akun tanpa password di CSV mendapat
+    password awal acak yang hanya dikirim sekali di laporan ini.
+    """
+
+    def __init__(self, role_name='user', batch_size=500, hash_workers=None):
+        self.role = Role.query.filter_by(name=role_name).first()
+        self.batch_size = batch_size
+        self.hash_workers = hash_workers
+        self.results = []
+        self.created = 0
+        self.failed = 0
+
+    def validate(self, row):
+        """Kembalikan (values, errors) untuk satu baris input"""
+        errors = []
+        values = {}
+        for column in PROVISION_COLUMNS:
+            value = row.get(column)
+            if value is not None and not isinstance(value, str):
+                value = str(value)
+            value = value.strip() if value else None
+            if value and column in MAX_LENGTHS and len(value) > MAX_LENGTHS[column]:
+                errors.append(f'{column} maksimal {MAX_LENGTHS[column]} karakter')
+            values[column] = value or None
+
+        for column in REQUIRED_COLUMNS:
+            if not values[column]:
+                errors.append(f'{column} wajib diisi')
+        if values['email'] and '@' not in values['email']:
+            errors.append('email tidak valid')
+        if values['password'] and len(values['password']) < MIN_PASSWORD_LENGTH:
+            errors.append(f'password minimal {MIN_PASSWORD_LENGTH} karakter')
+        return values, errors
+
+    def report_error(self, line_num, username, messages):
+        self.failed += 1
+        self.results.append({'row': line_num, 'username': username, 'status': 'error', 'errors': messages})
+
+    def run(self, rows):
+        if self.role is None:
+            raise ValueError('Role tidak ditemukan')
+
+        # 1. Validasi per baris + duplikat di dalam file
+        pending = []
+        seen = {'username': set(), 'email': set(), 'student_id': set()}
+        for line_num, row in rows:
+            if isinstance(row, Exception):
+                self.report_error(line_num, None, [str(row)])
+                continue
+            values, errors = self.validate(row)
+            for column, values_seen in seen.items():
+                key = (values[column] or '').lower()
+                if key and key in values_seen:
+                    errors.append(f'{column} duplikat di file')
+                elif key:
+                    values_seen.add(key)
+            if errors:
+                self.report_error(line_num, values['username'], errors)
+            else:
+                pending.append((line_num, values))
+
+        # 2. Keunikan terhadap database dengan query berbasis set
+        taken = {column: self._existing(column, [values[column] for _, values in pending])
+                 for column in seen}
+        accepted = []
+        for line_num, values in pending:
+            errors = [f'{column} sudah terdaftar' for column in seen
+                      if values[column].lower() in taken[column]]
+            if errors:
+                self.report_error(line_num, values['username'], errors)
+            else:
+                accepted.append((line_num, values))
+
+        # 3. Hash password paralel
+        initial_passwords = {}
+        for line_num, values in accepted:
+            if not values['password']:
+                values['password'] = initial_passwords[line_num] = generate_initial_password()
+        hashes = password_hasher.hash_many([values['password'] for _, values in accepted],
+                                           workers=self.hash_workers)
+
+        # 4. Insert per batch
+        for start in range(0, len(accepted), self.batch_size):
+            batch = accepted[start:start + self.batch_size]
+            self._flush(batch, hashes[start:start + self.batch_size], initial_passwords)
+
+        if self.created:
+            # Insert lewat Core tidak memicu event mapper
+            role_user_counts.invalidate()
+        self.results.sort(key=lambda result: result['row'])
+        return self.report()
+
+    def _existing(self, column, values):
+        """Nilai `column` (lowercase) yang sudah ada di tabel users"""
+        attr = getattr(User, column)
+        existing = set()
+        unique_values = list({value for value in values if value})
+        for start in range(0, len(unique_values), LOOKUP_CHUNK):
+            chunk = unique_values[start:start + LOOKUP_CHUNK]
+            existing.update(value.lower() for value, in db.session.query(attr).filter(attr.in_(chunk)))
+        return existing
+
+    def _flush(self, batch, hashes, initial_passwords):
+        records = []
+        for (line_num, values), password_hash in zip(batch, hashes):
+            record = {column: values[column] for column in PROVISION_COLUMNS if column != 'password'}
+            record.update(password_hash=password_hash, role_id=self.role.id)
+            records.append(record)
+        try:
+            db.session.execute(User.__table__.insert(), records)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            message = f'Gagal menyimpan batch: {e.__class__.__name__}'
+            for line_num, values in batch:
+                self.report_error(line_num, values['username'], [message])
+            return
+
+        self.created += len(batch)
+        for line_num, values in batch:
+            result = {'row': line_num, 'username': values['username'], 'status': 'created'}
+            if line_num in initial_passwords:
+                result['initial_password'] = initial_passwords[line_num]
+            self.results.append(result)
+
+    def report(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'results': self.results
+        }
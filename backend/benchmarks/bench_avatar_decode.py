@@ -0,0 +1,103 @@
+"""
+Benchmark pemrosesan upload avatar: waktu dan puncak RSS per upload,
+file staging + convert/thumbnail (cara lama) vs cek header + draft()
+langsung dari stream (inspect_image + render_avatar_set).
+
+Setiap varian dijalankan di proses baru supaya puncak RSS tidak
+tercampur (Linux, membaca VmHWM). Jalankan dari folder backend:
+    python benchmarks/bench_avatar_decode.py
+"""
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+SAMPLES = {
+    'jpeg-6000x4000': ('JPEG', 'RGB', (6000, 4000)),
+    'jpeg-gray-6000x4000': ('JPEG', 'L', (6000, 4000)),
+    'jpeg-cmyk-6000x4000': ('JPEG', 'CMYK', (6000, 4000)),
+    'png-3000x2000': ('PNG', 'RGB', (3000, 2000)),
+}
+
+
+def make_sample(path, image_format, mode, size):
+    # Gradien + noise supaya ukuran file mirip foto ponsel
+    base = Image.linear_gradient('L').resize(size)
+    noise = Image.effect_noise(size, 40)
+    image = Image.merge('RGB', (base, noise, base.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    image.convert(mode).save(path, image_format, quality=92)
+
+
+def peak_rss():
+    # VmHWM (KB) direset saat exec; ru_maxrss ikut mewarisi puncak proses induk
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1])
+    return 0
+
+
+def legacy_render(data, folder):
+    """Cara lama: simpan upload ke file staging, buka ulang, convert lalu thumbnail"""
+    from app.services.file_upload import AVATAR_FORMATS, AVATAR_RENDITIONS
+    path = os.path.join(folder, 'upload.tmp')
+    with open(path, 'wb') as f:
+        f.write(data)
+    largest = max(AVATAR_RENDITIONS)
+    with Image.open(path) as img:
+        # convert() sebelum thumbnail memaksa decode penuh untuk mode selain RGB
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.thumbnail((largest, largest), Image.Resampling.LANCZOS)
+        master = Image.new('RGB', (largest, largest), (255, 255, 255))
+        master.paste(img, ((largest - img.size[0]) // 2, (largest - img.size[1]) // 2))
+    for size in AVATAR_RENDITIONS:
+        image = master if size == largest else master.resize((size, size), Image.Resampling.LANCZOS)
+        for ext, image_format, options in AVATAR_FORMATS:
+            image.save(os.path.join(folder, f'legacy-{size}.{ext}'), image_format, **options)
+    os.remove(path)
+
+
+def child(variant, sample_path):
+    from app.services.file_upload import inspect_image, render_avatar_set
+
+    with open(sample_path, 'rb') as f:
+        data = f.read()
+    folder = tempfile.mkdtemp()
+    baseline = peak_rss()
+    start = time.perf_counter()
+    if variant == 'lama':
+        legacy_render(data, folder)
+    else:
+        stream = io.BytesIO(data)
+        inspect_image(stream)
+        render_avatar_set(stream, folder)
+    elapsed = time.perf_counter() - start
+    peak = peak_rss()
+    print(f'{elapsed * 1000:.0f} {(peak - baseline) / 1024:.1f}')
+
+
+def main():
+    folder = tempfile.mkdtemp()
+    print(f'{"sampel":22} {"varian":7} {"ukuran":>8} {"waktu":>8} {"puncak RSS":>12}')
+    for name, (image_format, mode, size) in SAMPLES.items():
+        path = os.path.join(folder, f'{name}.{image_format.lower()}')
+        make_sample(path, image_format, mode, size)
+        file_size = os.path.getsize(path) / 1024 / 1024
+        for variant in ('lama', 'baru'):
+            output = subprocess.run([sys.executable, __file__, '--child', variant, path],
+                                    capture_output=True, text=True, check=True).stdout.split()
+            print(f'{name:22} {variant:7} {file_size:6.1f}MB {output[0]:>6}ms {output[1]:>9} MB')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,83 @@
+"""
+Benchmark pengiriman avatar: request per detik yang bisa dijawab satu
+worker untuk setiap AVATAR_DELIVERY (send_file, x-sendfile,
+x-accel-redirect, memory) dan untuk memory + If-None-Match (304).
+
+Pada mode x-sendfile/x-accel-redirect worker hanya mengirim header; isi
+file dikirim proxy dan tidak ikut diukur di sini.
+
+Jalankan dari folder backend:
+    python benchmarks/bench_avatar_delivery.py [detik_per_mode] [jumlah_avatar]
+"""
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from PIL import Image
+from app import create_app
+from app.services.avatar_delivery import avatar_delivery
+from app.services.file_upload import file_upload_service, render_avatar_set
+
+
+def make_avatars(folder, count):
+    keys = []
+    for i in range(count):
+        source = Image.effect_noise((640, 480), 30 + i % 50).convert('RGB')
+        path = os.path.join(folder, 'source.png')
+        source.save(path)
+        keys.append(render_avatar_set(path, folder))
+    os.remove(path)
+    return keys
+
+
+def run(client, urls, seconds, etags=None):
+    headers = {'Accept': 'image/avif,image/webp,*/*'}
+    conditional = etags is not None
+    requests = 0
+    transferred = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    for url in itertools.cycle(urls):
+        request_headers = headers
+        if conditional and url in etags:
+            request_headers = {**headers, 'If-None-Match': etags[url]}
+        response = client.get(url, headers=request_headers)
+        transferred += len(response.data)
+        if conditional and 'ETag' in response.headers:
+            etags[url] = response.headers['ETag']
+        response.close()
+        requests += 1
+        if requests % 100 == 0 and time.perf_counter() > deadline:
+            break
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, transferred / requests
+
+
+def main(seconds, count):
+    app = create_app()
+    file_upload_service.UPLOAD_FOLDER = tempfile.mkdtemp()
+    keys = make_avatars(file_upload_service.UPLOAD_FOLDER, count)
+    urls = [f'/static/uploads/avatars/{key}-{size}' for key in keys for size in (48, 96, 300)]
+    client = app.test_client()
+
+    print(f'{len(urls)} URL avatar, {seconds}s per mode')
+    print(f'{"mode":26} {"req/s":>8} {"byte/req":>9}')
+    cases = [('send_file', False), ('x-sendfile', False), ('x-accel-redirect', False),
+             ('memory', False), ('memory', True)]
+    for mode, conditional in cases:
+        app.config['AVATAR_DELIVERY'] = mode
+        avatar_delivery.init_app(app)
+        etags = {} if conditional else None
+        run(client, urls, 0.5, etags)  # isi LRU, cache OS dan ETag client
+        rps, size = run(client, urls, seconds, etags)
+        label = f'{mode} + If-None-Match' if conditional else mode
+        print(f'{label:26} {rps:8.0f} {size:9.0f}')
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 3, int(sys.argv[2]) if len(sys.argv) > 2 else 100)
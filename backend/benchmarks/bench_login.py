@@ -0,0 +1,85 @@
+"""
+Benchmark login: throughput login paralel dan latency endpoint katalog
+selama lonjakan login, hashing inline vs process pool password_hasher.
+
+Jalankan dari folder backend:
+    python benchmarks/bench_login.py [jumlah_login] [thread]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench_login.db')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{DB_FILE}')
+
+from app import create_app
+from app.services.password_hasher import password_hasher
+
+
+def run(app, workers, logins, threads):
+    app.config['PASSWORD_HASH_WORKERS'] = workers
+    password_hasher.init_app(app)
+
+    # Pemanasan: pool dibuat dan cache katalog terisi
+    client = app.test_client()
+    client.post('/api/auth/login', json={'username': 'admin', 'password': 'password123'})
+    client.get('/api/ukm/categories')
+
+    remaining = iter(range(logins))
+    lock = threading.Lock()
+    done = threading.Event()
+    catalog_latencies = []
+
+    def login_worker():
+        c = app.test_client()
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            response = c.post('/api/auth/login', json={'username': 'admin', 'password': 'password123'})
+            assert response.status_code == 200, response.status_code
+
+    def catalog_worker():
+        c = app.test_client()
+        while not done.is_set():
+            start = time.perf_counter()
+            c.get('/api/ukm/categories')
+            catalog_latencies.append(time.perf_counter() - start)
+            time.sleep(0.005)
+
+    catalog = threading.Thread(target=catalog_worker)
+    catalog.start()
+    start = time.perf_counter()
+    pool = [threading.Thread(target=login_worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    catalog.join()
+    password_hasher.shutdown()
+
+    latencies = sorted(catalog_latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+    label = 'inline' if not workers else f'pool x{workers}'
+    print(f'{label:10}: {logins / elapsed:7.1f} login/s | katalog p50 '
+          f'{statistics.median(latencies) * 1000:6.1f} ms, p95 {p95 * 1000:6.1f} ms')
+
+
+def main(logins, threads):
+    app = create_app()
+    print(f'{logins} login, {threads} thread, method {app.config["PASSWORD_HASH_METHOD"]}, '
+          f'{os.cpu_count()} CPU')
+    run(app, 0, logins, threads)
+    for workers in sorted({1, max(1, min(4, os.cpu_count() or 1))}):
+        run(app, workers, logins, threads)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 8)
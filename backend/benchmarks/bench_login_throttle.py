@@ -0,0 +1,83 @@
+"""
+Benchmark throttling login: latency login sah selama serangan tebak
+password (beberapa IP, username target), tanpa dan dengan rate limiter.
+
+Jalankan dari folder backend:
+    python benchmarks/bench_login_throttle.py [detik] [thread_penyerang] [memory|sqlite]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TMP_DIR = tempfile.mkdtemp()
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{os.path.join(TMP_DIR, "bench_throttle.db")}')
+
+from app import create_app
+from app.services.rate_limit import rate_limiter
+
+
+def run(app, enabled, backend, seconds, attackers):
+    app.config['RATE_LIMIT_ENABLED'] = enabled
+    app.config['RATE_LIMIT_BACKEND'] = backend
+    app.config['RATE_LIMIT_STORAGE'] = os.path.join(TMP_DIR, 'rate_limit.db')
+    rate_limiter.init_app(app)
+    rate_limiter.reset()
+
+    done = threading.Event()
+    counts = {'attack': 0, 'rejected': 0}
+    lock = threading.Lock()
+    latencies = []
+
+    def attacker(n):
+        c = app.test_client()
+        environ = {'REMOTE_ADDR': f'10.0.0.{n}'}
+        while not done.is_set():
+            response = c.post('/api/auth/login', json={'username': 'user1', 'password': 'tebakan'},
+                              environ_base=environ)
+            with lock:
+                counts['attack'] += 1
+                counts['rejected'] += response.status_code == 429
+
+    def legit():
+        c = app.test_client()
+        while not done.is_set():
+            start = time.perf_counter()
+            response = c.post('/api/auth/login', json={'username': 'admin', 'password': 'password123'},
+                              environ_base={'REMOTE_ADDR': '10.1.0.1'})
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code in (200, 429), response.status_code
+            time.sleep(0.2)
+
+    threads = [threading.Thread(target=attacker, args=(n,)) for n in range(attackers)]
+    threads.append(threading.Thread(target=legit))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    done.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    label = f'limiter {backend}' if enabled else 'tanpa limiter'
+    print(f'{label:15}: login sah p50 {statistics.median(latencies) * 1000:6.1f} ms, '
+          f'p95 {p95 * 1000:6.1f} ms | serangan {counts["attack"] / seconds:7.1f} req/s, '
+          f'{counts["rejected"]} ditolak 429')
+
+
+def main(seconds, attackers, backend):
+    app = create_app()
+    print(f'{seconds}s, {attackers} thread penyerang, method {app.config["PASSWORD_HASH_METHOD"]}, '
+          f'{os.cpu_count()} CPU')
+    run(app, False, backend, seconds, attackers)
+    run(app, True, backend, seconds, attackers)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+         sys.argv[3] if len(sys.argv) > 3 else 'memory')
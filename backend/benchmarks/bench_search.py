@@ -0,0 +1,77 @@
+"""
+Benchmark index pencarian UKM (BM25Index): waktu build, latensi p50/p95
+beberapa query, dan waktu update incremental per UKM.
+
+Data sintetis: setiap UKM sekitar 77 kata, 60% dari daftar kata umum
+UKM (posting list panjang), sisanya kata jarang dengan sebaran Pareto.
+
+Jalankan dari folder backend:
+    python benchmarks/bench_search.py [jumlah_ukm]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.search_index import BM25Index, UkmSearchIndex
+
+COMMON = '''
+catur musik debat basket sepak bola juara nasional latihan kegiatan
+pertandingan mahasiswa seni tari teater fotografi robotika penalaran
+menulis membaca berenang voli bulutangkis paduan suara pecinta alam
+mendaki gunung karate taekwondo silat pramuka koperasi jurnalistik film
+bahasa inggris jepang komputer yang dan di untuk
+'''.split()
+RARE = [f'kata{i}' for i in range(20000)]
+QUERIES = ['catur', 'juara nasional catur', 'latihan mahasiswa kegiatan pertandingan', 'kata1234']
+
+
+def text(rng, words):
+    return ' '.join(rng.choice(COMMON) if rng.random() < 0.6 else RARE[int(rng.paretovariate(1.1)) % len(RARE)]
+                    for _ in range(words))
+
+
+def make_docs(count):
+    rng = random.Random(1)
+    return [{
+        'nama': 'UKM ' + text(rng, 2),
+        'deskripsi': text(rng, 40),
+        'prestasi': text(rng, 20),
+        'kegiatan_rutin': text(rng, 15),
+    } for _ in range(count)]
+
+
+def percentiles(fn, repeat=21):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2], times[int(len(times) * 0.95) - 1]
+
+
+def main(count):
+    docs = make_docs(count)
+    index = BM25Index(UkmSearchIndex.FIELD_WEIGHTS)
+
+    start = time.perf_counter()
+    for i, fields in enumerate(docs):
+        index.add(i, fields, {'category_id': i % 3 + 1})
+    print(f'build {count} UKM: {time.perf_counter() - start:.2f}s')
+
+    for query in QUERIES:
+        p50, p95 = percentiles(lambda: index.search(query, limit=20))
+        print(f'{query!r:45} p50 {p50 * 1000:6.1f}ms  p95 {p95 * 1000:6.1f}ms')
+
+    updates = min(1000, count)
+    start = time.perf_counter()
+    for i in range(updates):
+        index.add(i, docs[i], {'category_id': i % 3 + 1})
+    print(f'update incremental: {(time.perf_counter() - start) / updates * 1000:.3f}ms per UKM')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,53 @@
+"""
+Micro-benchmark serializer: to_dict() + marshal() vs compile_serializer.
+
+Jalankan dari folder backend:
+    python benchmarks/bench_serializers.py [jumlah_ukm]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from flask_restx import marshal
+from sqlalchemy.orm import joinedload
+from app import create_app
+from app.models import db, UKM
+from app.api.ukm_routes import ukm_model, serialize_ukm
+
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(count):
+    app = create_app()
+    with app.app_context():
+        db.session.bulk_insert_mappings(UKM, [{
+            'nama': f'UKM Benchmark {i}',
+            'deskripsi': 'Deskripsi panjang UKM untuk benchmark. ' * 10,
+            'category_id': i % 3 + 1,
+            'prestasi': 'Juara 1 tingkat nasional',
+            'kegiatan_rutin': 'Latihan setiap Sabtu',
+        } for i in range(count)])
+        db.session.commit()
+
+        ukms = UKM.query.options(joinedload(UKM.category)).limit(count).all()
+        assert marshal([u.to_dict() for u in ukms], ukm_model) == [serialize_ukm(u) for u in ukms]
+
+        old = best_of(lambda: marshal([u.to_dict() for u in ukms], ukm_model))
+        new = best_of(lambda: [serialize_ukm(u) for u in ukms])
+        print(f'{len(ukms)} UKM')
+        print(f'to_dict + marshal   : {old * 1000:8.1f} ms')
+        print(f'compile_serializer  : {new * 1000:8.1f} ms  ({old / new:.1f}x lebih cepat)')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
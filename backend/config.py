@@ -1,10 +1,15 @@
 import os
+from datetime import timedelta
 
 class Config:
     """Konfigurasi dasar untuk aplikasi."""
     # Ganti ini dengan kunci yang sangat rahasia di produksi!
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'super-secret-jwt-key'
+    # Token bisa dicabut (logout / cabut semua sesi), jadi masa berlakunya tidak perlu sangat pendek
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=int(os.environ.get('JWT_ACCESS_TOKEN_HOURS', 12)))
+    # Interval (detik) worker memuat token yang dicabut oleh worker lain
+    TOKEN_DENYLIST_SYNC = int(os.environ.get('TOKEN_DENYLIST_SYNC', 5))
     
     # Database configuration
     # MySQL dengan XAMPP (default)
@@ -13,4 +18,40 @@ class Config:
     # Fallback ke SQLite jika MySQL tidak tersedia
     # SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///ukmiverse.db'
     
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Kompresi response (gzip/brotli); body di bawah batas ini tidak dikompres
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', '1') != '0'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+
+    # Hashing password di process pool; cost mengikuti format method werkzeug
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 64))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+    # Batas baris POST /api/auth/users/bulk (hashing terjadi di dalam request); file besar lewat CLI
+    PROVISION_HTTP_MAX_ROWS = int(os.environ.get('PROVISION_HTTP_MAX_ROWS', 100))
+    # Batas ukuran body POST /api/ukm/import (di-stream, jadi tidak dibatasi MAX_CONTENT_LENGTH upload avatar)
+    UKM_IMPORT_MAX_BYTES = int(os.environ.get('UKM_IMPORT_MAX_BYTES', 100 * 1024 * 1024))
+
+    # Lama (detik) versi token user di-cache per worker sebelum dicek ulang ke database
+    AUTH_VERSION_TTL = int(os.environ.get('AUTH_VERSION_TTL', 60))
+
+    # Token bucket sebelum login/register: nama aturan -> (kapasitas, detik untuk terisi penuh).
+    # Backend 'memory' per worker, 'sqlite' dipakai bersama semua worker di satu host
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') != '0'
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE')  # default: instance/rate_limit.db
+    RATE_LIMITS = {
+        'login_client': (20, 60),
+        'login_username': (10, 300),
+        'register_client': (5, 600),
+    }
+
+    # Pengiriman file avatar: 'send_file', 'x-accel-redirect' (nginx: location internal
+    # AVATAR_ACCEL_PREFIX -> alias folder avatars), 'x-sendfile' (Apache/lighttpd) atau
+    # 'memory' (tanpa proxy: LRU file terpanas sebesar AVATAR_CACHE_BYTES per worker)
+    AVATAR_DELIVERY = os.environ.get('AVATAR_DELIVERY', 'send_file')
+    AVATAR_ACCEL_PREFIX = os.environ.get('AVATAR_ACCEL_PREFIX', '/_avatars/')
+    AVATAR_CACHE_BYTES = int(os.environ.get('AVATAR_CACHE_BYTES', 32 * 1024 * 1024))
+    AVATAR_CACHE_MAX_FILE = int(os.environ.get('AVATAR_CACHE_MAX_FILE', 512 * 1024))
@@ -128,7 +128,9 @@ const Header = () => {
                           {user?.avatar_url ? (
                             <img
                               key={user.avatar_url} // Force re-render when avatar URL changes
-                              src={user.avatar_url}
+                              src={user.avatar_renditions?.['96'] || user.avatar_url}
+                              srcSet={user.avatar_renditions ? `${user.avatar_renditions['48']} 48w, ${user.avatar_renditions['96']} 96w` : undefined}
+                              sizes="32px"
                               alt="Profile"
                               className="w-8 h-8 object-cover"
                               onError={(e) => {
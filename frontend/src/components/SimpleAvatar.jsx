@@ -4,9 +4,11 @@ import { User, AlertTriangle, RefreshCw } from 'lucide-react';
 /**
  * Simple Avatar Component - No CORS, No Complex Logic
  * Fokus pada reliability dan simplicity
+ * `renditions` ({ukuran: url} dari API) dipakai sebagai srcset untuk src asli.
  */
 const SimpleAvatar = ({ 
   src, 
+  renditions = null,
   alt = "Avatar", 
   className = "", 
   size = "150",
@@ -100,11 +102,18 @@ const SimpleAvatar = ({
     );
   }
 
+  // Srcset hanya untuk src asli, bukan URL fallback
+  const srcSet = renditions && currentSrc === src
+    ? Object.entries(renditions).map(([width, url]) => `${url} ${width}w`).join(', ')
+    : undefined;
+
   // Normal image
   return (
     <img
       key={`avatar-${currentSrc}`} // Force re-render when src changes
       src={currentSrc}
+      srcSet={srcSet}
+      sizes={srcSet ? `${size}px` : undefined}
       alt={alt}
       className={className}
       onLoad={handleImageLoad}
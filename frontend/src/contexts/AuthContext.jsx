@@ -133,6 +133,13 @@ export const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
+    // Cabut token di server; state lokal tetap dibersihkan walau request gagal
+    if (token) {
+      fetch(`${API_BASE_URL}/auth/logout`, {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${token}` },
+      }).catch(() => {});
+    }
     setUser(null);
     setToken(null);
     localStorage.removeItem('token');
@@ -17,6 +17,10 @@ const AdminPanel = () => {
     { id: 3, name: 'Unit Kegiatan Khusus' }
   ]);
   const [users, setUsers] = useState([]);
+  const [usersCursor, setUsersCursor] = useState(null);
+  const [usersTotal, setUsersTotal] = useState(null);
+  const [usersTotalIsEstimate, setUsersTotalIsEstimate] = useState(false);
+  const [userSearch, setUserSearch] = useState('');
   const [loading, setLoading] = useState(false);
   const [isAddModalOpen, setIsAddModalOpen] = useState(false);
   const [isEditModalOpen, setIsEditModalOpen] = useState(false);
@@ -33,6 +37,40 @@ const AdminPanel = () => {
     loadData();
   }, []);
 
+  // Cari user (prefix username/email/nama/NIM) setelah user berhenti mengetik
+  const isFirstSearch = React.useRef(true);
+  React.useEffect(() => {
+    if (isFirstSearch.current) {
+      isFirstSearch.current = false;
+      return;
+    }
+    const timer = setTimeout(() => loadUsers({ reset: true }), 300);
+    return () => clearTimeout(timer);
+  }, [userSearch]);
+
+  // Ambil satu halaman user (cursor pagination); reset=true mulai dari halaman pertama
+  const loadUsers = async ({ reset = true } = {}) => {
+    const token = localStorage.getItem('token');
+    if (!token) return;
+
+    const params = new URLSearchParams({ limit: '50', fields: 'id,username,email,role' });
+    if (userSearch.trim()) params.set('q', userSearch.trim());
+    if (!reset && usersCursor) params.set('cursor', usersCursor);
+
+    const usersResponse = await fetch(`${API_BASE_URL}/auth/users?${params}`, {
+      headers: { 'Authorization': `Bearer ${token}` }
+    });
+    if (usersResponse.ok) {
+      const usersData = await usersResponse.json();
+      setUsers(prev => reset ? usersData.items : [...prev, ...usersData.items]);
+      setUsersCursor(usersData.next_cursor);
+      if (reset) {
+        setUsersTotal(usersData.total);
+        setUsersTotalIsEstimate(Boolean(usersData.total_is_estimate));
+      }
+    }
+  };
+
   const loadData = async () => {
     setLoading(true);
     
@@ -44,7 +82,7 @@ const AdminPanel = () => {
     
     try {
       // Fetch UKMs
-      const ukmsResponse = await fetch(`${API_BASE_URL}/ukm/`);
+      const ukmsResponse = await fetch(`${API_BASE_URL}/ukm/?all=true`);
       if (ukmsResponse.ok) {
         const ukmsData = await ukmsResponse.json();
         console.log('📊 Raw UKMs data from backend:', ukmsData);
@@ -65,14 +103,8 @@ const AdminPanel = () => {
         }
       }
 
-      // Fetch users
-      const usersResponse = await fetch(`${API_BASE_URL}/auth/users`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-      if (usersResponse.ok) {
-        const usersData = await usersResponse.json();
-        setUsers(usersData);
-      }
+      // Fetch users (halaman pertama)
+      await loadUsers({ reset: true });
       
     } catch (error) {
       // Use fallback data if backend is not available
@@ -437,6 +469,13 @@ const AdminPanel = () => {
     <div className="space-y-6">
       <div className="flex justify-between items-center">
         <h3 className="text-lg font-semibold text-gray-800">Manajemen User</h3>
+        <input
+          type="text"
+          value={userSearch}
+          onChange={(e) => setUserSearch(e.target.value)}
+          placeholder="Cari username, email, nama atau NIM..."
+          className="flex-1 mx-4 px-3 py-2 border border-gray-300 rounded-lg text-sm focus:outline-none focus:ring-2 focus:ring-primary-500"
+        />
         <button
           onClick={() => setIsAddUserModalOpen(true)}
           className="flex items-center space-x-2 bg-primary-600 text-white px-4 py-2 rounded-lg hover:bg-primary-700 transition-colors"
@@ -506,6 +545,16 @@ const AdminPanel = () => {
             </tbody>
           </table>
         </div>
+        {usersCursor && (
+          <div className="p-4 text-center border-t border-gray-200">
+            <button
+              onClick={() => loadUsers({ reset: false })}
+              className="text-sm text-primary-600 hover:text-primary-800 font-medium"
+            >
+              Muat lebih banyak
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -538,7 +587,7 @@ const AdminPanel = () => {
               <nav className="-mb-px flex space-x-8">
                 {[
                   { id: 'ukms', label: 'UKM', count: ukms.length },
-                  { id: 'users', label: 'Users', count: users.length }
+                  { id: 'users', label: 'Users', count: usersTotal === null ? users.length : `${usersTotalIsEstimate ? '~' : ''}${usersTotal}` }
                 ].map((tab) => (
                   <button
                     key={tab.id}
@@ -483,6 +483,25 @@ const Profile = () => {
     }
   };
 
+  // Upload avatar diproses di background (202); tunggu job selesai sebelum refresh profil
+  const waitForAvatarJob = async (statusUrl) => {
+    const jobUrl = statusUrl.startsWith('http') ? statusUrl : `${API_BASE_URL.replace(/\/api$/, '')}${statusUrl}`;
+    for (let attempt = 0; attempt < 60; attempt++) {
+      const response = await fetch(jobUrl, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+      const job = await response.json();
+      if (job.status === 'done' || job.status === 'superseded') {
+        return job;
+      }
+      if (job.status === 'failed' || !response.ok) {
+        throw new Error(job.error || job.message || 'Gagal memproses foto profil');
+      }
+      await new Promise((resolve) => setTimeout(resolve, 500));
+    }
+    throw new Error('Pemrosesan foto profil terlalu lama, silakan coba lagi');
+  };
+
   const handleAvatarUpload = async () => {
     if (!avatarUrl && !selectedFile) {
       setError('Silakan pilih file atau masukkan URL gambar');
@@ -545,6 +564,10 @@ const Profile = () => {
         const result = await response.json();
         console.log('✅ Avatar update successful!');
         console.log('  - Response:', result);
+
+        if (response.status === 202 && result.status_url) {
+          await waitForAvatarJob(result.status_url);
+        }
         
         // Refresh profile to get updated avatar info
         const profileResponse = await fetch(`${API_BASE_URL}/profile/`, {
@@ -809,6 +832,7 @@ const Profile = () => {
                   <div className="relative inline-block mb-4" key={`avatar-container-${avatarKey}`}>
                     <SimpleAvatar
                       src={profile?.avatar_url}
+                      renditions={profile?.avatar_renditions}
                       alt="Avatar"
                       className="w-24 h-24 rounded-full object-cover border-2 border-purple-200 hover:opacity-80 transition-opacity"
                       size="96"
@@ -909,6 +933,7 @@ const Profile = () => {
             <div className="text-center">
               <SimpleAvatar
                 src={profile?.avatar_url}
+                renditions={profile?.avatar_renditions}
                 alt="Avatar Preview"
                 className="w-64 h-64 object-cover rounded-lg mx-auto"
                 size="256"
@@ -81,48 +81,39 @@ const UKM = () => {
     setError(null);
     
     try {
-      // Fetch categories
-      console.log('Fetching categories from:', `${API_BASE_URL}/ukm/categories`);
-      const categoriesResponse = await fetch(`${API_BASE_URL}/ukm/categories`);
-      if (categoriesResponse.ok) {
-        const categoriesData = await categoriesResponse.json();
-        console.log('Categories received:', categoriesData);
-        const categoriesWithExtras = categoriesData.map(category => ({
-          ...category,
-          icon: categoryIcons[category.name] || categoryIcons[category.name.toLowerCase()] || '📋',
-          color: categoryColors[category.name] || categoryColors[category.name.toLowerCase()] || '#666'
-        }));
-        setCategories(categoriesWithExtras);
-      } else {
-        console.error('Categories fetch failed:', categoriesResponse.status);
-        throw new Error('Failed to fetch categories');
+      // Satu request: kategori (dengan jumlah UKM) dan semua UKM aktif
+      console.log('Fetching catalog from:', `${API_BASE_URL}/bootstrap/`);
+      const response = await fetch(`${API_BASE_URL}/bootstrap/?random_limit=0&include_ukms=true`);
+      if (!response.ok) {
+        console.error('Catalog fetch failed:', response.status);
+        throw new Error('Failed to fetch catalog');
       }
+      const { categories: categoriesData, ukms: ukmsData } = await response.json();
 
-      // Fetch UKMs
-      console.log('Fetching UKMs from:', `${API_BASE_URL}/ukm/`);
-      const ukmsResponse = await fetch(`${API_BASE_URL}/ukm/`);
-      if (ukmsResponse.ok) {
-        const ukmsData = await ukmsResponse.json();
-        console.log('UKMs received:', ukmsData);
-        console.log('🔍 Sample UKM structure:', ukmsData[0]);
-        console.log('🔍 UKM fields:', ukmsData[0] ? Object.keys(ukmsData[0]) : 'No UKMs');
-        
-        // Transform data for frontend compatibility
-        const transformedUkms = ukmsData.map(ukm => {
-          console.log('🔄 Transforming UKM:', ukm);
-          const transformed = {
-            ...ukm,
-            image: ukm.image || `https://images.unsplash.com/photo-${Math.random() > 0.5 ? '1626224583764-f87db24ac4ea' : '1493225457124-a3eb161ffa5f'}?w=400&h=300&fit=crop`
-          };
-          console.log('✅ Transformed UKM:', transformed);
-          return transformed;
-        });
-        console.log('🎯 Final transformed UKMs:', transformedUkms);
-        setUkmData(transformedUkms);
-      } else {
-        console.error('UKMs fetch failed:', ukmsResponse.status);
-        throw new Error('Failed to fetch UKMs');
-      }
+      console.log('Categories received:', categoriesData);
+      const categoriesWithExtras = categoriesData.map(category => ({
+        ...category,
+        icon: categoryIcons[category.name] || categoryIcons[category.name.toLowerCase()] || '📋',
+        color: categoryColors[category.name] || categoryColors[category.name.toLowerCase()] || '#666'
+      }));
+      setCategories(categoriesWithExtras);
+
+      console.log('UKMs received:', ukmsData);
+      console.log('🔍 Sample UKM structure:', ukmsData[0]);
+      console.log('🔍 UKM fields:', ukmsData[0] ? Object.keys(ukmsData[0]) : 'No UKMs');
+
+      // Transform data for frontend compatibility
+      const transformedUkms = ukmsData.map(ukm => {
+        console.log('🔄 Transforming UKM:', ukm);
+        const transformed = {
+          ...ukm,
+          image: ukm.image || `https://images.unsplash.com/photo-${Math.random() > 0.5 ? '1626224583764-f87db24ac4ea' : '1493225457124-a3eb161ffa5f'}?w=400&h=300&fit=crop`
+        };
+        console.log('✅ Transformed UKM:', transformed);
+        return transformed;
+      });
+      console.log('🎯 Final transformed UKMs:', transformedUkms);
+      setUkmData(transformedUkms);
       
       console.log('✅ Data loaded successfully from database!');
     } catch (error) {
@@ -185,7 +185,7 @@ const UKMFixed = () => {
 
       // Fetch UKMs
       console.log('Fetching UKMs from:', `${API_BASE_URL}/ukm/`);
-      const ukmsResponse = await fetch(`${API_BASE_URL}/ukm/`);
+      const ukmsResponse = await fetch(`${API_BASE_URL}/ukm/?all=true`);
       if (ukmsResponse.ok) {
         const ukmsData = await ukmsResponse.json();
         console.log('UKMs received:', ukmsData);